@@ -1,11 +1,17 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from . import models, database
+from .core.cache import TTLCache
+from .core.hashing import BoundedHasher, HasherOverloaded
+from .services import revocation
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -16,28 +22,136 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# ============================================
+# HASHING PASSWORD (executor bcrypt terbatas)
+# ============================================
+# Semua bcrypt lewat satu executor supaya lonjakan login tidak menghabiskan
+# threadpool endpoint sync lain. Antrian penuh / timeout → 503 + Retry-After.
+# workers + max_queue harus di bawah ukuran threadpool AnyIO (default 40).
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "16"))
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "30"))
+
+password_hasher = BoundedHasher(workers=BCRYPT_WORKERS, max_queue=BCRYPT_MAX_QUEUE, timeout=BCRYPT_TIMEOUT)
+
+
+def _run_hasher(op: str, fn, *args):
+    try:
+        return password_hasher.run(op, fn, *args)
+    except HasherOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang sibuk, silakan coba lagi",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _run_hasher("verify", pwd_context.verify, plain, hashed)
 
 
 def hash_password(password: str):
     # Batasi panjang maksimal 72 karakter
     if len(password) > 72:
         password = password[:72]
-    return pwd_context.hash(password)
+    return _run_hasher("hash", pwd_context.hash, password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    # jti → bisa dicabut satu per satu (logout); iat → cabut semua sesi user
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    to_encode.setdefault("iat", time.time())
     if "sub" not in to_encode:
         raise ValueError("Token data must include 'sub'")
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# ============================================
+# CACHE USER TERAUTENTIKASI
+# ============================================
+# token → (UserPrincipal, jti, iat, loaded_at). Hit = tanpa decode JWT dan tanpa query users.
+# Cek pencabutan token tetap jalan di setiap request (memori, services/revocation.py).
+# Perubahan user (profil, password, hapus) dicatat di revoked_tokens → worker lain
+# membuang entry lama paling lambat REVOCATION_REFRESH_SECONDS setelah commit.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Data user ringan (terlepas dari session) untuk dependency auth."""
+    id: int
+    email: str
+    name: str
+    phone_number: str | None = None
+    avatar: str | None = None
+    created_at: datetime | None = None
+
+    @classmethod
+    def from_user(cls, user: models.User):
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            phone_number=user.phone_number,
+            avatar=user.avatar,
+            created_at=user.created_at,
+        )
+
+
+principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+def _drop_cached(user_id: int):
+    principal_cache.delete_where(lambda entry: entry[0].id == user_id)
+
+
+def invalidate_user(db: Session, user_id: int):
+    """Panggil sebelum commit update profil: cache principal di semua worker dibuang."""
+    revocation.mark_user_changed(db, user_id, AUTH_CACHE_TTL)
+    _drop_cached(user_id)
+
+
+def revoke_sessions(db: Session, user_id: int):
+    """Cabut semua token user (logout semua perangkat / sesi bocor, ganti password,
+    hapus user). Caller yang commit."""
+    revocation.revoke_user(db, user_id, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    _drop_cached(user_id)
+
+
 def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(database.get_db)
 ):
+    principal = authenticate_token(token, db)
+
+    # dipakai routing replica (read-after-write) di database.py
+    request.state.user_id = principal.id
+    db.info["user_id"] = principal.id
+    db.info["request_state"] = request.state
+    return principal
+
+
+def authenticate_token(token: str, db: Session) -> UserPrincipal:
+    """Validasi token (cache → JWT + DB) dan cek pencabutan. Dipakai juga oleh WebSocket."""
+    entry = principal_cache.get(token)
+    if entry is not None and revocation.revocations.changed_since(entry[0].id, entry[3]):
+        entry = None
+    if entry is None:
+        entry = _load_principal(token, db)
+    principal, jti, issued_at, _ = entry
+    if revocation.revocations.is_revoked(jti, principal.id, issued_at):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+def _load_principal(token: str, db: Session) -> tuple:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,8 +165,25 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    # sebelum query: perubahan yang commit selama query tetap membuat entry ini basi
+    loaded_at = time.time()
+    # token baru membawa uid (immutable) → lookup PK; token lama via email
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+    else:
+        user = db.query(models.User).filter(models.User.email == email).first()
     if not user:
         raise credentials_exception
-    return user
 
+    entry = (UserPrincipal.from_user(user), payload.get("jti"), payload.get("iat"), loaded_at)
+    # jangan simpan lebih lama dari umur token
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        principal_cache.set(token, entry, ttl=remaining)
+    return entry
+
+
+def token_claims(token: str) -> dict:
+    """Payload token yang sudah divalidasi get_current_user (jti, exp untuk logout)."""
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
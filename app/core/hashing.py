@@ -0,0 +1,100 @@
+# app/core/hashing.py
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from .metrics import Histogram
+
+# bcrypt ~50–300 ms per operasi; bucket disesuaikan
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0, 10.0)
+
+
+class HasherOverloaded(Exception):
+    """Antrian hashing penuh / hasil tidak keluar dalam timeout; caller
+    sebaiknya balas 503 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hasher overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedHasher:
+    """Executor khusus untuk operasi CPU-berat (bcrypt) dengan admission control.
+
+    Maksimal `workers` operasi jalan bersamaan dan `max_queue` menunggu;
+    lebih dari itu langsung ditolak (HasherOverloaded) supaya thread
+    threadpool FastAPI tidak habis menunggu bcrypt.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 16, timeout: float = 30.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0          # sedang jalan + menunggu
+        self.rejected = 0
+        self.timed_out = 0
+        self.latency = {}          # op → Histogram waktu eksekusi
+        self.wait = Histogram(HASH_BUCKETS)
+
+    def _histogram(self, op: str) -> Histogram:
+        hist = self.latency.get(op)
+        if hist is None:
+            hist = self.latency.setdefault(op, Histogram(HASH_BUCKETS))
+        return hist
+
+    def _retry_after(self, pending: int) -> int:
+        snap = self._histogram("verify").snapshot()
+        avg = snap["sum"] / snap["count"] if snap["count"] else 0.25
+        return max(1, math.ceil(pending * avg / self.workers))
+
+    def run(self, op: str, fn, *args):
+        """Jalankan fn(*args) di executor dan tunggu hasilnya (dipanggil dari endpoint sync)."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherOverloaded(self._retry_after(self._pending))
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self.wait.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                self._histogram(op).observe(time.perf_counter() - started)
+
+        future = self._executor.submit(task)
+        # slot dilepas saat task benar-benar selesai/batal, bukan saat caller berhenti menunggu
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # masih antri → batalkan; sudah jalan → dibiarkan selesai (tetap memegang slot)
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+                pending = self._pending
+            raise HasherOverloaded(self._retry_after(pending)) from None
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(pending, self.workers),
+            "queued": max(0, pending - self.workers),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait_seconds": self.wait.snapshot(),
+            "latency_seconds": {op: h.snapshot() for op, h in self.latency.items()},
+        }
@@ -0,0 +1,72 @@
+# app/core/metrics.py
+import threading
+from bisect import bisect_left
+
+
+# ============================================
+# METRIK SEDERHANA (thread-safe, in-process)
+# ============================================
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histogram dengan bucket tetap (detik)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # slot terakhir = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+# ============================================
+# FORMAT TEKS PROMETHEUS (/metrics)
+# ============================================
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict | None, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in (labels or {}).items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def prometheus_header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def prometheus_sample(name: str, value, labels: dict | None = None) -> str:
+    return f"{name}{_labels(labels)} {value}"
+
+
+def prometheus_histogram(name: str, histogram: Histogram, labels: dict | None = None) -> list[str]:
+    """Baris _bucket/_sum/_count satu Histogram (bucket sudah kumulatif)."""
+    snap = histogram.snapshot()
+    lines = []
+    for bound, count in snap["buckets"].items():
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_labels(labels, le)} {count}")
+    lines.append(f"{name}_sum{_labels(labels)} {snap['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+    return lines
@@ -0,0 +1,117 @@
+# app/core/pool_metrics.py
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from .metrics import Histogram
+
+logger = logging.getLogger("database.pool")
+
+# Bucket waktu tunggu checkout (detik) — fokus di rentang ms
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """Statistik live satu pool koneksi (diisi oleh event listener)."""
+
+    def __init__(self, name: str, warn_wait_ms: float = 100.0):
+        self.name = name
+        self.warn_wait = warn_wait_ms / 1000.0
+        self.wait_time = Histogram(WAIT_BUCKETS)
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.total_checkouts = 0
+        self.total_connects = 0
+        self.total_invalidated = 0
+        self.slow_waits = 0
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        pool = engine.pool
+        self._engine = engine
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.metrics = self
+
+        @event.listens_for(pool, "connect")
+        def _on_connect(dbapi_conn, conn_record):
+            with self._lock:
+                self.total_connects += 1
+
+        @event.listens_for(pool, "checkout")
+        def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+            with self._lock:
+                self.checked_out += 1
+                self.total_checkouts += 1
+                self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+        @event.listens_for(pool, "checkin")
+        def _on_checkin(dbapi_conn, conn_record):
+            with self._lock:
+                self.checked_out = max(0, self.checked_out - 1)
+
+        @event.listens_for(pool, "invalidate")
+        def _on_invalidate(dbapi_conn, conn_record, exception):
+            with self._lock:
+                self.total_invalidated += 1
+
+        return self
+
+    def record_wait(self, seconds: float):
+        self.wait_time.observe(seconds)
+        if seconds >= self.warn_wait:
+            with self._lock:
+                self.slow_waits += 1
+            pool = self._engine.pool
+            logger.warning(
+                "⏳ Request menunggu koneksi DB %.1f ms (pool=%s, checked_out=%s, overflow=%s)",
+                seconds * 1000, self.name, self.checked_out,
+                pool.overflow() if isinstance(pool, QueuePool) else None,
+            )
+
+    def snapshot(self):
+        pool = self._engine.pool if self._engine is not None else None
+        stats = {
+            "name": self.name,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "total_checkouts": self.total_checkouts,
+            "total_connects": self.total_connects,
+            "total_invalidated": self.total_invalidated,
+            "slow_waits": self.slow_waits,
+            "wait_seconds": self.wait_time.snapshot(),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            })
+        return stats
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mengukur lama request menunggu koneksi.
+
+    SQLAlchemy tidak punya event "sebelum checkout", jadi waktu tunggu
+    diukur langsung di sekitar _do_get().
+    """
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
@@ -0,0 +1,215 @@
+# app/core/ratelimit.py
+import math
+import time
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+
+
+# ============================================
+# RATE LIMIT TOKEN BUCKET
+# ============================================
+# Tiap key (ip:…, email:…, phone:…) punya bucket berisi `capacity` token yang
+# terisi ulang penuh dalam `per_seconds`. Satu request = satu token per key,
+# diambil semua-atau-tidak-sama-sekali: semua key dicek dulu, token baru
+# dikurangi kalau semuanya masih ada. Ada yang kosong → 429 + Retry-After,
+# dan key lain (mis. ip) tidak ikut terpotong.
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    per_seconds: float
+
+    @property
+    def refill(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int          # detik sampai bucket penuh lagi
+    retry_after: int    # detik sampai ada token lagi (0 kalau allowed)
+
+
+def _advance(tokens: float, last: float, rate: Rate, now: float) -> float:
+    return min(rate.capacity, tokens + (now - last) * rate.refill)
+
+
+def _decision(allowed: bool, tokens: float, rate: Rate) -> Decision:
+    return Decision(
+        allowed=allowed,
+        limit=rate.capacity,
+        remaining=max(0, int(tokens)),
+        reset=math.ceil((rate.capacity - tokens) / rate.refill),
+        retry_after=0 if allowed else max(1, math.ceil((1 - tokens) / rate.refill)),
+    )
+
+
+class MemoryBuckets:
+    """Bucket in-process tanpa lock.
+
+    Get/set dict atomik di CPython; dua thread yang balapan di key yang sama
+    paling buruk meloloskan satu request ekstra — cukup untuk rate limit.
+    """
+
+    blocking = False   # murni memori, aman dipanggil di event loop
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: dict = {}  # key → (tokens, last monotonic)
+
+    def take_all(self, items) -> list[Decision]:
+        """items: [(key, Rate)]. Kurangi satu token di semua key, atau tidak
+        sama sekali kalau ada yang kosong (return hanya decision yang ditolak)."""
+        now = time.monotonic()
+        current = []
+        for key, rate in items:
+            state = self._buckets.get(key)
+            current.append(rate.capacity if state is None else _advance(state[0], state[1], rate, now))
+        denied = [_decision(False, tokens, rate) for (_, rate), tokens in zip(items, current) if tokens < 1]
+        if denied:
+            return denied
+        for (key, _), tokens in zip(items, current):
+            self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return [_decision(True, tokens - 1, rate) for (_, rate), tokens in zip(items, current)]
+
+    def _prune(self, now: float):
+        # bucket yang tidak disentuh lebih dari sejam pasti sudah penuh lagi
+        for key, (_, last) in list(self._buckets.items()):
+            if now - last > 3600:
+                self._buckets.pop(key, None)
+
+
+class KVBuckets:
+    """Bucket di KV store bersama (services/kvstore.py) untuk banyak worker.
+    Update lewat compare_and_swap; balapan → baca ulang & coba lagi.
+
+    Semua key dibaca dulu; token baru diambil kalau semuanya cukup. Antara
+    baca dan ambil worker lain bisa menghabiskan token, jadi key yang sudah
+    terpotong sebelum key yang kalah tetap terpotong — jarang, dan hanya
+    di bawah kontensi pada key yang sama."""
+
+    blocking = True    # I/O ke DB → jangan dipanggil langsung di event loop
+
+    def __init__(self, store, attempts: int = 5):
+        self.store = store
+        self.attempts = attempts
+
+    def take_all(self, items) -> list[Decision]:
+        now = time.time()
+        denied = []
+        for key, rate in items:
+            state = self.store.get(f"rl:{key}")
+            tokens = rate.capacity if state is None else _advance(state[0], state[1], rate, now)
+            if tokens < 1:
+                denied.append(_decision(False, tokens, rate))
+        if denied:
+            return denied
+        decisions = []
+        for key, rate in items:
+            decision = self._take(key, rate)
+            if not decision.allowed:
+                return [decision]
+            decisions.append(decision)
+        return decisions
+
+    def _take(self, key: str, rate: Rate) -> Decision:
+        for _ in range(self.attempts):
+            now = time.time()
+            state = self.store.get(f"rl:{key}")
+            tokens = rate.capacity if state is None else _advance(state[0], state[1], rate, now)
+            if tokens < 1:
+                return _decision(False, tokens, rate)
+            if self.store.compare_and_swap(f"rl:{key}", state, [tokens - 1, now], ttl=rate.per_seconds):
+                return _decision(True, tokens - 1, rate)
+        # kontensi tinggi di satu key → anggap penuh
+        return _decision(False, 0, rate)
+
+
+class RateLimiter:
+    """policies: nama route → {jenis key: Rate}. Jenis key: ip, email, phone."""
+
+    # field form yang dipakai sebagai key per jenis
+    FORM_FIELDS = {"email": ("email", "username"), "phone": ("phone_number",)}
+
+    def __init__(self, policies: dict, backend, enabled: bool = True, trust_proxy: bool = False):
+        self.policies = policies
+        self.backend = backend
+        self.enabled = enabled
+        self.trust_proxy = trust_proxy
+        self.allowed = {}
+        self.limited = {}
+
+    def client_ip(self, request: Request) -> str:
+        if self.trust_proxy:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def _keys(self, request: Request, kinds):
+        form = None
+        for kind in kinds:
+            if kind == "ip":
+                yield kind, self.client_ip(request)
+                continue
+            if form is None:
+                # Starlette meng-cache hasil parse; Form(...) di endpoint tidak parse ulang
+                content_type = request.headers.get("content-type", "")
+                form = await request.form() if "form" in content_type else {}
+            for field in self.FORM_FIELDS[kind]:
+                value = form.get(field)
+                if value:
+                    yield kind, str(value).strip().lower()
+                    break
+
+    def check(self, name: str):
+        """Dependency FastAPI: Depends(limiter.check("login"))."""
+        rates = self.policies[name]
+
+        async def dependency(request: Request, response: Response):
+            if not self.enabled:
+                return
+            items = [(f"{name}:{kind}:{value}", rates[kind])
+                     async for kind, value in self._keys(request, rates)]
+            if self.backend.blocking:
+                decisions = await run_in_threadpool(self.backend.take_all, items)
+            else:
+                decisions = self.backend.take_all(items)
+
+            denied = [d for d in decisions if not d.allowed]
+            if denied:
+                # client harus menunggu sampai SEMUA key yang kosong terisi lagi
+                decision = max(denied, key=lambda d: d.retry_after)
+                self.limited[name] = self.limited.get(name, 0) + 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Terlalu banyak percobaan, silakan coba lagi nanti",
+                    headers={**self._headers(decision), "Retry-After": str(decision.retry_after)},
+                )
+            self.allowed[name] = self.allowed.get(name, 0) + 1
+            if decisions:
+                response.headers.update(self._headers(min(decisions, key=lambda d: d.remaining)))
+
+        return dependency
+
+    @staticmethod
+    def _headers(decision: Decision) -> dict:
+        return {
+            "RateLimit-Limit": str(decision.limit),
+            "RateLimit-Remaining": str(decision.remaining),
+            "RateLimit-Reset": str(decision.reset),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+        }
@@ -0,0 +1,185 @@
+# app/core/request_metrics.py
+import contextvars
+import threading
+import time
+
+from sqlalchemy import event
+
+from .metrics import Histogram, prometheus_header, prometheus_histogram, prometheus_sample
+
+
+# ============================================
+# METRIK REQUEST HTTP PER ROUTE TEMPLATE
+# ============================================
+# Middleware ASGI murni (bukan BaseHTTPMiddleware: tanpa task tambahan per
+# request dan aman untuk StreamingResponse/SSE). Label route = template path
+# FastAPI ("/documents/{document_id}"), bukan path mentah, jadi kardinalitas
+# tetap sebanyak jumlah route. Statement DB dihitung lewat event SQLAlchemy
+# ke objek milik request yang sedang berjalan (contextvar — ikut ke
+# threadpool endpoint sync).
+
+# bucket jumlah statement SQL per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+UNMATCHED = "<unmatched>"
+ROUTING = "<routing>"   # request yang belum sampai ke router
+
+
+class _DBUsage:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_current_usage: contextvars.ContextVar[_DBUsage | None] = contextvars.ContextVar("db_usage", default=None)
+
+
+class _RouteStats:
+    __slots__ = ("latency", "statements", "db_seconds", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = Histogram()
+        self.statuses: dict[int, int] = {}
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mount (mis. /uploads) tidak mengisi "route", tapi mengisi root_path
+    return scope.get("root_path") or UNMATCHED
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.routes: dict[tuple[str, str], _RouteStats] = {}
+        self._active: dict[int, dict] = {}   # id(scope) → scope request yang sedang berjalan
+        self._lock = threading.Lock()
+        self.db_seconds: dict[str, Histogram] = {}   # engine → durasi per statement (count = total statement)
+
+    # ---------- HTTP ----------
+    def _route(self, method: str, template: str) -> _RouteStats:
+        key = (method, template)
+        stats = self.routes.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.routes.setdefault(key, _RouteStats())
+        return stats
+
+    def observe(self, scope, status: int, seconds: float, usage: _DBUsage):
+        stats = self._route(scope["method"], route_template(scope))
+        stats.latency.observe(seconds)
+        stats.statements.observe(usage.statements)
+        stats.db_seconds.observe(usage.seconds)
+        with self._lock:
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def in_flight(self) -> dict[tuple[str, str], int]:
+        # route diisi router pada scope yang sama, jadi dibaca saat scrape saja
+        counts: dict[tuple[str, str], int] = {}
+        for scope in list(self._active.values()):
+            template = route_template(scope) if "endpoint" in scope else ROUTING
+            key = (scope["method"], template)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    # ---------- DB ----------
+    def attach_engine(self, engine, name: str):
+        histogram = self.db_seconds.setdefault(name, Histogram())
+
+        # waktu mulai disimpan di execution context (satu objek per eksekusi),
+        # lebih murah dari conn.info dan ikut hilang kalau statement gagal
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metrics_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, "_metrics_started", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            histogram.observe(elapsed)
+            usage = _current_usage.get()
+            if usage is not None:
+                usage.statements += 1
+                usage.seconds += elapsed
+
+        return engine
+
+    # ---------- format Prometheus ----------
+    def render(self) -> list[str]:
+        routes = sorted(self.routes.items())
+        lines = prometheus_header("edoc_http_request_duration_seconds", "histogram",
+                                  "Latency request HTTP per route template")
+        for (method, route), stats in routes:
+            lines += prometheus_histogram("edoc_http_request_duration_seconds", stats.latency,
+                                          {"method": method, "route": route})
+
+        lines += prometheus_header("edoc_http_requests_total", "counter", "Jumlah request per status")
+        for (method, route), stats in routes:
+            for status_code, count in sorted(stats.statuses.items()):
+                lines.append(prometheus_sample("edoc_http_requests_total", count,
+                                               {"method": method, "route": route, "status": status_code}))
+
+        lines += prometheus_header("edoc_http_requests_in_flight", "gauge", "Request yang sedang diproses")
+        for (method, route), count in sorted(self.in_flight().items()):
+            lines.append(prometheus_sample("edoc_http_requests_in_flight", count, {"method": method, "route": route}))
+
+        lines += prometheus_header("edoc_http_request_db_statements", "histogram", "Statement SQL per request")
+        for (method, route), stats in routes:
+            lines += prometheus_histogram("edoc_http_request_db_statements", stats.statements,
+                                          {"method": method, "route": route})
+
+        lines += prometheus_header("edoc_http_request_db_seconds", "histogram", "Total waktu SQL per request")
+        for (method, route), stats in routes:
+            lines += prometheus_histogram("edoc_http_request_db_seconds", stats.db_seconds,
+                                          {"method": method, "route": route})
+
+        lines += prometheus_header("edoc_db_statements_total", "counter",
+                                   "Statement SQL per engine (termasuk worker background)")
+        for name, histogram in sorted(self.db_seconds.items()):
+            lines.append(prometheus_sample("edoc_db_statements_total", histogram.snapshot()["count"], {"engine": name}))
+
+        lines += prometheus_header("edoc_db_statement_duration_seconds", "histogram", "Durasi per statement SQL")
+        for name, histogram in sorted(self.db_seconds.items()):
+            lines += prometheus_histogram("edoc_db_statement_duration_seconds", histogram, {"engine": name})
+        return lines
+
+
+metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, registry: RequestMetrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        usage = _DBUsage()
+        token = _current_usage.set(usage)
+        status_code = 500
+        started = time.perf_counter()
+        registry._active[id(scope)] = scope
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry._active.pop(id(scope), None)
+            _current_usage.reset(token)
+            registry.observe(scope, status_code, time.perf_counter() - started, usage)
@@ -0,0 +1,13 @@
+# app/core/responses.py
+from fastapi.responses import Response
+
+
+class PreEncodedJSONResponse(Response):
+    """Response untuk body yang sudah berupa bytes JSON (mis. hasil
+    TypeAdapter.dump_json). FastAPI tidak menjalankan jsonable_encoder
+    dan render() tidak meng-encode ulang."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content
@@ -1,8 +1,9 @@
 # app/crud.py
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .services import no_surat
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
 
 # ---------------- USER CRUD ---------------- #
@@ -26,20 +27,28 @@ def get_all_users(db: Session):
     return db.query(models.User).all()
 
 
+def get_missing_user_ids(db: Session, user_ids: list[int]) -> list[int]:
+    """Cek semua id sekaligus (satu query IN), kembalikan id yang tidak ada."""
+    wanted = set(user_ids)
+    if not wanted:
+        return []
+    found = {
+        uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(wanted))
+    }
+    return [uid for uid in dict.fromkeys(user_ids) if uid not in found]
+
+
 # ---------------- DOCUMENT CRUD ---------------- #
-def generate_no_surat(db: Session):
-    """Generate sequential no_surat (auto increment format 0000000001)."""
-    last_doc = db.query(models.Document).order_by(models.Document.id.desc()).first()
-    if not last_doc or not last_doc.no_surat:
-        return "0000000001"
-    try:
-        return str(int(last_doc.no_surat) + 1).zfill(10)
-    except ValueError:
-        return f"{last_doc.id+1:010d}"
+def generate_no_surat():
+    """Ambil no_surat berikutnya dari allocator sequence (format default 0000000001).
+
+    Tidak lagi membaca dokumen terakhir, jadi aman dipanggil paralel.
+    """
+    return no_surat.allocator.allocate()
 
 
 def create_document(db: Session, title: str, content: str, creator_id: int):
-    no_surat = generate_no_surat(db)
+    no_surat = generate_no_surat()
     new_doc = models.Document(
         no_surat=no_surat,
         title=title,
@@ -54,6 +63,16 @@ def create_document(db: Session, title: str, content: str, creator_id: int):
     return new_doc
 
 
+def no_surat_taken(db: Session, value: str, exclude_doc_id: int | None = None) -> bool:
+    """Nomor sudah dipakai dokumen aktif lain atau dokumen arsip."""
+    active = db.query(models.Document.id).filter(models.Document.no_surat == value)
+    if exclude_doc_id is not None:
+        active = active.filter(models.Document.id != exclude_doc_id)
+    if active.first():
+        return True
+    return db.query(models.ArchivedDocument.id).filter(models.ArchivedDocument.no_surat == value).first() is not None
+
+
 def get_document(db: Session, doc_id: int):
     return db.query(models.Document).filter(models.Document.id == doc_id).first()
 
@@ -81,12 +100,18 @@ def update_document_status(db: Session, doc_id: int, new_status: models.StatusEn
 
 
 # ---------------- APPROVER CRUD ---------------- #
+def bulk_insert_approvers(db: Session, doc_id: int, approver_ids: list[int]):
+    """Insert semua approver dalam satu executemany (tanpa commit)."""
+    if not approver_ids:
+        return
+    db.execute(insert(models.Approver), [
+        {"document_id": doc_id, "user_id": uid, "seq_index": i, "status": models.StatusEnum.waiting}
+        for i, uid in enumerate(approver_ids)
+    ])
+
+
 def add_approvers(db: Session, doc_id: int, approver_ids: list[int]):
-    for i, uid in enumerate(approver_ids):
-        db_approver = models.Approver(
-            document_id=doc_id, user_id=uid, seq_index=i, status=models.StatusEnum.waiting
-        )
-        db.add(db_approver)
+    bulk_insert_approvers(db, doc_id, approver_ids)
     db.commit()
 
 
@@ -102,10 +127,17 @@ def update_approver_status(db: Session, approver_id: int, status: models.StatusE
 
 
 # ---------------- RECIPIENT CRUD ---------------- #
+def bulk_insert_recipients(db: Session, doc_id: int, recipient_ids: list[int]):
+    """Insert semua recipient dalam satu executemany (tanpa commit)."""
+    if not recipient_ids:
+        return
+    db.execute(insert(models.Recipient), [
+        {"document_id": doc_id, "user_id": uid} for uid in recipient_ids
+    ])
+
+
 def add_recipients(db: Session, doc_id: int, recipient_ids: list[int]):
-    for uid in recipient_ids:
-        db_rec = models.Recipient(document_id=doc_id, user_id=uid)
-        db.add(db_rec)
+    bulk_insert_recipients(db, doc_id, recipient_ids)
     db.commit()
 
 
@@ -1,20 +1,54 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.database import Base, engine, sync_tables
-from app.routes import auth_routes, doc_routes, user_routes, file_routes, router_ws
+from app.database import Base, ReadAfterWriteMiddleware, engine, replica_engine, sync_tables
+from app.routes import auth_routes, doc_routes, user_routes, file_routes, router_ws, internal_routes
+from app.services.search import ensure_search_indexes
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.services import notifications, outbox, backplane, revocation
+from app.utils.ws_manager import manager as ws_manager
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # 🟢 1️⃣ Load environment variables lebih awal
 load_dotenv()
 
+# Matikan di proses yang tidak boleh menguras outbox (mis. saat test)
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "1") == "1"
+
 # 🟢 2️⃣ Buat tabel & sinkronisasi database
 Base.metadata.create_all(bind=engine)
 sync_tables(engine, Base)
+ensure_search_indexes(engine)
+
+# Replica SQLite (mode test lokal) tidak direplikasi otomatis → buat skemanya
+if replica_engine is not engine and replica_engine.dialect.name == "sqlite":
+    Base.metadata.create_all(bind=replica_engine)
 
 # 🟢 3️⃣ Inisialisasi FastAPI
-app = FastAPI(title="e-Document FastAPI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # worker outbox → backplane (semua worker) → socket lokal milik user target
+    ws_manager.set_sequence_base(backplane.bus.start(asyncio.get_running_loop(), ws_manager.publish))
+    outbox.worker.register(
+        outbox.CHANNEL_WS,
+        lambda payload: backplane.bus.publish(payload["users"], payload["message"]),
+    )
+    if OUTBOX_WORKER_ENABLED:
+        outbox.worker.start()
+    # deny list token di-refresh di latar, bukan di jalur request
+    revocation.revocations.start()
+    yield
+    await asyncio.to_thread(revocation.revocations.stop)
+    await asyncio.to_thread(outbox.worker.stop)
+    await asyncio.to_thread(backplane.bus.stop)
+    await ws_manager.close_all()
+    # kirim sisa notifikasi di antrian sebelum proses berhenti
+    await asyncio.to_thread(notifications.dispatcher.close)
+
+app = FastAPI(title="e-Document FastAPI", lifespan=lifespan)
 
 # 🟢 4️⃣ Middleware CORS (harus sebelum mount static & router)
 app.add_middleware(
@@ -29,6 +63,12 @@ app.add_middleware(
     allow_headers=["*"],   # termasuk X-MASTER-KEY
 )
 
+# 🟢 Cookie read-after-write → baca berikutnya (worker mana pun) ke primary
+app.add_middleware(ReadAfterWriteMiddleware)
+
+# 🟢 Metrik request (latency per route, status, in-flight, query DB) — paling luar
+app.add_middleware(RequestMetricsMiddleware)
+
 # 🟢 5️⃣ Include semua router (REST API)
 app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
 app.include_router(user_routes.router, prefix="/users", tags=["users"])
@@ -38,6 +78,9 @@ app.include_router(file_routes.router, prefix="/files", tags=["files"])
 # 🟢 6️⃣ Include router WebSocket
 app.include_router(router_ws.router)
 
+# 🟢 Endpoint statistik & /metrics (wajib X-MASTER-KEY)
+app.include_router(internal_routes.router)
+
 # 🟢 7️⃣ Terakhir: Mount static files (uploads, dll)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Enum, ForeignKey, DateTime, Double, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy import Boolean
 from datetime import datetime
@@ -22,6 +22,8 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # ⚠️ Kolom OTP/reset di bawah sudah tidak ditulis lagi; state OTP ada di
+    # kv_store (services/kvstore.py). Dibiarkan supaya sync_tables tidak berubah.
     # ✅ Kolom untuk sistem OTP & verifikasi
     otp_code = Column(String(6), nullable=True)           # Kode OTP 6 digit
     otp_expiry = Column(DateTime, nullable=True)          # Tanggal kedaluwarsa
@@ -38,6 +40,8 @@ class User(Base):
     
 class Document(Base):
     __tablename__ = "documents"
+    # id tidak boleh dipakai ulang setelah dokumen dipindah ke arsip
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     no_surat = Column(String(50), unique=True)
@@ -48,6 +52,8 @@ class Document(Base):
     status = Column(Enum(StatusEnum), default=StatusEnum.waiting)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_deleted = Column(Boolean, default=False)
+    # naik di setiap mutasi (services/versions.py) → dasar ETag detail dokumen
+    version = Column(Integer, nullable=True, default=1)
     creator = relationship("User", back_populates="created_docs")
     approvers = relationship("Approver", back_populates="document", cascade="all, delete")
     recipients = relationship("Recipient", back_populates="document", cascade="all, delete")
@@ -82,6 +88,7 @@ class Recipient(Base):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
@@ -91,3 +98,174 @@ class File(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     document = relationship("Document", back_populates="files")
+
+
+class DocumentSequence(Base):
+    """Counter nomor surat. Satu baris per (name, period); period = tahun
+    jika nomor reset tiap tahun, 0 jika tidak pernah reset."""
+    __tablename__ = "document_sequences"
+
+    name = Column(String(50), primary_key=True)
+    period = Column(Integer, primary_key=True, default=0)
+    next_value = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DocumentEvent(Base):
+    """Log append-only perubahan dokumen; id = cursor untuk /documents/changes.
+
+    Tanpa FK ke documents supaya event tetap ada saat dokumen diarsip.
+    """
+    __tablename__ = "document_events"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    document_id = Column(Integer, nullable=False, index=True)
+    event_type = Column(String(30), nullable=False)   # create, assign, approve, reject, revise, read, delete, ...
+    actor_id = Column(Integer, nullable=True)
+    visible_to = Column(Integer, nullable=True, index=True)  # NULL = semua peserta dokumen
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class UserViewVersion(Base):
+    """Versi tampilan per user: naik setiap ada perubahan pada dokumen yang
+    terlihat oleh user itu → dasar ETag dashboard (satu lookup PK)."""
+    __tablename__ = "user_view_versions"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False, default=1)
+
+class OutboxMessage(Base):
+    """Transactional outbox: pesan keluar (WebSocket, WhatsApp) ditulis di
+    transaksi yang sama dengan perubahan state, lalu dikirim oleh worker
+    services/outbox.py. status: pending → in_flight → sent / failed
+    (gagal sementara → pending lagi)."""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_available", "status", "available_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    channel = Column(String(20), nullable=False)          # ws, whatsapp
+    payload = Column(Text, nullable=False)                # JSON
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # pending: jadwal percobaan berikutnya; in_flight: batas lease klaim worker
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class WSEvent(Base):
+    """Backplane WebSocket antar worker/host (services/backplane.py, mode sql):
+    setiap worker membaca baris baru (id > cursor) lalu meneruskan ke socket
+    lokalnya. Baris hanya disimpan beberapa detik."""
+    __tablename__ = "ws_events"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_ids = Column(Text, nullable=False)                  # JSON list
+    payload = Column(Text, nullable=False)                   # JSON
+    published_at = Column(Float, nullable=False, index=True) # epoch detik (presisi sub-detik untuk latency)
+
+
+class KVEntry(Base):
+    """Key-value dengan TTL bersama antar worker (OTP, reset token, rate limit).
+    value = JSON. Baris kedaluwarsa dianggap tidak ada dan dibersihkan berkala."""
+    __tablename__ = "kv_store"
+
+    key = Column(String(191), primary_key=True)   # 191 → muat di index utf8mb4
+    value = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RevokedToken(Base):
+    """Deny list JWT (logout, sesi bocor); id = cursor refresh incremental
+    per worker (services/revocation.py).
+
+    jti NULL = semua token user yang terbit sebelum revoked_ts dicabut.
+    kind "profile" = tidak mencabut apa pun; data user berubah → cache
+    principal di semua worker yang dimuat sebelum revoked_ts dibuang.
+    revoked_ts = epoch (detik, pecahan) karena dibandingkan dengan iat token;
+    DATETIME MySQL tanpa fsp membulatkan ke detik. revoked_at tetap dipakai
+    untuk filter jendela refresh.
+    """
+    __tablename__ = "revoked_tokens"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    jti = Column(String(64), nullable=True, unique=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+    revoked_ts = Column(Double, nullable=True)  # NULL = baris lama, pakai revoked_at
+    kind = Column(String(16), nullable=True)     # NULL = pencabutan token
+    expires_at = Column(DateTime, nullable=False, index=True)  # sesudah ini baris boleh dibuang
+
+# ============================================
+# ARSIP (dokumen final & lama, dipindah oleh services/archive.py)
+# ============================================
+# Kolom sama dengan tabel kerja + archived_at; id tetap sama supaya
+# lookup by ID & URL download lama tetap valid.
+class ArchivedDocument(Base):
+    __tablename__ = "documents_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    no_surat = Column(String(50), index=True)
+    title = Column(String(512))
+    content = Column(Text)
+    creator_id = Column(Integer, ForeignKey("users.id"), index=True)
+    current_index = Column(Integer, default=0)
+    status = Column(Enum(StatusEnum))
+    created_at = Column(DateTime, index=True)
+    is_deleted = Column(Boolean, default=False)
+    version = Column(Integer, nullable=True, default=1)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    creator = relationship("User")
+    approvers = relationship("ArchivedApprover", back_populates="document", order_by="ArchivedApprover.id")
+    recipients = relationship("ArchivedRecipient", back_populates="document")
+    files = relationship("ArchivedFile", back_populates="document", order_by="ArchivedFile.id")
+
+
+class ArchivedApprover(Base):
+    __tablename__ = "approvers_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    document_id = Column(Integer, ForeignKey("documents_archive.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    seq_index = Column(Integer)
+    status = Column(Enum(StatusEnum))
+    waktu = Column(DateTime)
+    catatan = Column(Text)
+    is_read = Column(Boolean, default=False)
+    has_read = Column(Boolean, default=False)
+
+    document = relationship("ArchivedDocument", back_populates="approvers")
+    user = relationship("User")
+
+
+class ArchivedRecipient(Base):
+    __tablename__ = "recipients_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    document_id = Column(Integer, ForeignKey("documents_archive.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    is_deleted = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)
+
+    document = relationship("ArchivedDocument", back_populates="recipients")
+    user = relationship("User")
+
+
+class ArchivedFile(Base):
+    __tablename__ = "files_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    document_id = Column(Integer, ForeignKey("documents_archive.id"), index=True)
+    filename = Column(String(512))
+    path = Column(String(1024))
+    is_deleted = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+
+    document = relationship("ArchivedDocument", back_populates="files")
@@ -7,12 +7,27 @@ from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
 from datetime import datetime
 import os
+import time
+
+from app.core.metrics import Histogram
 
 
 APPROVED_DIR = os.getenv("APPROVED_DIR", "approved_docs")
 
+# durasi satu kali stamping PDF (detik), diekspor di /metrics
+STAMP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAMP_SECONDS = Histogram(STAMP_BUCKETS)
+
 
 def add_stamp_to_pdf(input_path, output_path, doc_info):
+    started = time.perf_counter()
+    try:
+        return _stamp_pdf(input_path, output_path, doc_info)
+    finally:
+        STAMP_SECONDS.observe(time.perf_counter() - started)
+
+
+def _stamp_pdf(input_path, output_path, doc_info):
     reader = PdfReader(open(input_path, "rb"))
     writer = PdfWriter()
 
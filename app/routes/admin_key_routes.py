@@ -3,23 +3,18 @@ import os
 from fastapi import APIRouter, Depends, HTTPException, Header, status, Request
 from pydantic import BaseModel, constr
 from sqlalchemy.orm import Session
-from .. import database, models
-from passlib.context import CryptContext
+from .. import database, models, auth
 import logging
 from datetime import datetime
 
 router = APIRouter(prefix="/admin", tags=["AdminKey"])
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 MASTER_KEY = os.environ.get("MASTER_KEY")  # harus diset di environment
 
 logger = logging.getLogger("admin_key")
 # configure logger di main app jika belum ada:
 # logging.basicConfig(level=logging.INFO)
 
-def hash_password(password: str) -> str:
-    return pwd_ctx.hash(password)
-
 # request model untuk ganti password user lain
 class AdminSetPasswordRequest(BaseModel):
     user_id: int
@@ -52,8 +47,9 @@ def admin_set_user_password(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.password_hash = hash_password(body.new_password)
+    user.password_hash = auth.hash_password(body.new_password)
     db.add(user)
+    auth.revoke_sessions(db, user.id)  # sesi dengan password lama dicabut di semua worker
     db.commit()
 
     # audit log
@@ -95,6 +91,7 @@ def admin_delete_user(
             db.delete(user)
         message = f"User {body.user_id} soft-deleted."
 
+    auth.revoke_sessions(db, body.user_id)
     db.commit()
 
     logger.info({
@@ -7,30 +7,45 @@ from .. import schemas, models, auth, database  # ✅ sudah benar (pakai relativ
 import os, shutil, random, string
 from typing import Optional
 import random, string, uuid
-from passlib.context import CryptContext
 from ..database import get_db
-import requests
+from ..services import revocation
+from ..services.kvstore import store
+from ..services import outbox
+from ..core.ratelimit import KVBuckets, MemoryBuckets, Rate, RateLimiter
+
+# TTL state OTP di KV store (detik)
+OTP_TTL = 5 * 60
+RESET_TOKEN_TTL = 10 * 60
+
+# ============================================
+# RATE LIMIT endpoint mahal (bcrypt / WhatsApp / tulis DB)
+# ============================================
+# RATE_LIMIT_BACKEND=memory (per worker) atau shared (kv_store, antar worker)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"  # pakai X-Forwarded-For
+RATE_LIMIT_POLICIES = {
+    "login": {"ip": Rate(30, 60), "email": Rate(10, 300)},
+    "request_login_otp": {"ip": Rate(10, 600), "email": Rate(3, 600)},
+    "forgot_password": {"ip": Rate(10, 600), "phone": Rate(3, 600)},
+    "request_update": {"ip": Rate(10, 600), "phone": Rate(3, 600)},
+}
+limiter = RateLimiter(
+    RATE_LIMIT_POLICIES,
+    backend=KVBuckets(store) if RATE_LIMIT_BACKEND == "shared" else MemoryBuckets(),
+    enabled=RATE_LIMIT_ENABLED,
+    trust_proxy=RATE_LIMIT_TRUST_PROXY,
+)
 
 router = APIRouter()
 
-FONNTE_TOKEN = "F5Bv76fRZrEzZUBSxPqJ"
+def send_whatsapp_message(db: Session, phone_number: str, message: str):
+    """Tulis pesan WhatsApp (Fonnte) ke outbox; ikut transaksi caller, dikirim
+    worker outbox lewat services/notifications.py setelah commit. Token Fonnte
+    dibaca dari env FONNTE_TOKEN saat kirim, tidak disimpan di outbox."""
+    outbox.publish_whatsapp(db, phone_number, message)
+
 
-def send_whatsapp_message(phone_number: str, message: str):
-    """Kirim pesan WhatsApp lewat Fonnte API"""
-    url = "https://api.fonnte.com/send"
-    payload = {
-        "target": phone_number,
-        "message": message
-    }
-    headers = {
-        "Authorization": FONNTE_TOKEN
-    }
-    try:
-        r = requests.post(url, data=payload, headers=headers, timeout=10)
-        print("✅ WhatsApp sent:", r.text)
-    except Exception as e:
-        print("❌ Gagal kirim WA:", e)
-        
 def gen_token(length=48):
     return uuid.uuid4().hex + "".join(random.choices(string.ascii_letters + string.digits, k=max(0, length-32)))
 
@@ -103,6 +118,7 @@ def upload_avatar(
         shutil.copyfileobj(file.file, f)
 
     user.avatar = f"/uploads/avatars/{filename}"  # simpan path untuk frontend
+    auth.invalidate_user(db, user.id)
     db.commit()
     db.refresh(user)
 
@@ -112,7 +128,7 @@ def upload_avatar(
     }
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(limiter.check("login"))])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
@@ -126,7 +142,7 @@ def login(
 
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "uid": user.id},  # uid → lookup PK di get_current_user
         expires_delta=access_token_expires
     )
 
@@ -144,7 +160,35 @@ def login(
 # 🟨 REQUEST UPDATE PROFILE (KIRIM OTP)
 # ====================================================
 # 🟨 REQUEST UPDATE PROFILE (KIRIM OTP)
-@router.post("/request-update")
+@router.post("/logout")
+def logout(
+    token: str = Depends(auth.oauth2_scheme),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    claims = auth.token_claims(token)
+    if not claims.get("jti"):
+        # token lama tanpa jti → cabut semua sesi user
+        auth.revoke_sessions(db, current_user.id)
+    else:
+        revocation.revoke_token(
+            db, claims["jti"], current_user.id, datetime.utcfromtimestamp(claims["exp"])
+        )
+    db.commit()
+    return {"message": "Logout berhasil"}
+
+
+@router.post("/logout-all")
+def logout_all(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    auth.revoke_sessions(db, current_user.id)
+    db.commit()
+    return {"message": "Semua sesi telah dicabut"}
+
+
+@router.post("/request-update", dependencies=[Depends(limiter.check("request_update"))])
 def request_update_profile(
     name: str = Form(...),
     phone_number: str = Form(...),
@@ -164,13 +208,12 @@ def request_update_profile(
         user.password_hash = auth.hash_password(new_password)
 
     otp = "".join(random.choices(string.digits, k=6))
-    expiry = datetime.utcnow() + timedelta(minutes=5)
-
-    user.pending_name = name
-    user.pending_phone = phone_number
-    user.otp_code = otp
-    user.otp_expiry = expiry
-    user.otp_purpose = "update_profile"
+    # perubahan nama/nomor menunggu OTP → disimpan di KV store, bukan di baris users
+    store.set(f"otp:update_profile:{user.id}", {
+        "code": otp,
+        "name": name,
+        "phone": phone_number,
+    }, ttl=OTP_TTL)
 
     # 🟢 Tambah: simpan avatar jika dikirim
     if avatar:
@@ -182,9 +225,10 @@ def request_update_profile(
             shutil.copyfileobj(avatar.file, f)
         user.avatar = f"/uploads/avatars/{filename}"
 
-    db.commit()
+    send_whatsapp_message(db, phone_number, f"Kode OTP Anda: {otp}\n\nJangan bagikan kode ini ke siapa pun.")
 
-    send_whatsapp_message(phone_number, f"Kode OTP Anda: {otp}\n\nJangan bagikan kode ini ke siapa pun.")
+    auth.invalidate_user(db, user.id)
+    db.commit()
 
     return {"message": f"OTP dikirim ke {phone_number}"}
 
@@ -204,34 +248,31 @@ def verify_update_profile(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # 🔹 Pastikan OTP pernah dibuat
-    if not user.otp_code or not user.otp_expiry:
-        raise HTTPException(status_code=400, detail="Tidak ada permintaan OTP aktif")
+    # 🔹 Pastikan OTP pernah dibuat & masih berlaku (TTL di KV store)
+    key = f"otp:update_profile:{user.id}"
+    pending = store.get(key)
+    if pending is None:
+        raise HTTPException(status_code=400, detail="Tidak ada permintaan OTP aktif atau sudah kadaluarsa")
 
     # 🔹 Cek apakah OTP sesuai
-    if user.otp_code.strip() != otp_code.strip():
+    if pending["code"] != otp_code.strip():
         raise HTTPException(status_code=400, detail="Kode OTP salah")
 
-    # 🔹 Cek apakah OTP masih berlaku
-    if user.otp_expiry < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Kode OTP sudah kadaluarsa")
-
     # 🔹 Pastikan nomor telepon cocok
-    if user.pending_phone and user.pending_phone != phone_number:
+    if pending["phone"] and pending["phone"] != phone_number:
         raise HTTPException(status_code=400, detail="Nomor telepon tidak cocok dengan OTP")
 
-    # 🔹 Update data profil secara aman
-    if user.pending_name:
-        user.name = user.pending_name
-    if user.pending_phone:
-        user.phone_number = user.pending_phone
+    # 🔹 Hapus OTP agar tidak bisa reuse (yang kalah balapan dianggap sudah dipakai)
+    if store.pop(key) is None:
+        raise HTTPException(status_code=400, detail="Kode OTP sudah dipakai")
 
-    # 🔹 Bersihkan kolom OTP & pending agar tidak bisa reuse
-    user.otp_code = None
-    user.otp_expiry = None
-    user.pending_name = None
-    user.pending_phone = None
+    # 🔹 Update data profil secara aman
+    if pending["name"]:
+        user.name = pending["name"]
+    if pending["phone"]:
+        user.phone_number = pending["phone"]
 
+    auth.invalidate_user(db, user.id)
     db.commit()
     db.refresh(user)
 
@@ -245,27 +286,21 @@ def verify_update_profile(
             "avatar": user.avatar
         }
     }
-@router.post("/request-login-otp")
+@router.post("/request-login-otp", dependencies=[Depends(limiter.check("request_login_otp"))])
 def request_login_otp(email: str = Form(...), db: Session = Depends(database.get_db)):
     user = db.query(models.User).filter(models.User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="Email tidak ditemukan")
 
     otp = "".join(random.choices(string.digits, k=6))
-    expiry = datetime.utcnow() + timedelta(minutes=5)
-
-    user.otp_code = otp
-    user.otp_expiry = expiry
-    user.otp_purpose = "login"
+    store.set(f"otp:login:{user.id}", {"code": otp}, ttl=OTP_TTL)
 
+    send_whatsapp_message(db, user.phone_number, f"Kode OTP Login Anda: {otp}")
     db.commit()
 
-    send_whatsapp_message(user.phone_number, f"Kode OTP Login Anda: {otp}")
-
     return {"message": f"OTP dikirim ke WhatsApp {user.phone_number[-4:]}****"}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(limiter.check("forgot_password"))])
 def forgot_password(
     phone_number: str = Form(...),
     db: Session = Depends(get_db)
@@ -275,31 +310,24 @@ def forgot_password(
         # jangan berikan info berlebih di prod; untuk dev OK
         raise HTTPException(status_code=404, detail="Nomor tidak ditemukan")
 
-    # rate-limit sederhana: jika OTP sebelumnya masih valid, tolak
-    if user.otp_expiry and user.otp_expiry > datetime.utcnow():
-        raise HTTPException(status_code=429, detail="OTP sudah dikirim, silakan tunggu beberapa menit")
-
     # generate OTP + reset token
     otp = "".join(random.choices(string.digits, k=6))
-    otp_expiry = datetime.utcnow() + timedelta(minutes=5)
-
     reset_token = gen_token(48)
-    reset_token_expiry = datetime.utcnow() + timedelta(minutes=10)  # token valid 10 menit
 
-    # simpan di user record
-    user.otp_code = otp
-    user.otp_expiry = otp_expiry
-    user.otp_purpose = "forgot_password"
-    user.reset_token = reset_token
-    user.reset_token_expiry = reset_token_expiry
+    # rate-limit sederhana: jika OTP sebelumnya masih valid, tolak
+    # (key OTP terpisah ber-TTL 5 menit; set_if_absent atomik antar worker)
+    if not store.set_if_absent(f"otp:forgot_password:{phone_number}", {"code": otp}, ttl=OTP_TTL):
+        raise HTTPException(status_code=429, detail="OTP sudah dikirim, silakan tunggu beberapa menit")
 
-    db.commit()
+    # token valid 10 menit
+    store.set(f"reset_token:{phone_number}", {"token": reset_token, "user_id": user.id}, ttl=RESET_TOKEN_TTL)
 
     # kirim OTP via Fonnte
-    send_whatsapp_message(phone_number, f"🔐 Kode OTP Reset Password Anda: {otp}\n\nJangan bagikan kode ini ke siapa pun.")
+    send_whatsapp_message(db, phone_number, f"🔐 Kode OTP Reset Password Anda: {otp}\n\nJangan bagikan kode ini ke siapa pun.")
+    db.commit()
 
     # RETURN reset_token (frontend perlu menyertakannya saat verifikasi)
-    return {"message": "OTP dikirim", "reset_token": reset_token, "expires_in": 10 * 60}
+    return {"message": "OTP dikirim", "reset_token": reset_token, "expires_in": RESET_TOKEN_TTL}
 
 
 # ==============================
@@ -317,27 +345,26 @@ def verify_forgot_password(
         raise HTTPException(status_code=404, detail="Nomor tidak ditemukan")
 
     # validasi reset_token
-    if not user.reset_token or user.reset_token != reset_token:
-        raise HTTPException(status_code=400, detail="Reset token tidak valid")
-    if not user.reset_token_expiry or user.reset_token_expiry < datetime.utcnow():
+    token_entry = store.get(f"reset_token:{phone_number}")
+    if token_entry is None:
         raise HTTPException(status_code=400, detail="Reset token sudah kadaluarsa")
+    if token_entry["token"] != reset_token or token_entry["user_id"] != user.id:
+        raise HTTPException(status_code=400, detail="Reset token tidak valid")
 
     # validasi OTP
-    if not user.otp_code or user.otp_purpose != "forgot_password":
+    otp_entry = store.get(f"otp:forgot_password:{phone_number}")
+    if otp_entry is None:
         raise HTTPException(status_code=400, detail="Tidak ada OTP aktif untuk reset password")
-    if user.otp_code.strip() != otp_code.strip():
+    if otp_entry["code"] != otp_code.strip():
         raise HTTPException(status_code=400, detail="Kode OTP salah")
-    if user.otp_expiry < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Kode OTP sudah kadaluarsa")
 
     # jika valid -> bersihkan otp & token agar tidak bisa reuse
-    user.otp_code = None
-    user.otp_expiry = None
-    user.otp_purpose = None
-    user.reset_token = None
-    user.reset_token_expiry = None
+    if store.pop(f"reset_token:{phone_number}") is None:
+        raise HTTPException(status_code=400, detail="Reset token sudah dipakai")
+    store.delete(f"otp:forgot_password:{phone_number}")
 
-    db.commit()
+    # izin reset password (sekali pakai) untuk langkah berikutnya
+    store.set(f"reset_verified:{phone_number}", {"user_id": user.id}, ttl=RESET_TOKEN_TTL)
 
     return {"message": "OTP valid. Silakan buat password baru.", "status": "verified"}
 
@@ -345,8 +372,6 @@ def verify_forgot_password(
 # ==============================
 # RESET PASSWORD (setelah verifikasi)
 # ==============================
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 @router.post("/reset-password")
 def reset_password(
     phone_number: str = Form(...),
@@ -357,8 +382,14 @@ def reset_password(
     if not user:
         raise HTTPException(status_code=404, detail="Nomor tidak ditemukan.")
 
-    hashed_pw = pwd_context.hash(new_password)
+    # hanya setelah /verify-forgot berhasil
+    verified = store.pop(f"reset_verified:{phone_number}")
+    if verified is None or verified["user_id"] != user.id:
+        raise HTTPException(status_code=400, detail="Verifikasi OTP dulu sebelum reset password.")
+
+    hashed_pw = auth.hash_password(new_password)
     user.password_hash = hashed_pw
+    auth.revoke_sessions(db, user.id)  # password bocor → semua sesi lama dicabut
     db.commit()
 
     return {"message": "Password berhasil diperbarui untuk nomor tersebut."}
@@ -417,8 +448,22 @@ def admin_delete_user(
             # 🔹 Hapus dokumennya sendiri
             db.delete(doc)
 
-        # 🔥 Terakhir, hapus user
+        # 🔹 Bersihkan juga tabel arsip (services/archive.py)
+        db.query(models.ArchivedApprover).filter(models.ArchivedApprover.user_id == user_id).delete()
+        db.query(models.ArchivedRecipient).filter(models.ArchivedRecipient.user_id == user_id).delete()
+        archived_ids = [
+            d.id for d in db.query(models.ArchivedDocument.id).filter(models.ArchivedDocument.creator_id == user_id)
+        ]
+        if archived_ids:
+            for child in (models.ArchivedApprover, models.ArchivedRecipient, models.ArchivedFile):
+                db.query(child).filter(child.document_id.in_(archived_ids)).delete(synchronize_session=False)
+            db.query(models.ArchivedDocument).filter(
+                models.ArchivedDocument.id.in_(archived_ids)
+            ).delete(synchronize_session=False)
+
+        # 🔥 Terakhir, hapus user (token yang masih beredar dicabut di semua worker)
         db.delete(user)
+        auth.revoke_sessions(db, user_id)
         db.commit()
 
         # 🧾 Catat aksi di log
@@ -466,6 +511,7 @@ def admin_change_user_password(
     # 🔐 Hash password baru
     hashed_pw = auth.hash_password(new_password)
     user.password_hash = hashed_pw
+    auth.revoke_sessions(db, user_id)
     db.commit()
 
     # 🧾 Tulis log
@@ -1,14 +1,16 @@
 from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session, joinedload
 import os, shutil
 from datetime import datetime
 from uuid import uuid4
 from sqlalchemy.orm import Session
-from .ws_manager import manager
+from ..services import outbox
+from .file_routes import to_wib, doc_to_dict
 from .. import schemas
+from ..services import search, archive, changes, versions, no_surat
 from pydantic import BaseModel
-from .. import models, database, auth, pdf_stamp
+from .. import models, database, auth, pdf_stamp, crud
 
 router = APIRouter()
 UPLOAD_DIR = "uploads"
@@ -17,34 +19,48 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # ---------------------------------------------------------------------------
 # Helper
 # ---------------------------------------------------------------------------
-def add_approvers(db: Session, document_id: int, user_ids: List[int]):
-    for i, user_id in enumerate(user_ids):
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail=f"Approver user_id {user_id} not found")
+def validate_participants(db: Session, approver_ids: List[int], recipient_ids: List[int]):
+    """Validasi semua user_id dengan satu query, laporkan semua yang hilang sekaligus."""
+    missing = set(crud.get_missing_user_ids(db, [*approver_ids, *recipient_ids]))
+    if not missing:
+        return
+
+    problems = []
+    missing_approvers = [uid for uid in dict.fromkeys(approver_ids) if uid in missing]
+    missing_recipients = [uid for uid in dict.fromkeys(recipient_ids) if uid in missing]
+    if missing_approvers:
+        problems.append(f"Approver user_id {missing_approvers} not found")
+    if missing_recipients:
+        problems.append(f"Recipient user_id {missing_recipients} not found")
+    raise HTTPException(status_code=404, detail="; ".join(problems))
+
+
+def validate_manual_no_surat(db: Session, value: str, doc_id: Optional[int] = None):
+    """no_surat dari client: tidak boleh berformat nomor allocator dan tidak boleh dipakai."""
+    if no_surat.allocator.is_reserved(value):
+        raise HTTPException(
+            status_code=400,
+            detail="no_surat with the automatic numbering format is assigned by the server; leave it empty",
+        )
+    if crud.no_surat_taken(db, value, exclude_doc_id=doc_id):
+        raise HTTPException(status_code=400, detail="Document with this no_surat already exists")
 
-        db.add(models.Approver(
-            document_id=document_id,
-            user_id=user_id,
-            seq_index=i,
-            status=models.StatusEnum.waiting
-        ))
 
+def add_approvers(db: Session, document_id: int, user_ids: List[int]):
+    validate_participants(db, user_ids, [])
+    crud.bulk_insert_approvers(db, document_id, user_ids)
 
-def add_recipients(db: Session, document_id: int, user_ids: List[int]):
-    for user_id in user_ids:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail=f"Recipient user_id {user_id} not found")
 
-        db.add(models.Recipient(document_id=document_id, user_id=user_id))
+def add_recipients(db: Session, document_id: int, user_ids: List[int]):
+    validate_participants(db, [], user_ids)
+    crud.bulk_insert_recipients(db, document_id, user_ids)
 
 
 # ---------------------------------------------------------------------------
 # Create Document
 # ---------------------------------------------------------------------------
 class DocumentCreate(BaseModel):
-    no_surat: str
+    no_surat: Optional[str] = None  # kosong → dibuat otomatis oleh allocator
     title: str
     content: str
 
@@ -55,11 +71,11 @@ async def create_document(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    if db.query(models.Document).filter(models.Document.no_surat == request.no_surat).first():
-        raise HTTPException(status_code=400, detail="Document with this no_surat already exists")
+    if request.no_surat:
+        validate_manual_no_surat(db, request.no_surat)
 
     doc = models.Document(
-        no_surat=request.no_surat,
+        no_surat=request.no_surat or crud.generate_no_surat(),
         title=request.title,
         content=request.content,
         status=models.StatusEnum.waiting,
@@ -67,18 +83,20 @@ async def create_document(
     )
 
     db.add(doc)
-    db.commit()
-    db.refresh(doc)
+    db.flush()  # butuh doc.id untuk event
+    changes.record_event(db, doc.id, changes.EVENT_CREATE, current_user.id)
 
-    # 🔥 BROADCAST DOKUMEN BARU
-    await manager.broadcast({
+    # 🔥 BROADCAST DOKUMEN BARU (lewat outbox, satu transaksi dengan insert)
+    outbox.publish_ws(db, {
         "event": "document_created",
         "document_id": doc.id,
         "title": doc.title,
         "creator_id": current_user.id
-    })
+    }, [current_user.id])
+    db.commit()
+    db.refresh(doc)
 
-    return {"message": "Document created successfully", "doc_id": doc.id}
+    return {"message": "Document created successfully", "doc_id": doc.id, "no_surat": doc.no_surat}
 
 
 
@@ -109,6 +127,7 @@ def upload_file(
     )
 
     db.add(new_file)
+    changes.record_event(db, document_id, changes.EVENT_UPLOAD, current_user.id)
     db.commit()
     db.refresh(new_file)
 
@@ -134,36 +153,133 @@ async def assign_participants(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    if request.approver_ids:
-        add_approvers(db, document_id, request.approver_ids)
+    approver_ids = request.approver_ids or []
+    recipient_ids = request.recipient_ids or []
 
-    if request.recipient_ids:
-        add_recipients(db, document_id, request.recipient_ids)
+    # satu query IN untuk semua peserta, lalu bulk insert
+    validate_participants(db, approver_ids, recipient_ids)
+    crud.bulk_insert_approvers(db, document_id, approver_ids)
+    crud.bulk_insert_recipients(db, document_id, recipient_ids)
 
-    db.commit()
+    changes.record_event(db, document_id, changes.EVENT_ASSIGN, current_user.id)
 
-    # 🔥 BROADCAST KE SEMUA USER YANG TERKAIT
-    await manager.broadcast({
+    # 🔥 KIRIM KE SEMUA USER YANG TERKAIT (creator + approver + recipient)
+    db.flush()
+    outbox.publish_ws(db, {
         "event": "document_assigned",
         "document_id": document_id,
         "approver_ids": request.approver_ids,
         "recipient_ids": request.recipient_ids
-    })
+    }, changes.document_audience(db, document_id))
+    db.commit()
 
     return {"message": "Participants assigned successfully"}
 
 
 
+# ---------------------------------------------------------------------------
+# SEARCH DOKUMEN (no_surat, judul, isi, nama peserta)
+# ---------------------------------------------------------------------------
+@router.get("/search")
+def search_documents(
+    q: str,
+    page: int = 1,
+    page_size: int = 20,
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    result = search.search_documents(db, q, current_user.id, page=page, page_size=page_size)
+
+    return {
+        "items": [
+            {
+                "id": doc.id,
+                "no_surat": doc.no_surat,
+                "title": doc.title,
+                "status": doc.status.value if hasattr(doc.status, "value") else doc.status,
+                "creator": doc.creator.name if doc.creator else None,
+                "created_at": to_wib(doc.created_at),
+                "score": round(score, 4),
+            }
+            for doc, score in result["rows"]
+        ],
+        "total": result["total"],
+        "page": result["page"],
+        "page_size": result["page_size"],
+    }
+
+
+# ---------------------------------------------------------------------------
+# CHANGE FEED (delta untuk client, pengganti reload dashboard penuh)
+# ---------------------------------------------------------------------------
+@router.get("/changes")
+def get_document_changes(
+    since: int = 0,
+    limit: int = changes.CHANGES_PAGE_SIZE,
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    feed = changes.get_changes(db, current_user.id, since, limit)
+    if feed["resync"]:
+        # client harus reload /files/documents/dashboard lalu lanjut dari cursor ini
+        return {"resync": True, "cursor": feed["cursor"], "events": [], "documents": [], "removed": [], "has_more": False}
+
+    doc_ids = feed["document_ids"]
+    docs = (
+        db.query(models.Document)
+        .options(
+            joinedload(models.Document.creator),
+            joinedload(models.Document.approvers).joinedload(models.Approver.user),
+            joinedload(models.Document.recipients).joinedload(models.Recipient.user),
+            joinedload(models.Document.files)
+        )
+        .filter(models.Document.id.in_(doc_ids), models.Document.is_deleted == False)
+        .all()
+    ) if doc_ids else []
+    found = {d.id for d in docs}
+
+    return {
+        "resync": False,
+        "cursor": feed["cursor"],
+        "has_more": feed["has_more"],
+        "events": [
+            {
+                "id": e.id,
+                "document_id": e.document_id,
+                "event": e.event_type,
+                "actor_id": e.actor_id,
+                "created_at": to_wib(e.created_at),
+            }
+            for e in feed["events"]
+        ],
+        "documents": [doc_to_dict(d, current_user.id) for d in docs],
+        # dihapus / diarsip → client buang dari list
+        "removed": [d for d in doc_ids if d not in found],
+    }
+
+
 # ---------------------------------------------------------------------------
 # GET DETAIL DOKUMEN (untuk frontend DocumentDetail & Edit)
 # ---------------------------------------------------------------------------
 @router.get("/{doc_id}")
 def get_document_detail(
     doc_id: int,
-    db: Session = Depends(database.get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    doc = db.query(models.Document).filter(models.Document.id == doc_id).first()
+    # cek versi dulu (lookup PK) → 304 tanpa memuat approvers/recipients/files
+    version = versions.document_version(db, doc_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    etag = versions.weak_etag("doc", doc_id, version, current_user.id)
+    if versions.etag_matches(request, etag):
+        return versions.not_modified(etag)
+    response.headers["ETag"] = etag
+
+    doc = archive.get_document(db, doc_id)  # fallback ke arsip
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -235,11 +351,21 @@ async def approve_document(
     # approve
     approver.status = models.StatusEnum.approved
     approver.waktu = datetime.utcnow()
+    changes.record_event(db, doc_id, changes.EVENT_APPROVE, current_user.id)
+
+    # 🔥🔥 BROADCAST REALTIME (outbox, satu transaksi dengan approval)
+    outbox.publish_ws(db, {
+        "event": "approval_status_changed",
+        "document_id": doc_id,
+        "user_id": current_user.id,
+        "status": "approved"
+    }, changes.document_audience(db, doc_id))
     db.commit()
 
     # cek final approve
     if all(a.status == models.StatusEnum.approved for a in doc.approvers):
         doc.status = models.StatusEnum.approved
+        changes.record_event(db, doc_id, changes.EVENT_FINALIZE, current_user.id)
         db.commit()
 
         # stamping
@@ -270,16 +396,9 @@ async def approve_document(
                 path=out
             )
             db.add(new_file)
+            changes.record_event(db, doc_id, changes.EVENT_UPLOAD, current_user.id)
             db.commit()
 
-    # 🔥🔥 TAMBAHAN: BROADCAST REALTIME (TIDAK MENGUBAH LOGIKA)
-    await manager.broadcast({
-        "event": "approval_status_changed",
-        "document_id": doc_id,
-        "user_id": current_user.id,
-        "status": "approved"
-    })
-
     return {"message": "Document approved successfully"}
 
 
@@ -320,6 +439,7 @@ def reject_document(
     approver.waktu = datetime.utcnow()
     doc.status = models.StatusEnum.rejected
 
+    changes.record_event(db, doc_id, changes.EVENT_REJECT, current_user.id)
     db.commit()
 
     # stamping reject
@@ -347,6 +467,7 @@ def reject_document(
             path=out
         )
         db.add(new_file)
+        changes.record_event(db, doc_id, changes.EVENT_UPLOAD, current_user.id)
         db.commit()
 
     return {"message": "Document rejected successfully"}
@@ -387,6 +508,7 @@ def revise_document(
     approver.waktu = datetime.utcnow()
     doc.status = models.StatusEnum.revise
 
+    changes.record_event(db, doc_id, changes.EVENT_REVISE, current_user.id)
     db.commit()
     return {"message": "Document sent back for revision"}
 
@@ -425,6 +547,7 @@ def upload_revised_file(
         path=filepath
     )
     db.add(new_file)
+    changes.record_event(db, doc.id, changes.EVENT_UPLOAD, current_user.id)
     db.commit()
 
     return {"message": "Revised file uploaded successfully"}
@@ -461,7 +584,8 @@ def edit_document(
         doc.title = request.title
     if request.content:
         doc.content = request.content
-    if request.no_surat:
+    if request.no_surat and request.no_surat != doc.no_surat:
+        validate_manual_no_surat(db, request.no_surat, doc_id=doc.id)
         doc.no_surat = request.no_surat
 
     # Reset approvers untuk review ulang
@@ -473,6 +597,7 @@ def edit_document(
     # Kembali ke status menunggu approval
     doc.status = models.StatusEnum.waiting
 
+    changes.record_event(db, doc_id, changes.EVENT_REVISE, current_user.id)
     db.commit()
     db.refresh(doc)
 
@@ -481,13 +606,13 @@ def edit_document(
 @router.get("/{doc_id}/reasons")
 def get_document_reasons(
     doc_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """
     Mengambil catatan / alasan dari approvers untuk dokumen tertentu.
     """
-    doc = db.query(models.Document).filter(models.Document.id == doc_id).first()
+    doc = archive.get_document(db, doc_id)  # fallback ke arsip
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Body, Request
 from sqlalchemy.orm import Session, aliased, joinedload
 from sqlalchemy import and_, exists, not_
 from datetime import datetime, timezone, timedelta
 from uuid import uuid4
-from .. import models, database, auth
-from .ws_manager import manager
+from .. import models, database, auth, schemas
+from ..core.responses import PreEncodedJSONResponse
+from ..services import archive, changes, versions
+from ..services import outbox
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 import asyncio
@@ -15,13 +17,15 @@ from typing import List
 # WIB TIMEZONE HELPER
 # ============================================
 WIB = timezone(timedelta(hours=7))
+_WIB_OFFSET = timedelta(hours=7)
 
 def to_wib(dt: datetime):
     if dt is None:
         return None
-    if dt.tzinfo is None:  # anggap UTC kalau tanpa tzinfo
-        dt = dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(WIB).strftime("%Y-%m-%d %H:%M:%S")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    # anggap UTC kalau tanpa tzinfo; isoformat jauh lebih cepat dari strftime
+    return (dt + _WIB_OFFSET).isoformat(sep=" ", timespec="seconds")
 
 
 # ============================================
@@ -40,76 +44,71 @@ router = APIRouter(
 # DOCUMENT → DICT (Sudah convert waktu ke WIB)
 # ============================================================
 def doc_to_dict(doc: models.Document, current_user_id: int):
+    # Hot path dashboard: satu pass per relasi, tanpa hasattr().
+    waiting = models.StatusEnum.waiting
+    doc_id = doc.id
 
-    # ---------- FILES LIST ----------
+    # ---------- FILES LIST + LAST STAMPED FILE ----------
     files_list = []
+    stamped_file_path = "<Belum Full Approved/Reject>"
     for f in doc.files:
+        filename = f.filename or ""
+        is_stamped = "stamped_" in filename or "rejected_" in filename
+        if is_stamped:
+            stamped_file_path = f.path
         if f.is_deleted:
             continue
-
         files_list.append({
             "id": f.id,
             "filename": f.filename,
             "path": f.path,
-            "is_stamped": ("stamped_" in f.filename) or ("rejected_" in f.filename),
-            "download_url": f"/documents/{doc.id}/file/{f.id}",
+            "is_stamped": is_stamped,
+            "download_url": f"/documents/{doc_id}/file/{f.id}",
         })
 
     if not files_list:
         files_list = [{"message": "Tidak ada File yang Dilampirkan"}]
 
-    # ---------- LAST STAMPED FILE ----------
-    stamped_candidates = [
-        f for f in doc.files
-        if ("stamped_" in f.filename) or ("rejected_" in f.filename)
-    ]
-    stamped_file_path = stamped_candidates[-1].path if stamped_candidates else "<Belum Full Approved/Reject>"
+    # ---------- RECIPIENTS + STATUS BACA USER ----------
+    recipients = []
+    recipient_for_user = None
+    for r in doc.recipients:
+        recipients.append(r.user.name)
+        if recipient_for_user is None and r.user_id == current_user_id:
+            recipient_for_user = r
 
-    # ---------- RECIPIENT STATUS ----------
-    recipient_for_user = next(
-        (r for r in doc.recipients if r.user_id == current_user_id),
-        None
-    )
     is_read = recipient_for_user.is_read if recipient_for_user else False
+    unread = bool(recipient_for_user and not recipient_for_user.is_read)
 
-    # ---------- UNREAD LOGIC ----------
-    unread_inbox = recipient_for_user and not recipient_for_user.is_read
-
-    unread_approval = any(
-        (hasattr(a, "has_read") and
-         a.user_id == current_user_id and
-         a.status == models.StatusEnum.waiting and
-         not a.has_read)
-        for a in doc.approvers
-    )
+    # ---------- APPROVERS + UNREAD APPROVAL ----------
+    approvers = []
+    for a in doc.approvers:
+        a_status = a.status
+        if a.user_id == current_user_id and a_status == waiting and not a.has_read:
+            unread = True
+        approvers.append({
+            "user": a.user.name,
+            "status": a_status.value if a_status is not None else None,
+            "seq_index": a.seq_index,
+            "waktu": to_wib(a.waktu),
+        })
 
-    unread = unread_inbox or unread_approval
+    creator = doc.creator
+    status = doc.status
 
     # ---------- RETURN ----------
     return {
-        "id": doc.id,
+        "id": doc_id,
         "no_surat": doc.no_surat,
         "title": doc.title,
         "content": doc.content,
-        "status": doc.status.value if hasattr(doc.status, "value") else doc.status,
-        "creator": doc.creator.name if doc.creator else None,
+        "status": status.value if status is not None else None,
+        "creator": creator.name if creator else None,
         "created_at": to_wib(doc.created_at),
-
-        "approvers": [
-            {
-                "user": a.user.name,
-                "status": a.status.value if hasattr(a.status, "value") else a.status,
-                "seq_index": a.seq_index,
-                "waktu": to_wib(a.waktu),
-            }
-            for a in doc.approvers
-        ],
-
-        "recipients": [r.user.name for r in doc.recipients],
-
+        "approvers": approvers,
+        "recipients": recipients,
         "files": files_list,
         "stamped_pdf": stamped_file_path,
-
         "is_read": is_read,
         "unread": unread,
     }
@@ -118,13 +117,19 @@ def doc_to_dict(doc: models.Document, current_user_id: int):
 # ============================================================
 # DASHBOARD
 # ============================================================
-@router.get("/dashboard")
+@router.get("/dashboard", response_class=PreEncodedJSONResponse)
 def get_dashboard(
-    db: Session = Depends(database.get_db),
+    request: Request,
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     user_id = current_user.id
 
+    # ETag dari versi tampilan user (lookup PK), sebelum query dashboard
+    etag = versions.weak_etag("dash", user_id, versions.user_view_version(db, user_id))
+    if versions.etag_matches(request, etag):
+        return versions.not_modified(etag)
+
     A1 = aliased(models.Approver)
     A2 = aliased(models.Approver)
 
@@ -223,13 +228,14 @@ def get_dashboard(
         ).all()
     )
 
-    return {
+    # bytes JSON langsung dari serializer terkompilasi (lihat schemas.DashboardOut)
+    return PreEncodedJSONResponse(schemas.dashboard_adapter.dump_json({
         "approved_by_me": [doc_to_dict(d, user_id) for d in approved_by_me],
         "my_finalized": [doc_to_dict(d, user_id) for d in my_finalized],
         "pending_but_waiting": [doc_to_dict(d, user_id) for d in pending_but_waiting],
         "ready_to_approve": [doc_to_dict(d, user_id) for d in ready_to_approve],
         "inbox": [doc_to_dict(d, user_id) for d in inbox],
-    }
+    }), headers={"ETag": etag})
 
 
 # ============================================================
@@ -251,6 +257,7 @@ def delete_from_inbox(
         raise HTTPException(status_code=404, detail="Document not found in your inbox")
 
     recipient.is_deleted = True
+    changes.record_event(db, document_id, changes.EVENT_DELETE, current_user.id, visible_to=current_user.id)
     db.commit()
     return {"message": "Document removed from inbox successfully"}
 
@@ -274,6 +281,7 @@ def delete_from_sent(
         raise HTTPException(status_code=404, detail="Document not found in your sent items")
 
     doc.is_deleted = True
+    changes.record_event(db, document_id, changes.EVENT_DELETE, current_user.id)
     db.commit()
     return {"message": "Document deleted successfully from sent items"}
 
@@ -314,6 +322,7 @@ def revise_document(
         a.waktu = None
         a.catatan = None
 
+    changes.record_event(db, document_id, changes.EVENT_REVISE, current_user.id)
     db.commit()
     db.refresh(doc)
 
@@ -349,6 +358,7 @@ def revise_upload_file(
     db.add(new_file)
 
     doc.status = models.StatusEnum.waiting
+    changes.record_event(db, document_id, changes.EVENT_UPLOAD, current_user.id)
     db.commit()
 
     return {"message": "Revised file uploaded and document resubmitted for approval"}
@@ -359,7 +369,7 @@ def revise_upload_file(
 # ============================================================
 @router.get("/trash/files")
 def get_deleted_files(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     deleted_files = (
@@ -393,7 +403,7 @@ def get_deleted_files(
 # ============================================================
 @router.get("/waiting", response_model=List[dict])
 def get_waiting_documents(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     waiting_docs = (
@@ -426,10 +436,10 @@ def get_waiting_documents(
 @router.get("/{document_id}/stamped")
 def download_stamped_pdf(
     document_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    doc = db.query(models.Document).filter(models.Document.id == document_id).first()
+    doc = archive.get_document(db, document_id)  # fallback ke arsip
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -465,19 +475,15 @@ def download_stamped_pdf(
 def download_file(
     document_id: int,
     file_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    file = db.query(models.File).filter(
-        models.File.id == file_id,
-        models.File.document_id == document_id,
-        models.File.is_deleted == False
-    ).first()
+    file = archive.get_file(db, document_id, file_id)  # fallback ke arsip
 
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    doc = db.query(models.Document).filter(models.Document.id == document_id).first()
+    doc = archive.get_document(db, document_id)
 
     allowed_users = (
         [doc.creator_id] +
@@ -523,6 +529,7 @@ def set_document_revise(
         for a in doc.approvers:
             a.catatan = request.reason
 
+    changes.record_event(db, document_id, changes.EVENT_REVISE, current_user.id)
     db.commit()
     db.refresh(doc)
 
@@ -551,16 +558,18 @@ async def mark_inbox_read(
 
     if not recipient.is_read:
         recipient.is_read = True
-        db.commit()
+        changes.record_event(db, document_id, changes.EVENT_READ, current_user.id, visible_to=current_user.id)
 
-        category = "inbox" if recipient.type == "INBOX" else "waiting"
-
-        asyncio.create_task(manager.broadcast({
+        # baris Recipient selalu kategori inbox (approver ada di tabel approvers).
+        # Tab lain milik pembaca + creator (status dibaca) yang perlu tahu.
+        creator_id = db.query(models.Document.creator_id).filter(models.Document.id == document_id).scalar()
+        outbox.publish_ws(db, {
             "type": "update_read",
             "document_id": document_id,
             "user_id": current_user.id,
-            "category": category
-        }))
+            "category": "inbox"
+        }, {current_user.id, creator_id} - {None})
+        db.commit()
 
     return {"message": "Marked as read"}
 
@@ -576,27 +585,30 @@ async def create_doc(doc_id: int, db: Session = Depends(database.get_db)):
     ).all()
 
     for r in recipients:
-        await manager.broadcast({
+        outbox.publish_ws(db, {
             "type": "new_inbox",
             "doc_id": doc_id,
             "user_id": r.user_id
-        })
+        }, [r.user_id])
+    db.commit()
 
     return {"status": "ok"}
 
 
 @router.post("/{doc_id}/waiting")
 async def add_waiting(doc_id: int, db: Session = Depends(database.get_db)):
-    approvers = db.query(models.WaitingApproval).filter(
-        models.WaitingApproval.document_id == doc_id
+    approvers = db.query(models.Approver).filter(
+        models.Approver.document_id == doc_id,
+        models.Approver.status == models.StatusEnum.waiting
     ).all()
 
     for a in approvers:
-        await manager.broadcast({
+        outbox.publish_ws(db, {
             "type": "new_waiting",
             "doc_id": doc_id,
             "user_id": a.user_id
-        })
+        }, [a.user_id])
+    db.commit()
 
     return {"status": "waiting_sent"}
 
@@ -606,7 +618,7 @@ async def add_waiting(doc_id: int, db: Session = Depends(database.get_db)):
 # ============================================================
 @router.get("/unread")
 def get_unread_documents(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
 
@@ -0,0 +1,91 @@
+# routes/internal_routes.py
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from .. import auth, database, pdf_stamp
+from ..core.metrics import prometheus_header, prometheus_histogram, prometheus_sample
+from ..core.request_metrics import metrics as request_metrics
+from ..services import backplane, notifications, outbox, revocation
+from ..utils.ws_manager import manager as ws_manager
+from . import auth_routes
+
+MASTER_KEY = os.getenv("MASTER_KEY")
+
+
+# ============================================
+# ENDPOINT STATISTIK / METRIK INTERNAL
+# ============================================
+# Berisi jumlah user & koneksi, status rate limit, deny list token, dll —
+# hanya untuk operator. Semua endpoint di router ini wajib X-MASTER-KEY
+# (Prometheus: set header lewat http_headers di scrape config).
+def require_master_key(x_master_key: str = Header(None, alias="X-MASTER-KEY")):
+    # MASTER_KEY kosong → tertutup untuk semua (bukan terbuka)
+    if not MASTER_KEY or not x_master_key or not hmac.compare_digest(x_master_key, MASTER_KEY):
+        raise HTTPException(status_code=403, detail="Forbidden: Invalid Master Key")
+
+
+router = APIRouter(tags=["internal"], dependencies=[Depends(require_master_key)])
+
+
+# 🟢 Statistik pool koneksi DB (checked out, overflow, waktu tunggu)
+@router.get("/internal/db-pool")
+def get_db_pool_stats():
+    return database.pool_stats()
+
+# 🟢 Statistik cache user terautentikasi (hit rate, invalidasi)
+@router.get("/internal/auth-cache")
+def get_auth_cache_stats():
+    return auth.principal_cache.stats()
+
+# 🟢 Statistik executor bcrypt (antrian, penolakan, latency)
+@router.get("/internal/password-hasher")
+def get_password_hasher_stats():
+    return auth.password_hasher.stats()
+
+# 🟢 Status deny list token (refresh, Bloom filter)
+@router.get("/internal/revocations")
+def get_revocation_stats():
+    return revocation.revocations.stats()
+
+# 🟢 Statistik rate limit endpoint auth
+@router.get("/internal/rate-limits")
+def get_rate_limit_stats():
+    return auth_routes.limiter.stats()
+
+# 🟢 Statistik dispatcher notifikasi (antrian, retry, latency kirim)
+@router.get("/internal/notifications")
+def get_notification_stats():
+    return notifications.dispatcher.stats()
+
+# 🟢 Metrik outbox (pending, lag, throughput)
+@router.get("/internal/outbox")
+def get_outbox_stats(db: Session = Depends(database.get_db)):
+    return outbox.worker.stats(db)
+
+# 🟢 Statistik koneksi WebSocket (user online, tab, socket mati)
+@router.get("/internal/websockets")
+def get_websocket_stats():
+    return {**ws_manager.stats(), "backplane": backplane.bus.stats()}
+
+# 🟢 Metrik format Prometheus (request, DB, stamping, WebSocket)
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    lines = request_metrics.render()
+    lines += prometheus_header("edoc_pdf_stamp_duration_seconds", "histogram", "Durasi stamping PDF")
+    lines += prometheus_histogram("edoc_pdf_stamp_duration_seconds", pdf_stamp.STAMP_SECONDS)
+
+    ws = ws_manager.stats()
+    lines += prometheus_header("edoc_realtime_connections", "gauge", "Koneksi realtime terbuka di worker ini")
+    lines.append(prometheus_sample("edoc_realtime_connections", ws["connections"] - ws["sse_connections"],
+                                   {"transport": "websocket"}))
+    lines.append(prometheus_sample("edoc_realtime_connections", ws["sse_connections"], {"transport": "sse"}))
+    lines += prometheus_header("edoc_realtime_users", "gauge", "User dengan minimal satu koneksi realtime")
+    lines.append(prometheus_sample("edoc_realtime_users", ws["users"]))
+    lines += prometheus_header("edoc_realtime_frame_bytes_total", "counter", "Byte frame terkirim per encoding")
+    for encoding, row in ws["encodings"].items():
+        lines.append(prometheus_sample("edoc_realtime_frame_bytes_total", row["bytes"], {"encoding": encoding}))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -1,28 +1,90 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, Header, HTTPException, WebSocket, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app import auth, database
+from app.utils import ws_protocol
 from app.utils.ws_manager import manager
-import asyncio
 
 router = APIRouter()
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",   # nginx: jangan buffer stream
+}
+
+
+def _authenticate(token: str):
+    with database.SessionLocal() as db:
+        return auth.authenticate_token(token, db)
+
+
 @router.websocket("/ws/unread")
-async def websocket_unread(ws: WebSocket):
-    await manager.connect(ws)
+async def websocket_unread(ws: WebSocket, token: str = "", last_seq: int | None = None,
+                           encoding: str | None = None):
+    # Browser tidak bisa kirim header Authorization di WebSocket → token lewat ?token=
+    try:
+        user = await run_in_threadpool(_authenticate, token)
+    except HTTPException:
+        await ws.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Encoding: subprotocol "edoc.msgpack.v1" / "edoc.json.v1", atau ?encoding=msgpack
+    frame_encoding, subprotocol = ws_protocol.negotiate(ws.scope.get("subprotocols"), encoding)
+    conn = await manager.connect(ws, user.id, frame_encoding, subprotocol)
+    if last_seq is not None:
+        # reconnect: kirim event yang terlewat (atau satu frame resync)
+        manager.resume(conn, last_seq)
 
     try:
+        # Tanpa timer per socket: ping server & deteksi koneksi mati ditangani
+        # HeartbeatWheel di ws_manager; di sini cukup catat kapan client terakhir aktif
         while True:
-            # Terima ping dari client (tiap 10 detik)
-            try:
-                msg = await asyncio.wait_for(ws.receive_text(), timeout=40)
-            except asyncio.TimeoutError:
-                # jika client tidak kirim apa² → kirim ping
-                await ws.send_text("ping")
-                continue
+            msg = await ws.receive_text()
+            manager.touch(conn)
 
             # Jika menerima ping → balas pong
             if msg == "ping":
-                await ws.send_text("pong")
+                manager.send(conn, "pong")
 
     except Exception:
-        await manager.disconnect(ws)
+        pass
+    finally:
+        manager.disconnect(conn)
+
+
+@router.get("/ws/protocol")
+def websocket_protocol():
+    """Tabel kode untuk client encoding msgpack (key pendek & kode event)."""
+    return {
+        "encodings": list(ws_protocol.ENCODINGS),
+        "subprotocols": ws_protocol.SUBPROTOCOLS,
+        "event_codes": ws_protocol.EVENT_CODES,
+        "key_codes": ws_protocol.KEY_CODES,
+        "key_aliases": ws_protocol.KEY_ALIASES,
+    }
+
+
+# ============================================================
+# SSE: stream unread yang sama lewat HTTP biasa (untuk proxy yang
+# memutus WebSocket idle). Event, seq & replay sama dengan /ws/unread;
+# keep-alive berupa komentar ": keep-alive" dari HeartbeatWheel.
+# ============================================================
+@router.get("/sse/unread")
+async def sse_unread(
+    token: str = "",
+    last_seq: int | None = None,
+    last_event_id: str | None = Header(None),
+):
+    # EventSource juga tidak bisa kirim header Authorization → ?token=
+    user = await run_in_threadpool(_authenticate, token)
 
+    conn = manager.connect_stream(user.id)
+    # reconnect otomatis EventSource mengirim Last-Event-ID = seq terakhir
+    resume_from = last_event_id if last_event_id is not None else last_seq
+    if resume_from is not None:
+        try:
+            manager.resume(conn, int(resume_from))
+        except ValueError:
+            manager.resume(conn, -1)   # id tidak dikenal → resync
 
+    return StreamingResponse(manager.sse_frames(conn), media_type="text/event-stream", headers=SSE_HEADERS)
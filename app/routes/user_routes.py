@@ -20,6 +20,7 @@ def delete_own_account(
 
     # Hapus user dari database
     db.delete(user)
+    auth.revoke_sessions(db, current_user.id)
     db.commit()
 
     return {"message": f"User '{current_user.email}' has been deleted successfully"}
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
+from pydantic import BaseModel, ConfigDict, EmailStr, HttpUrl, TypeAdapter
 from typing import List, Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 from enum import Enum
 
@@ -27,8 +28,7 @@ class UserOut(UserBase):
     id: int
     created_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ================= APPROVER SCHEMAS =================
@@ -39,16 +39,14 @@ class ApproverOut(BaseModel):
     waktu: Optional[datetime]
     catatan: Optional[str]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ================= RECIPIENT SCHEMAS =================
 class RecipientOut(BaseModel):
     user_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ================= FILE SCHEMAS =================
@@ -57,8 +55,7 @@ class FileOut(BaseModel):
     filename: str
     path: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ================= DOCUMENT SCHEMAS =================
@@ -80,5 +77,51 @@ class DocumentOut(BaseModel):
     recipients: Optional[List[RecipientOut]] = []
     files: Optional[List[FileOut]] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ================= DASHBOARD (wire format) =================
+# TypedDict + TypeAdapter: skema serializer dikompilasi sekali di
+# pydantic-core, lalu list dokumen langsung di-dump ke bytes JSON
+# (tanpa jsonable_encoder / json.dumps bawaan FastAPI).
+class DashboardApprover(TypedDict):
+    user: Optional[str]
+    status: Optional[str]
+    seq_index: Optional[int]
+    waktu: Optional[str]
+
+
+class DashboardFile(TypedDict):
+    id: NotRequired[int]
+    filename: NotRequired[str]
+    path: NotRequired[str]
+    is_stamped: NotRequired[bool]
+    download_url: NotRequired[str]
+    message: NotRequired[str]   # placeholder kalau tidak ada file
+
+
+class DashboardDocument(TypedDict):
+    id: int
+    no_surat: Optional[str]
+    title: Optional[str]
+    content: Optional[str]
+    status: Optional[str]
+    creator: Optional[str]
+    created_at: Optional[str]
+    approvers: List[DashboardApprover]
+    recipients: List[Optional[str]]
+    files: List[DashboardFile]
+    stamped_pdf: Optional[str]
+    is_read: Optional[bool]
+    unread: bool
+
+
+class DashboardOut(TypedDict):
+    approved_by_me: List[DashboardDocument]
+    my_finalized: List[DashboardDocument]
+    pending_but_waiting: List[DashboardDocument]
+    ready_to_approve: List[DashboardDocument]
+    inbox: List[DashboardDocument]
+
+
+dashboard_adapter = TypeAdapter(DashboardOut)
@@ -0,0 +1,127 @@
+# app/services/archive.py
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models, database
+from . import outbox
+
+
+# ============================================
+# ARSIP DOKUMEN FINAL (hot/cold)
+# ============================================
+# Dokumen Disetujui/Ditolak yang lebih tua dari N hari dipindah (beserta
+# approvers, recipients, files) ke tabel *_archive, per batch dalam satu
+# transaksi. File di disk tidak dipindah; path tetap sama.
+#
+# Jalankan berkala (cron / railway job):
+#   python -m app.services.archive --days 365 --batch 500
+FINAL_STATUSES = (models.StatusEnum.approved, models.StatusEnum.rejected)
+
+# (tabel kerja, tabel arsip) — anak dulu saat delete, induk dulu saat insert
+CHILD_TABLES = (
+    (models.Approver, models.ArchivedApprover),
+    (models.Recipient, models.ArchivedRecipient),
+    (models.File, models.ArchivedFile),
+)
+
+
+def _copy_rows(db: Session, source, target, where):
+    cols = [c.name for c in source.__table__.columns]
+    db.execute(
+        insert(target.__table__).from_select(
+            cols, select(*[source.__table__.c[name] for name in cols]).where(where)
+        )
+    )
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = 500) -> int:
+    """Pindahkan satu batch dokumen ke arsip. Return jumlah dokumen dipindah."""
+    doc_ids = [
+        doc_id for (doc_id,) in db.query(models.Document.id)
+        .filter(
+            models.Document.status.in_(FINAL_STATUSES),
+            models.Document.created_at < cutoff,
+        )
+        .order_by(models.Document.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ]
+    if not doc_ids:
+        return 0
+
+    try:
+        # dokumen hilang dari dashboard peserta → naikkan versi tampilan mereka
+        # (ETag) lewat outbox, dihitung worker dari tabel arsip
+        outbox.publish_view_bump(db, doc_ids)
+        _copy_rows(db, models.Document, models.ArchivedDocument, models.Document.id.in_(doc_ids))
+        for source, target in CHILD_TABLES:
+            _copy_rows(db, source, target, source.document_id.in_(doc_ids))
+
+        for source, _ in CHILD_TABLES:
+            db.execute(delete(source).where(source.document_id.in_(doc_ids)))
+        db.execute(delete(models.Document).where(models.Document.id.in_(doc_ids)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(doc_ids)
+
+
+def archive_finalized_documents(older_than_days: int = 365, batch_size: int = 500, pause: float = 0.0) -> int:
+    """Arsipkan semua dokumen final yang lebih tua dari older_than_days."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    with database.SessionLocal() as db:
+        while True:
+            moved = archive_batch(db, cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            print(f"📦 Diarsipkan {moved} dokumen (total {total})")
+            if pause:
+                # beri jeda supaya replikasi & request lain tidak tertahan
+                time.sleep(pause)
+    return total
+
+
+# ============================================
+# LOOKUP DENGAN FALLBACK KE ARSIP
+# ============================================
+def get_document(db: Session, doc_id: int):
+    """Document dari tabel kerja, atau ArchivedDocument kalau sudah diarsip."""
+    doc = db.query(models.Document).filter(models.Document.id == doc_id).first()
+    if doc is None:
+        doc = db.query(models.ArchivedDocument).filter(models.ArchivedDocument.id == doc_id).first()
+    return doc
+
+
+def get_file(db: Session, document_id: int, file_id: int):
+    file = db.query(models.File).filter(
+        models.File.id == file_id,
+        models.File.document_id == document_id,
+        models.File.is_deleted == False
+    ).first()
+    if file is None:
+        file = db.query(models.ArchivedFile).filter(
+            models.ArchivedFile.id == file_id,
+            models.ArchivedFile.document_id == document_id,
+            models.ArchivedFile.is_deleted == False
+        ).first()
+    return file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arsipkan dokumen final yang sudah lama")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0)
+    args = parser.parse_args()
+
+    archive_tables = [m.__table__ for m in (models.ArchivedDocument, *(t for _, t in CHILD_TABLES))]
+    database.Base.metadata.create_all(bind=database.engine, tables=archive_tables)
+    moved = archive_finalized_documents(args.days, args.batch, args.pause)
+    print(f"✅ Selesai, {moved} dokumen dipindah ke arsip")
@@ -0,0 +1,259 @@
+# app/services/backplane.py
+import abc
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import delete, func, or_, select
+
+from .. import models, database
+from ..core.metrics import Histogram
+
+
+# ============================================
+# BACKPLANE EVENT WEBSOCKET ANTAR WORKER
+# ============================================
+# Socket user bisa tersambung ke worker/host mana saja, sedangkan event
+# dipublish oleh worker yang kebetulan menguras outbox. Backplane membawa
+# event ke SEMUA worker (masing-masing menerima sekali), lalu tiap worker
+# meneruskan ke socket lokalnya lewat ConnectionManager.publish.
+#   local : in-process (satu worker uvicorn) — default
+#   sql   : tabel ws_events di DB utama, dibaca tiap worker (id > cursor).
+#           Bisa dicoba lokal dengan SQLite sebagai pengganti MySQL.
+# Pilih lewat WS_BACKPLANE.
+WS_BACKPLANE = os.getenv("WS_BACKPLANE", "local")
+WS_BACKPLANE_POLL_SECONDS = float(os.getenv("WS_BACKPLANE_POLL_SECONDS", "0.1"))
+WS_BACKPLANE_BATCH_SIZE = int(os.getenv("WS_BACKPLANE_BATCH_SIZE", "500"))
+# baris ws_events lebih tua dari ini dihapus (worker yang tertinggal lebih jauh
+# kehilangan event → client akan resync sendiri)
+WS_BACKPLANE_RETAIN_SECONDS = float(os.getenv("WS_BACKPLANE_RETAIN_SECONDS", "60"))
+# id autoincrement bisa ter-commit tidak berurutan; id yang "bolong" ditunggu selama ini.
+# Event sesudah lubang ditahan sampai lubang terisi / habis waktunya, jadi seq
+# yang diterima ConnectionManager selalu naik (buffer replay & ?last_seq= bergantung
+# pada urutan ini). Baris yang baru muncul setelah lubangnya ditinggalkan hilang.
+WS_BACKPLANE_GAP_SECONDS = float(os.getenv("WS_BACKPLANE_GAP_SECONDS", "5"))
+
+# bucket latency publish → diterima worker (detik)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Backplane(abc.ABC):
+    """deliver(user_ids, message, seq) dipanggil di event loop worker untuk tiap
+    event, urut seq naik. seq sama di semua worker dan tidak pernah mundur
+    walau proses restart (dasar replay ?last_seq=)."""
+
+    def __init__(self):
+        self._loop = None
+        self._deliver = None
+        self.published = 0
+        self.received = 0
+        self.dropped = 0   # event datang sebelum start() / sesudah stop()
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+    def start(self, loop: asyncio.AbstractEventLoop, deliver) -> int:
+        """Mulai menerima event. Return seq terakhir sebelum worker ini mulai."""
+        self._loop = loop
+        self._deliver = deliver
+        return 0
+
+    def stop(self):
+        self._loop = None
+
+    @abc.abstractmethod
+    def publish(self, user_ids, message: dict):
+        """Thread-safe; dipanggil dari worker outbox."""
+
+    def _schedule(self, events):
+        # events: list (seq, user_ids, message, published_at)
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.dropped += len(events)
+            return
+        loop.call_soon_threadsafe(self._on_events, events)
+
+    def _on_events(self, events):
+        now = time.time()
+        for seq, user_ids, message, published_at in events:
+            self.received += 1
+            self.latency.observe(max(0.0, now - published_at))
+            self._deliver(user_ids, message, seq)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "delivery_latency_seconds": self.latency.snapshot(),
+        }
+
+
+class LocalBackplane(Backplane):
+    """Satu proses. seq = waktu start proses (mikrodetik epoch) + nomor urut,
+    jadi proses baru selalu mulai di atas seq proses sebelumnya dan client
+    dengan last_seq lama mendapat resync, bukan replay yang salah."""
+
+    def __init__(self):
+        super().__init__()
+        self.base = time.time_ns() // 1000
+        self._seq = itertools.count(self.base + 1)   # next() atomik di CPython
+
+    def start(self, loop, deliver):
+        super().start(loop, deliver)
+        return self.base
+
+    def publish(self, user_ids, message):
+        self.published += 1
+        self._schedule([(next(self._seq), list(user_ids), message, time.time())])
+
+
+class SQLBackplane(Backplane):
+    """Event ditulis ke ws_events; thread poller di tiap worker membaca baris
+    baru. Latency ≈ WS_BACKPLANE_POLL_SECONDS (worker penerbit dibangunkan
+    langsung)."""
+
+    def __init__(self, session_factory=None, poll_seconds: float = WS_BACKPLANE_POLL_SECONDS,
+                 batch_size: int = WS_BACKPLANE_BATCH_SIZE, retain_seconds: float = WS_BACKPLANE_RETAIN_SECONDS,
+                 gap_seconds: float = WS_BACKPLANE_GAP_SECONDS):
+        super().__init__()
+        self._session_factory = session_factory or database.SessionLocal
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.retain_seconds = retain_seconds
+        self.gap_seconds = gap_seconds
+        self._cursor = 0
+        self._gaps: dict[int, float] = {}   # id bolong → monotonic pertama terlihat
+        self._held: dict[int, tuple] = {}   # event di belakang lubang, menunggu dikirim urut
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._last_prune = time.monotonic()
+        self.polls = 0
+        self.poll_errors = 0
+
+    # ---------- lifecycle ----------
+    def start(self, loop, deliver):
+        super().start(loop, deliver)
+        if self._thread is not None:
+            return self._cursor
+        # mulai dari event terbaru; event sebelum worker hidup tidak relevan
+        with self._session_factory() as db:
+            self._cursor = db.execute(select(func.max(models.WSEvent.id))).scalar() or 0
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ws-backplane", daemon=True)
+        self._thread.start()
+        return self._cursor
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+        super().stop()
+
+    # ---------- publish ----------
+    def publish(self, user_ids, message):
+        with self._session_factory() as db:
+            db.add(models.WSEvent(
+                user_ids=json.dumps(sorted(set(user_ids))),
+                payload=json.dumps(message),
+                published_at=time.time(),
+            ))
+            db.commit()
+        self.published += 1
+        self._wakeup.set()
+
+    # ---------- poll ----------
+    def _run(self):
+        while not self._stopping:
+            try:
+                fetched = self.poll_once()
+            except Exception as e:
+                self.poll_errors += 1
+                print("❌ Backplane poll error:", e)
+                fetched = 0
+            if fetched < self.batch_size:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def poll_once(self) -> int:
+        now = time.monotonic()
+        # id bolong yang terlalu lama = rollback / insert gagal, tidak akan muncul
+        for gap_id, seen in list(self._gaps.items()):
+            if now - seen > self.gap_seconds:
+                del self._gaps[gap_id]
+
+        condition = models.WSEvent.id > self._cursor
+        if self._gaps:
+            condition = or_(condition, models.WSEvent.id.in_(list(self._gaps)))
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(models.WSEvent.id, models.WSEvent.user_ids, models.WSEvent.payload,
+                       models.WSEvent.published_at)
+                .where(condition)
+                .order_by(models.WSEvent.id)
+                .limit(self.batch_size)
+            ).all()
+            if now - self._last_prune > self.retain_seconds:
+                self._last_prune = now
+                db.execute(delete(models.WSEvent).where(
+                    models.WSEvent.published_at < time.time() - self.retain_seconds
+                ))
+                db.commit()
+        self.polls += 1
+
+        for row_id, user_ids, payload, published_at in rows:
+            if row_id <= self._cursor:
+                if self._gaps.pop(row_id, None) is None:
+                    continue   # sudah diterima
+            else:
+                for missing in range(self._cursor + 1, row_id):
+                    self._gaps[missing] = now
+                self._cursor = row_id
+            self._held[row_id] = (row_id, json.loads(user_ids), json.loads(payload), published_at)
+
+        # kirim urut sampai sebelum lubang terkecil yang masih ditunggu
+        limit = min(self._gaps, default=self._cursor + 1)
+        ready = sorted(row_id for row_id in self._held if row_id < limit)
+        if ready:
+            self._schedule([self._held.pop(row_id) for row_id in ready])
+        return len(rows)
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "cursor": self._cursor,
+            "pending_gaps": len(self._gaps),
+            "held_events": len(self._held),
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+        }
+
+
+def create_backplane(backend: str = WS_BACKPLANE) -> Backplane:
+    if backend == "local":
+        return LocalBackplane()
+    if backend == "sql":
+        return SQLBackplane()
+    raise ValueError(f"WS_BACKPLANE tidak dikenal: {backend}")
+
+
+bus = create_backplane()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hapus baris ws_events lama")
+    parser.add_argument("--retain-seconds", type=float, default=WS_BACKPLANE_RETAIN_SECONDS)
+    args = parser.parse_args()
+
+    with database.SessionLocal() as session:
+        result = session.execute(delete(models.WSEvent).where(
+            models.WSEvent.published_at < time.time() - args.retain_seconds
+        ))
+        session.commit()
+    print(f"✅ {result.rowcount} event backplane lama dihapus")
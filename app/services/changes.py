@@ -0,0 +1,167 @@
+# app/services/changes.py
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_, select, union
+from sqlalchemy.orm import Session
+
+from .. import models, database
+from . import outbox, versions
+
+
+# ============================================
+# CHANGE FEED (document_events)
+# ============================================
+# Setiap mutasi dokumen menulis satu baris event di transaksi yang sama.
+# Client menyimpan cursor (id event terakhir) lalu memanggil
+# /documents/changes?since=<cursor> untuk ambil delta saja.
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "200"))
+# Cursor yang tertinggal lebih jauh dari ini → suruh client full resync
+CHANGES_MAX_GAP = int(os.getenv("CHANGES_MAX_GAP", "5000"))
+# Event lebih tua dari ini dihapus oleh compact_events()
+CHANGES_RETAIN_DAYS = int(os.getenv("CHANGES_RETAIN_DAYS", "7"))
+# id autoincrement bisa ter-commit tidak berurutan: event yang lebih muda dari
+# ini belum "settle" (id lebih kecil mungkin masih di transaksi yang belum
+# commit), jadi cursor tidak pernah dimajukan melewatinya. Event tersebut
+# tetap dikirim, dan dikirim ulang di poll berikutnya (client cukup idempoten).
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "5"))
+
+EVENT_CREATE = "create"
+EVENT_UPLOAD = "upload"
+EVENT_ASSIGN = "assign"
+EVENT_APPROVE = "approve"
+EVENT_REJECT = "reject"
+EVENT_REVISE = "revise"
+EVENT_FINALIZE = "finalize"   # status final + file stamping selesai
+EVENT_READ = "read"
+EVENT_DELETE = "delete"
+
+
+def record_event(db: Session, document_id: int, event_type: str, actor_id: int | None = None,
+                 visible_to: int | None = None):
+    """Tambah event ke session (tanpa commit) — ikut transaksi perubahan statusnya.
+
+    visible_to diisi untuk event pribadi (read, hapus dari inbox).
+    Sekalian menaikkan versi dokumen/tampilan user untuk ETag.
+    """
+    db.add(models.DocumentEvent(
+        document_id=document_id,
+        event_type=event_type,
+        actor_id=actor_id,
+        visible_to=visible_to,
+    ))
+    versions.bump_document(db, document_id, visible_to)
+    if visible_to is None:
+        outbox.publish_view_bump(db, [document_id])
+
+
+def _participant_docs(user_id: int):
+    """Semua dokumen tempat user jadi creator/approver/recipient (termasuk yang sudah dihapus
+    dari inbox, supaya event penghapusannya tetap sampai)."""
+    return union(
+        select(models.Document.id).where(models.Document.creator_id == user_id),
+        select(models.Approver.document_id).where(models.Approver.user_id == user_id),
+        select(models.Recipient.document_id).where(models.Recipient.user_id == user_id),
+    )
+
+
+def document_audience(db: Session, document_id: int) -> set[int]:
+    """User yang ikut dokumen (creator, approver, recipient) — target push realtime."""
+    rows = db.execute(union(
+        select(models.Document.creator_id).where(models.Document.id == document_id),
+        select(models.Approver.user_id).where(models.Approver.document_id == document_id),
+        select(models.Recipient.user_id).where(models.Recipient.document_id == document_id),
+    )).scalars()
+    return {user_id for user_id in rows if user_id is not None}
+
+
+def _settled_cursor(db: Session, since: int) -> int:
+    """Cursor tertinggi yang aman: id terbesar yang sudah lewat jendela settle.
+    id yang dialokasikan sesudah itu (termasuk yang belum commit) pasti lebih besar."""
+    cutoff = datetime.utcnow() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    settled = db.query(func.max(models.DocumentEvent.id)).filter(
+        models.DocumentEvent.id > since,
+        models.DocumentEvent.created_at <= cutoff,
+    ).scalar()
+    return settled or since
+
+
+def get_changes(db: Session, user_id: int, since: int, limit: int = CHANGES_PAGE_SIZE):
+    """Event sesudah cursor `since` yang terlihat oleh user.
+
+    Return dict: resync (client harus reload dashboard), cursor baru,
+    events, document_ids yang berubah, has_more.
+    """
+    limit = max(1, min(limit, CHANGES_PAGE_SIZE))
+    min_id, max_id = db.query(
+        func.min(models.DocumentEvent.id), func.max(models.DocumentEvent.id)
+    ).one()
+    max_id = max_id or 0
+
+    # cursor kosong, event di antaranya sudah dipadatkan, atau terlalu jauh tertinggal
+    evicted = min_id is not None and since < min_id - 1
+    if since <= 0 or evicted or since > max_id or max_id - since > CHANGES_MAX_GAP:
+        return {"resync": True, "cursor": max_id, "events": [], "document_ids": [], "has_more": False}
+
+    rows = (
+        db.query(models.DocumentEvent)
+        .filter(
+            models.DocumentEvent.id > since,
+            or_(
+                models.DocumentEvent.visible_to == user_id,
+                and_(
+                    models.DocumentEvent.visible_to.is_(None),
+                    models.DocumentEvent.document_id.in_(_participant_docs(user_id)),
+                ),
+            ),
+        )
+        .order_by(models.DocumentEvent.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Tanpa event terlihat: cursor boleh loncat ke max_id (event orang lain
+    # dilewati), tapi tidak melewati event yang belum settle
+    cursor = rows[-1].id if has_more else max_id
+    settled = _settled_cursor(db, since)
+    if cursor > settled:
+        cursor = settled
+        # sisa halaman diambil lagi di poll berikutnya, bukan lewat paging
+        has_more = False
+    return {
+        "resync": False,
+        "cursor": cursor,
+        "events": rows,
+        "document_ids": list(dict.fromkeys(e.document_id for e in rows)),
+        "has_more": has_more,
+    }
+
+
+def compact_events(db: Session, retain_days: int = CHANGES_RETAIN_DAYS) -> int:
+    """Hapus event lama. Event terbaru selalu disisakan supaya min(id)
+    tetap menandai batas cursor yang masih bisa dilayani."""
+    cutoff = datetime.utcnow() - timedelta(days=retain_days)
+    max_id = db.query(func.max(models.DocumentEvent.id)).scalar()
+    if max_id is None:
+        return 0
+    result = db.execute(
+        delete(models.DocumentEvent).where(
+            models.DocumentEvent.created_at < cutoff,
+            models.DocumentEvent.id < max_id,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Padatkan log document_events")
+    parser.add_argument("--days", type=int, default=CHANGES_RETAIN_DAYS)
+    args = parser.parse_args()
+
+    with database.SessionLocal() as session:
+        removed = compact_events(session, args.days)
+    print(f"✅ {removed} event lama dihapus")
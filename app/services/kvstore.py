@@ -0,0 +1,294 @@
+# app/services/kvstore.py
+import abc
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from .. import models, database
+
+
+# ============================================
+# KV STORE DENGAN TTL (OTP, reset token, dll)
+# ============================================
+# Interface kecil: get / set / set_if_absent / delete / pop / compare_and_swap.
+# Nilai harus JSON-serializable. Dua implementasi:
+#   memory : dict in-process (lazy expiry + sweeper thread) — satu worker / dev
+#   sql    : tabel kv_store di DB utama — aman untuk banyak worker uvicorn
+# Pilih lewat KV_BACKEND (default sql).
+KV_BACKEND = os.getenv("KV_BACKEND", "sql")
+KV_SWEEP_SECONDS = float(os.getenv("KV_SWEEP_SECONDS", "60"))
+# percobaan upsert generik (UPDATE lalu INSERT) kalau kalah balapan INSERT
+KV_SET_ATTEMPTS = 3
+
+
+class KVStore(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value, ttl: float):
+        ...
+
+    @abc.abstractmethod
+    def set_if_absent(self, key: str, value, ttl: float) -> bool:
+        """Simpan hanya kalau key belum ada (atau sudah kedaluwarsa). True kalau tersimpan."""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def pop(self, key: str):
+        """Ambil lalu hapus secara atomik (kode sekali pakai). None kalau tidak ada."""
+
+    @abc.abstractmethod
+    def compare_and_swap(self, key: str, expected, value, ttl: float) -> bool:
+        """Ganti nilai hanya kalau nilai sekarang == expected (None = belum ada).
+        Dasar update read-modify-write antar worker (mis. token bucket)."""
+
+    @abc.abstractmethod
+    def sweep(self) -> int:
+        """Hapus entry kedaluwarsa. Return jumlah yang dihapus."""
+
+
+class MemoryKVStore(KVStore):
+    def __init__(self, sweep_seconds: float = KV_SWEEP_SECONDS):
+        self._data: dict = {}  # key → (expires_at monotonic, value)
+        self._lock = threading.Lock()
+        self._sweep_seconds = sweep_seconds
+        self._sweeper = None
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+        return None if entry is None else entry[1]
+
+    def set(self, key, value, ttl):
+        self._start_sweeper()
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def set_if_absent(self, key, value, ttl):
+        self._start_sweeper()
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._data[key] = (now + ttl, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            if entry is None:
+                return None
+            del self._data[key]
+            return entry[1]
+
+    def compare_and_swap(self, key, expected, value, ttl):
+        self._start_sweeper()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(key, now)
+            if (None if entry is None else entry[1]) != expected:
+                return False
+            self._data[key] = (now + ttl, value)
+            return True
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+    def _start_sweeper(self):
+        if self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self._sweep_seconds)
+                    self.sweep()
+
+            self._sweeper = threading.Thread(target=loop, name="kv-sweeper", daemon=True)
+            self._sweeper.start()
+
+
+class SQLKVStore(KVStore):
+    """KV di tabel kv_store. Setiap operasi pakai session & transaksi sendiri,
+    jadi tidak ikut (dan tidak mengunci) transaksi request."""
+
+    def __init__(self, session_factory=None, sweep_seconds: float = KV_SWEEP_SECONDS):
+        self._session_factory = session_factory or database.SessionLocal
+        self._sweep_seconds = sweep_seconds
+        self._last_sweep = time.monotonic()
+
+    def get(self, key):
+        with self._session_factory() as db:
+            raw = db.execute(
+                select(models.KVEntry.value).where(
+                    models.KVEntry.key == key,
+                    models.KVEntry.expires_at > datetime.utcnow(),
+                )
+            ).scalar()
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        row = {
+            "key": key,
+            "value": json.dumps(value),
+            "expires_at": datetime.utcnow() + timedelta(seconds=ttl),
+        }
+        with self._session_factory() as db:
+            stmt = self._upsert(db.get_bind().dialect.name, row)
+            if stmt is None:
+                self._set_generic(db, row)
+            else:
+                db.execute(stmt)
+                db.commit()
+        self._maybe_sweep()
+
+    @staticmethod
+    def _upsert(dialect: str, row: dict):
+        """Upsert satu statement untuk MySQL/SQLite; None untuk dialect lain."""
+        table = models.KVEntry.__table__
+        if dialect == "mysql":
+            stmt = mysql.insert(table).values(row)
+            return stmt.on_duplicate_key_update(value=stmt.inserted.value, expires_at=stmt.inserted.expires_at)
+        if dialect == "sqlite":
+            stmt = sqlite.insert(table).values(row)
+            return stmt.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at},
+            )
+        return None
+
+    @staticmethod
+    def _set_generic(db, row: dict, attempts: int = KV_SET_ATTEMPTS):
+        """Upsert portabel: UPDATE dulu, INSERT kalau belum ada; INSERT yang
+        kalah balapan dengan worker lain (IntegrityError) diulang dari UPDATE."""
+        for _ in range(attempts):
+            result = db.execute(
+                update(models.KVEntry)
+                .where(models.KVEntry.key == row["key"])
+                .values(value=row["value"], expires_at=row["expires_at"])
+            )
+            if result.rowcount == 0:
+                db.add(models.KVEntry(**row))
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                db.rollback()
+        raise RuntimeError(f"Gagal menyimpan key kv_store {row['key']!r} setelah {attempts} percobaan")
+
+    def set_if_absent(self, key, value, ttl):
+        now = datetime.utcnow()
+        with self._session_factory() as db:
+            # entry kedaluwarsa dianggap tidak ada
+            db.execute(delete(models.KVEntry).where(models.KVEntry.key == key, models.KVEntry.expires_at <= now))
+            db.add(models.KVEntry(key=key, value=json.dumps(value), expires_at=now + timedelta(seconds=ttl)))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return False
+        self._maybe_sweep()
+        return True
+
+    def delete(self, key):
+        with self._session_factory() as db:
+            db.execute(delete(models.KVEntry).where(models.KVEntry.key == key))
+            db.commit()
+
+    def pop(self, key):
+        with self._session_factory() as db:
+            raw = db.execute(
+                select(models.KVEntry.value).where(
+                    models.KVEntry.key == key,
+                    models.KVEntry.expires_at > datetime.utcnow(),
+                )
+            ).scalar()
+            if raw is None:
+                return None
+            # compare-and-delete: hanya satu pemanggil yang berhasil menghapus nilai ini
+            result = db.execute(
+                delete(models.KVEntry).where(models.KVEntry.key == key, models.KVEntry.value == raw)
+            )
+            db.commit()
+        return json.loads(raw) if result.rowcount == 1 else None
+
+    def compare_and_swap(self, key, expected, value, ttl):
+        if expected is None:
+            return self.set_if_absent(key, value, ttl)
+        with self._session_factory() as db:
+            # expected dibandingkan dalam bentuk JSON, sama seperti saat disimpan
+            result = db.execute(
+                update(models.KVEntry)
+                .where(
+                    models.KVEntry.key == key,
+                    models.KVEntry.value == json.dumps(expected),
+                    models.KVEntry.expires_at > datetime.utcnow(),
+                )
+                .values(value=json.dumps(value), expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+            )
+            db.commit()
+        return result.rowcount == 1
+
+    def sweep(self):
+        with self._session_factory() as db:
+            result = db.execute(delete(models.KVEntry).where(models.KVEntry.expires_at <= datetime.utcnow()))
+            db.commit()
+        return result.rowcount
+
+    def _maybe_sweep(self):
+        # pembersihan oportunistik; tidak perlu cron terpisah
+        if time.monotonic() - self._last_sweep < self._sweep_seconds:
+            return
+        self._last_sweep = time.monotonic()
+        self.sweep()
+
+
+def create_store(backend: str = KV_BACKEND) -> KVStore:
+    if backend == "memory":
+        return MemoryKVStore()
+    if backend == "sql":
+        return SQLKVStore()
+    raise ValueError(f"KV_BACKEND tidak dikenal: {backend}")
+
+
+store = create_store()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hapus entry kv_store yang sudah kedaluwarsa")
+    parser.parse_args()
+
+    removed = SQLKVStore().sweep()
+    print(f"✅ {removed} entry kedaluwarsa dihapus")
@@ -0,0 +1,172 @@
+# app/services/no_surat.py
+import os
+import re
+import string
+import threading
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from .. import models, database
+
+
+# ============================================
+# ALOKASI NOMOR SURAT (tabel sequence + blok)
+# ============================================
+# NO_SURAT_FORMAT     : format nomor, field: {prefix}, {year}, {seq}
+# NO_SURAT_PREFIX     : prefix bebas, mis. "TJIS/"
+# NO_SURAT_YEAR_RESET : "1" → urutan mulai dari 1 lagi tiap tahun
+#                       (format wajib memuat {year}, kalau tidak nomor tahun
+#                       baru bentrok dengan tahun lalu)
+# NO_SURAT_BLOCK_SIZE : jumlah nomor yang dipesan sekaligus per worker.
+#                       Blok > 1 berarti nomor sisa hilang (gap) saat worker restart.
+DEFAULT_FORMAT = "{prefix}{seq:010d}"
+
+
+def _format_fields(fmt: str) -> set:
+    return {field for _, field, _, _ in string.Formatter().parse(fmt) if field is not None}
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class NoSuratAllocator:
+    """Bagikan nomor surat unik tanpa membaca baris dokumen terakhir.
+
+    Setiap worker memesan blok N nomor lewat satu UPDATE atomik di
+    document_sequences, lalu membagikannya dari memori.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        name: str = "no_surat",
+        block_size: int = 10,
+        prefix: str = "",
+        fmt: str = DEFAULT_FORMAT,
+        year_reset: bool = False,
+    ):
+        fields = _format_fields(fmt)
+        if "seq" not in fields:
+            raise ValueError(f"NO_SURAT_FORMAT harus memuat {{seq}}: {fmt!r}")
+        if year_reset and "year" not in fields:
+            raise ValueError(
+                f"NO_SURAT_YEAR_RESET=1 butuh {{year}} di NO_SURAT_FORMAT, "
+                f"kalau tidak nomor tahun baru sama dengan tahun lalu: {fmt!r}"
+            )
+        self.session_factory = session_factory or database.SessionLocal
+        self.name = name
+        self.block_size = max(1, block_size)
+        self.prefix = prefix
+        self.fmt = fmt
+        self.year_reset = year_reset
+        self._period = None
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            block_size=int(os.getenv("NO_SURAT_BLOCK_SIZE", "10")),
+            prefix=os.getenv("NO_SURAT_PREFIX", ""),
+            fmt=os.getenv("NO_SURAT_FORMAT", DEFAULT_FORMAT),
+            year_reset=os.getenv("NO_SURAT_YEAR_RESET", "0") == "1",
+        )
+
+    def current_period(self) -> int:
+        return datetime.utcnow().year if self.year_reset else 0
+
+    def allocate(self) -> str:
+        period = self.current_period()
+        with self._lock:
+            if period != self._period or self._next >= self._end:
+                self._next, self._end = self._reserve_block(period)
+                self._period = period
+            seq = self._next
+            self._next += 1
+        return self.format(seq, period)
+
+    def format(self, seq: int, period: int) -> str:
+        year = period or datetime.utcnow().year
+        return self.fmt.format(prefix=self.prefix, year=year, seq=seq)
+
+    def is_reserved(self, number: str) -> bool:
+        """True kalau nomor berbentuk nomor allocator (tahun mana pun) —
+        nomor manual seperti ini bisa bentrok dengan blok yang belum dibagikan."""
+        return self._number_pattern(0)[0].fullmatch(number) is not None
+
+    def _reserve_block(self, period: int) -> tuple[int, int]:
+        seq_table = models.DocumentSequence
+        where = (seq_table.name == self.name, seq_table.period == period)
+
+        with self.session_factory() as db:
+            for _ in range(3):
+                # UPDATE dulu: row lock dipegang hanya sepanjang transaksi pendek ini
+                result = db.execute(
+                    update(seq_table)
+                    .where(*where)
+                    .values(next_value=seq_table.next_value + self.block_size)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    end = db.execute(select(seq_table.next_value).where(*where)).scalar_one()
+                    db.commit()
+                    return end - self.block_size, end
+
+                # Baris belum ada (pertama kali / tahun baru)
+                start = self._initial_value(db, period)
+                db.add(seq_table(name=self.name, period=period, next_value=start + self.block_size))
+                try:
+                    db.commit()
+                    return start, start + self.block_size
+                except IntegrityError:
+                    # worker lain sudah membuat baris duluan → ulangi lewat UPDATE
+                    db.rollback()
+
+        raise RuntimeError(f"Gagal memesan blok nomor surat untuk '{self.name}'")
+
+    def _number_pattern(self, period: int) -> tuple[re.Pattern, str]:
+        """Regex (group "seq") + pola LIKE untuk nomor berformat self.fmt pada period ini."""
+        regex, like = [], []
+        for literal, field, _, _ in string.Formatter().parse(self.fmt):
+            regex.append(re.escape(literal))
+            like.append(_like_escape(literal))
+            if field is None:
+                continue
+            if field == "seq":
+                regex.append(r"(?P<seq>\d+)")
+                like.append("%")
+            elif field == "year":
+                # period 0: nomor lama dari tahun mana pun tetap satu urutan
+                regex.append(str(period) if period else r"\d{4}")
+                like.append(str(period) if period else "%")
+            elif field == "prefix":
+                regex.append(re.escape(self.prefix))
+                like.append(_like_escape(self.prefix))
+            else:
+                regex.append(".*?")
+                like.append("%")
+        return re.compile("".join(regex)), "".join(like)
+
+    def _initial_value(self, db, period: int) -> int:
+        """Saat baris sequence pertama dibuat (pertama kali / tahun baru / tabel
+        dipasang di DB yang sudah berisi dokumen): lanjut dari nomor tertinggi
+        yang sudah dipakai di period yang sama (termasuk arsip), bukan dari
+        dokumen terakhir — nomor non-numerik / format lain diabaikan."""
+        pattern, like = self._number_pattern(period)
+        highest = 0
+        for column in (models.Document.no_surat, models.ArchivedDocument.no_surat):
+            numbers = db.execute(
+                select(column).where(column.like(like, escape="\\"))
+            ).scalars()
+            for number in numbers:
+                match = pattern.fullmatch(number or "")
+                if match:
+                    highest = max(highest, int(match.group("seq")))
+        return highest + 1
+
+
+allocator = NoSuratAllocator.from_env()
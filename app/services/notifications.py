@@ -0,0 +1,304 @@
+# app/services/notifications.py
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import httpx
+
+from ..core.metrics import Histogram
+
+
+# ============================================
+# DISPATCHER NOTIFIKASI (WhatsApp / SMS)
+# ============================================
+# Endpoint cukup memasukkan pesan ke antrian lalu langsung return. Worker
+# async di thread terpisah mengirim lewat satu httpx.AsyncClient (koneksi
+# keep-alive), dengan batas concurrency per provider, retry + backoff
+# eksponensial, dan fallback (mis. WhatsApp gagal → SMS).
+#
+# URL provider bisa diarahkan ke stub lokal (FONNTE_URL, TWILIO_API_URL),
+# lihat benchmarks/bench_notifications.py.
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "8"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "4"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "1"))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "10"))
+
+FONNTE_URL = os.getenv("FONNTE_URL", "https://api.fonnte.com/send")
+FONNTE_TOKEN = os.getenv("FONNTE_TOKEN")
+FONNTE_CONCURRENCY = int(os.getenv("FONNTE_CONCURRENCY", "4"))
+
+TWILIO_API_URL = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+TWILIO_SID = os.getenv("TWILIO_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_FROM = os.getenv("TWILIO_FROM")
+TWILIO_CONCURRENCY = int(os.getenv("TWILIO_CONCURRENCY", "2"))
+
+
+@dataclass
+class Notification:
+    provider: str                    # "whatsapp" | "sms"
+    target: str
+    message: str
+    token: str | None = None         # override kredensial provider (opsional)
+    fallback: "Notification | None" = None
+    attempts: int = 0
+    queued_at: float = field(default_factory=time.monotonic)
+    result: Future | None = None     # diisi submit(); selesai saat terkirim / gagal final
+
+
+def _resolve(n: Notification, error: Exception | None = None):
+    if n.result is None or n.result.done():
+        return
+    if error is None:
+        n.result.set_result(True)
+    else:
+        n.result.set_exception(error)
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _check(response: httpx.Response):
+    # 429/5xx = gangguan sementara → retry; 4xx lain = request salah → jangan retry
+    if response.status_code == 429 or response.status_code >= 500:
+        raise ProviderError(f"HTTP {response.status_code}: {response.text[:200]}")
+    if response.status_code >= 400:
+        raise ProviderError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+
+
+class WhatsAppProvider:
+    """Fonnte API."""
+    name = "whatsapp"
+
+    def __init__(self, url: str = FONNTE_URL, token: str | None = FONNTE_TOKEN,
+                 concurrency: int = FONNTE_CONCURRENCY):
+        self.url = url
+        self.token = token
+        self.concurrency = concurrency
+
+    async def send(self, client: httpx.AsyncClient, n: Notification):
+        token = n.token or self.token
+        if not token:
+            raise ProviderError("FONNTE_TOKEN belum diset di environment", retryable=False)
+        response = await client.post(
+            self.url, data={"target": n.target, "message": n.message}, headers={"Authorization": token}
+        )
+        _check(response)
+
+
+class SMSProvider:
+    """Twilio REST API (langsung via httpx, tanpa SDK sync)."""
+    name = "sms"
+
+    def __init__(self, base_url: str = TWILIO_API_URL, sid: str | None = TWILIO_SID,
+                 token: str | None = TWILIO_AUTH_TOKEN, from_number: str | None = TWILIO_FROM,
+                 concurrency: int = TWILIO_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self.sid = sid
+        self.token = token
+        self.from_number = from_number
+        self.concurrency = concurrency
+
+    async def send(self, client: httpx.AsyncClient, n: Notification):
+        if not all([self.sid, self.token, self.from_number]):
+            raise ProviderError("TWILIO credentials belum lengkap", retryable=False)
+        response = await client.post(
+            f"{self.base_url}/2010-04-01/Accounts/{self.sid}/Messages.json",
+            data={"Body": n.message, "From": self.from_number, "To": n.target},
+            auth=(self.sid, self.token),
+        )
+        _check(response)
+
+
+class NotificationDispatcher:
+    """Antrian terbatas + worker async di event loop milik thread sendiri,
+    jadi bisa dipakai dari endpoint sync maupun script."""
+
+    def __init__(self, providers, workers: int = NOTIFY_WORKERS, queue_size: int = NOTIFY_QUEUE_SIZE,
+                 max_attempts: int = NOTIFY_MAX_ATTEMPTS, backoff: float = NOTIFY_BACKOFF_SECONDS,
+                 timeout: float = NOTIFY_TIMEOUT, transport: httpx.AsyncBaseTransport | None = None):
+        self.providers = {p.name: p for p in providers}
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport   # None = jaringan sungguhan; test pakai httpx.MockTransport
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0        # di antrian + sedang dikirim + menunggu retry
+        self._loop = None
+        self._queue = None
+        self._client = None
+        self._semaphores = {}
+        self._tasks = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.retried = 0
+        self.sent = {}
+        self.failed = {}
+        self.delivery_latency = Histogram()   # antri → terkirim (detik)
+
+    # ---------- lifecycle ----------
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="notify-dispatcher", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop = loop
+
+    async def _setup(self):
+        self._queue = asyncio.Queue()
+        limit = sum(p.concurrency for p in self.providers.values())
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            transport=self.transport,
+        )
+        self._semaphores = {name: asyncio.Semaphore(p.concurrency) for name, p in self.providers.items()}
+        self._tasks = [
+            asyncio.get_running_loop().create_task(self._worker(), name=f"notify-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def _shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.aclose()
+
+    def close(self, timeout: float = 5.0):
+        """Tunggu antrian kosong (maks timeout), lalu tutup koneksi & loop."""
+        if self._loop is None:
+            return
+        self.flush(timeout)
+        loop, self._loop = self._loop, None
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    # ---------- API untuk endpoint ----------
+    def enqueue(self, notification: Notification) -> bool:
+        """Masukkan ke antrian tanpa menunggu pengiriman. False kalau antrian penuh."""
+        if notification.provider not in self.providers:
+            raise ValueError(f"Provider notifikasi tidak dikenal: {notification.provider}")
+        self._ensure_started()
+        with self._lock:
+            if self._pending >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            self.enqueued += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, notification)
+        return True
+
+    def submit(self, notification: Notification) -> Future:
+        """Seperti enqueue, tapi mengembalikan Future yang selesai saat pesan
+        terkirim (True) atau gagal final (exception). Dipakai worker outbox."""
+        notification.result = Future()
+        if not self.enqueue(notification):
+            notification.result.set_exception(ProviderError("Antrian notifikasi penuh"))
+        return notification.result
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Blok sampai semua notifikasi selesai (terkirim / gagal final). Untuk test & shutdown."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    # ---------- worker ----------
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                await self._deliver(notification)
+            except Exception as e:  # jangan sampai worker mati
+                print("❌ Dispatcher notifikasi error:", e)
+                _resolve(notification, e)
+                self._finish()
+
+    async def _deliver(self, n: Notification):
+        provider = self.providers[n.provider]
+        n.attempts += 1
+        try:
+            async with self._semaphores[n.provider]:
+                await provider.send(self._client, n)
+        except (ProviderError, httpx.HTTPError) as e:
+            retryable = getattr(e, "retryable", True)
+            if retryable and n.attempts < self.max_attempts:
+                # backoff eksponensial + jitter; tetap dihitung pending
+                delay = self.backoff * (2 ** (n.attempts - 1)) * random.uniform(0.5, 1.5)
+                with self._lock:
+                    self.retried += 1
+                asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, n)
+                return
+            print(f"❌ Gagal kirim {n.provider} ke {n.target} setelah {n.attempts}x:", e)
+            with self._lock:
+                self.failed[n.provider] = self.failed.get(n.provider, 0) + 1
+            if n.fallback is not None:
+                # hasil akhir ditentukan oleh fallback
+                n.fallback.result = n.fallback.result or n.result
+                self._requeue_fallback(n.fallback)
+            else:
+                _resolve(n, e)
+            self._finish()
+            return
+
+        self.delivery_latency.observe(time.monotonic() - n.queued_at)
+        with self._lock:
+            self.sent[n.provider] = self.sent.get(n.provider, 0) + 1
+        _resolve(n)
+        self._finish()
+
+    def _requeue_fallback(self, fallback: Notification):
+        # slot antrian pesan asal dipakai ulang oleh fallback-nya
+        with self._lock:
+            self._pending += 1
+            self.enqueued += 1
+        print(f"🟨 {fallback.provider} fallback ke {fallback.target}")
+        self._queue.put_nowait(fallback)
+
+    def _finish(self):
+        with self._idle:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        return {
+            "pending": pending,
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "sent": dict(self.sent),
+            "failed": dict(self.failed),
+            "delivery_latency_seconds": self.delivery_latency.snapshot(),
+        }
+
+
+dispatcher = NotificationDispatcher([WhatsAppProvider(), SMSProvider()])
+
+
+def send_whatsapp(target: str, message: str, token: str | None = None, sms_fallback: str | None = None) -> bool:
+    """Antrikan WhatsApp; sms_fallback = isi SMS kalau WhatsApp gagal final."""
+    fallback = Notification("sms", target, sms_fallback) if sms_fallback else None
+    return dispatcher.enqueue(Notification("whatsapp", target, message, token=token, fallback=fallback))
+
+
+def send_sms(target: str, message: str) -> bool:
+    return dispatcher.enqueue(Notification("sms", target, message))
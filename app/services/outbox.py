@@ -0,0 +1,349 @@
+# app/services/outbox.py
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import delete, event, func, update
+from sqlalchemy.orm import Session
+
+from .. import models, database
+from ..core.metrics import Histogram
+from . import notifications, versions
+
+
+# ============================================
+# TRANSACTIONAL OUTBOX
+# ============================================
+# Route menulis pesan keluar ke tabel outbox SEBELUM db.commit() (satu
+# transaksi dengan perubahan state). Worker (aman dijalankan di banyak proses):
+#   1. klaim  : transaksi singkat SELECT ... FOR UPDATE SKIP LOCKED →
+#               status in_flight + lease (available_at = batas lease) → commit
+#   2. kirim  : lewat handler per channel, TANPA transaksi terbuka
+#   3. catat  : tiap hasil di transaksi singkat sendiri (UPDATE bersyarat
+#               attempts = klaim kita; klaim basi tidak menimpa klaim baru)
+# Pengiriman yang belum selesai setelah OUTBOX_DELIVERY_TIMEOUT TIDAK
+# dibatalkan dan tidak langsung diulang (hasilnya belum diketahui — bisa saja
+# sudah terkirim); hasilnya dicatat begitu selesai. Kalau proses mati sebelum
+# itu, lease habis dan baris diklaim ulang (at-least-once).
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "2"))
+OUTBOX_DELIVERY_TIMEOUT = float(os.getenv("OUTBOX_DELIVERY_TIMEOUT", "30"))
+# harus jauh di atas waktu kirim terlama provider (timeout + retry dispatcher)
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "600"))
+OUTBOX_RETAIN_DAYS = int(os.getenv("OUTBOX_RETAIN_DAYS", "3"))
+
+CHANNEL_WS = "ws"
+CHANNEL_WHATSAPP = "whatsapp"
+CHANNEL_VIEWS = "views"
+
+STATUS_PENDING = "pending"
+STATUS_IN_FLIGHT = "in_flight"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# bucket lag (detik) antara commit dan terkirim
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def publish(db: Session, channel: str, payload: dict):
+    """Tambah pesan ke outbox (tanpa commit) — ikut transaksi caller."""
+    db.add(models.OutboxMessage(channel=channel, payload=json.dumps(payload)))
+    db.info["outbox_pending"] = True
+
+
+def publish_ws(db: Session, message: dict, user_ids):
+    """Event WebSocket untuk user tertentu saja (creator/approver/recipient terkait)."""
+    publish(db, CHANNEL_WS, {"users": sorted(set(user_ids)), "message": message})
+
+
+def publish_whatsapp(db: Session, target: str, message: str, sms_fallback: str | None = None):
+    # kredensial provider TIDAK ikut disimpan di payload; diambil saat kirim (FONNTE_TOKEN)
+    publish(db, CHANNEL_WHATSAPP, {"target": target, "message": message, "sms_fallback": sms_fallback})
+
+
+def publish_view_bump(db: Session, document_ids):
+    """Naikkan versi dashboard peserta dokumen (ETag) setelah commit, di worker."""
+    publish(db, CHANNEL_VIEWS, {"documents": sorted(set(document_ids))})
+
+
+def _deliver_view_bump(payload: dict):
+    versions.bump_document_views(payload["documents"])
+
+
+def _deliver_whatsapp(payload: dict) -> Future:
+    fallback = None
+    if payload.get("sms_fallback"):
+        fallback = notifications.Notification("sms", payload["target"], payload["sms_fallback"])
+    return notifications.dispatcher.submit(notifications.Notification(
+        "whatsapp", payload["target"], payload["message"], fallback=fallback,
+    ))
+
+
+class _Claim(NamedTuple):
+    id: int
+    channel: str
+    payload: str
+    created_at: datetime
+    attempts: int       # nilai attempts milik klaim ini (fencing saat mencatat hasil)
+
+
+class OutboxWorker:
+    """Thread yang menguras outbox. Handler channel: fn(payload) → Future | None
+    (None = langsung terkirim)."""
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, poll_seconds: float = OUTBOX_POLL_SECONDS,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, backoff: float = OUTBOX_BACKOFF_SECONDS,
+                 delivery_timeout: float = OUTBOX_DELIVERY_TIMEOUT, lease_seconds: float = OUTBOX_LEASE_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.delivery_timeout = delivery_timeout
+        self.lease_seconds = lease_seconds
+        self.handlers = {CHANNEL_WHATSAPP: _deliver_whatsapp, CHANNEL_VIEWS: _deliver_view_bump}
+
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._recent = deque()      # (monotonic, jumlah terkirim) untuk throughput
+        self._late = []             # (klaim, future) yang melewati delivery_timeout
+        self.delivered = {}
+        self.failed = {}
+        self.retried = 0
+        self.lease_expired = 0      # klaim ulang karena lease habis (proses mati / hasil hilang)
+        self.stale = 0              # hasil yang datang setelah baris diklaim ulang
+        self.lag = Histogram(LAG_BUCKETS)
+
+    def register(self, channel: str, handler):
+        self.handlers[channel] = handler
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                drained = self.drain_once()
+            except Exception as e:
+                print("❌ Outbox worker error:", e)
+                drained = 0
+            # batch penuh → langsung lanjut; selain itu tunggu commit baru / poll
+            if drained < self.batch_size:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    # ---------- satu batch ----------
+    def drain_once(self) -> int:
+        sent = self._settle_late()
+        claims = self._claim()
+        if claims:
+            futures = [self._dispatch(claim) for claim in claims]
+            wait([f for f in futures if f is not None], timeout=self.delivery_timeout)
+            for claim, future in zip(claims, futures):
+                if future is not None and not future.done():
+                    # hasil belum diketahui: jangan cancel, jangan kirim ulang
+                    self._late.append((claim, future))
+                    continue
+                sent += self._record(claim, None if future is None else future.exception())
+
+        with self._lock:
+            self._recent.append((time.monotonic(), sent))
+        return len(claims)
+
+    def _claim(self) -> list[_Claim]:
+        """Transaksi singkat: ambil baris pending (atau in_flight yang lease-nya
+        habis), tandai in_flight + lease, commit."""
+        now = datetime.utcnow()
+        claims = []
+        with database.SessionLocal() as db:
+            rows = (
+                db.query(models.OutboxMessage)
+                .filter(
+                    models.OutboxMessage.status.in_((STATUS_PENDING, STATUS_IN_FLIGHT)),
+                    models.OutboxMessage.available_at <= now,
+                    # hanya channel yang punya handler di proses ini
+                    models.OutboxMessage.channel.in_(list(self.handlers)),
+                )
+                .order_by(models.OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for row in rows:
+                if row.status == STATUS_IN_FLIGHT:
+                    self.lease_expired += 1
+                    if row.attempts >= self.max_attempts:
+                        row.status = STATUS_FAILED
+                        row.last_error = "Lease habis tanpa hasil pengiriman"
+                        self._count(self.failed, row.channel)
+                        continue
+                row.status = STATUS_IN_FLIGHT
+                row.attempts += 1
+                row.available_at = now + timedelta(seconds=self.lease_seconds)
+                claims.append(_Claim(row.id, row.channel, row.payload, row.created_at, row.attempts))
+            db.commit()
+        return claims
+
+    def _settle_late(self) -> int:
+        late, self._late = self._late, []
+        sent = 0
+        for claim, future in late:
+            if future.done():
+                sent += self._record(claim, future.exception())
+            else:
+                self._late.append((claim, future))
+        return sent
+
+    def _record(self, claim: _Claim, error) -> int:
+        """Catat hasil satu klaim di transaksi sendiri. Return 1 kalau terkirim."""
+        now = datetime.utcnow()
+        if error is None:
+            values = {"status": STATUS_SENT, "sent_at": now, "last_error": None}
+        elif claim.attempts >= self.max_attempts:
+            values = {"status": STATUS_FAILED, "last_error": str(error)[:1000]}
+        else:
+            values = {
+                "status": STATUS_PENDING,
+                "last_error": str(error)[:1000],
+                "available_at": now + timedelta(seconds=self.backoff * 2 ** (claim.attempts - 1)),
+            }
+        with database.SessionLocal() as db:
+            result = db.execute(
+                update(models.OutboxMessage)
+                .where(
+                    models.OutboxMessage.id == claim.id,
+                    models.OutboxMessage.status == STATUS_IN_FLIGHT,
+                    models.OutboxMessage.attempts == claim.attempts,
+                )
+                .values(**values)
+            )
+            db.commit()
+        if result.rowcount != 1:
+            # lease kita sudah habis dan baris diklaim ulang; hasil ini basi
+            with self._lock:
+                self.stale += 1
+            return 0
+
+        if error is None:
+            self._count(self.delivered, claim.channel)
+            self.lag.observe((now - claim.created_at).total_seconds())
+            return 1
+        if values["status"] == STATUS_FAILED:
+            self._count(self.failed, claim.channel)
+            print(f"❌ Outbox #{claim.id} ({claim.channel}) gagal final:", error)
+        else:
+            with self._lock:
+                self.retried += 1
+        return 0
+
+    def _dispatch(self, claim: _Claim):
+        handler = self.handlers.get(claim.channel)
+        future = Future()
+        if handler is None:
+            future.set_exception(LookupError(f"Tidak ada handler untuk channel {claim.channel}"))
+            return future
+        try:
+            return handler(json.loads(claim.payload))
+        except Exception as e:
+            future.set_exception(e)
+            return future
+
+    def _count(self, counter: dict, channel: str):
+        with self._lock:
+            counter[channel] = counter.get(channel, 0) + 1
+
+    # ---------- metrik ----------
+    def stats(self, db: Session) -> dict:
+        cutoff = time.monotonic() - 60
+        with self._lock:
+            while self._recent and self._recent[0][0] < cutoff:
+                self._recent.popleft()
+            last_minute = sum(n for _, n in self._recent)
+        pending, oldest = db.query(
+            func.count(models.OutboxMessage.id), func.min(models.OutboxMessage.created_at)
+        ).filter(models.OutboxMessage.status == STATUS_PENDING).one()
+        in_flight = db.query(func.count(models.OutboxMessage.id)).filter(
+            models.OutboxMessage.status == STATUS_IN_FLIGHT
+        ).scalar()
+        return {
+            "running": self._thread is not None,
+            "pending": pending,
+            "in_flight": in_flight,
+            "awaiting_result": len(self._late),
+            "oldest_pending_lag_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+            "throughput_per_second": round(last_minute / 60, 3),
+            "delivered": dict(self.delivered),
+            "failed": dict(self.failed),
+            "retried": self.retried,
+            "lease_expired": self.lease_expired,
+            "stale_results": self.stale,
+            "delivery_lag_seconds": self.lag.snapshot(),
+        }
+
+
+worker = OutboxWorker()
+
+
+# commit yang membawa pesan outbox langsung membangunkan worker (tanpa menunggu poll)
+@event.listens_for(database.SessionLocal, "after_commit")
+def _wake_worker(session):
+    if session.info.pop("outbox_pending", False):
+        worker.wake()
+
+
+@event.listens_for(database.SessionLocal, "after_rollback")
+def _clear_flag(session):
+    session.info.pop("outbox_pending", None)
+
+
+def purge_sent(db: Session, retain_days: int = OUTBOX_RETAIN_DAYS) -> int:
+    """Hapus pesan terkirim/gagal yang lebih tua dari retain_days."""
+    cutoff = datetime.utcnow() - timedelta(days=retain_days)
+    result = db.execute(
+        delete(models.OutboxMessage).where(
+            models.OutboxMessage.status.in_((STATUS_SENT, STATUS_FAILED)),
+            models.OutboxMessage.created_at < cutoff,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bersihkan outbox / jalankan worker terpisah")
+    parser.add_argument("--purge-days", type=int, default=None)
+    parser.add_argument("--run", action="store_true", help="jalankan worker (channel whatsapp & views saja)")
+    args = parser.parse_args()
+
+    if args.purge_days is not None:
+        with database.SessionLocal() as session:
+            removed = purge_sent(session, args.purge_days)
+        print(f"✅ {removed} pesan outbox lama dihapus")
+    if args.run:
+        worker.start()
+        worker._thread.join()
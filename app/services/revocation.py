@@ -0,0 +1,296 @@
+# app/services/revocation.py
+import argparse
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, or_
+from sqlalchemy.orm import Session
+
+from .. import models, database
+
+
+# ============================================
+# PENCABUTAN TOKEN (deny list di memori)
+# ============================================
+# Tabel revoked_tokens = sumber kebenaran. Tiap worker menyimpan salinan di
+# memori (Bloom filter + set exact) dan menarik baris baru secara incremental
+# (id > cursor) paling lama tiap REVOCATION_REFRESH_SECONDS. Jalur umum
+# "token tidak dicabut" cukup cek Bloom filter, tanpa query.
+#
+# Batas keterlambatan: pencabutan berlaku di semua worker paling lambat
+# REVOCATION_REFRESH_SECONDS setelah commit (langsung di worker pencabut).
+#
+# Refresh dijalankan thread latar (start() di lifespan), jadi request tidak
+# pernah menunggu query deny list. Tanpa thread (CLI/test) refresh jalan
+# inline di request yang kebetulan lewat periode — hanya satu, yang lain
+# tetap memakai salinan sekarang.
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR = float(os.getenv("REVOCATION_BLOOM_ERROR", "0.001"))
+# id autoincrement bisa ter-commit tidak berurutan; baris yang dicabut
+# dalam jendela ini selalu dibaca ulang (idempotent)
+REVOCATION_OVERLAP_SECONDS = float(os.getenv("REVOCATION_OVERLAP_SECONDS", "30"))
+
+# Baris kind=profile: bukan pencabutan, tapi sinyal "data user berubah" untuk
+# cache principal (auth.py) di semua worker — lewat jalur refresh yang sama.
+# revoked_ts dicatat sebelum commit, jadi principal yang dimuat sampai
+# REVOCATION_OVERLAP_SECONDS sesudahnya juga dianggap basi (bisa saja dibaca
+# sebelum perubahan ter-commit).
+KIND_PROFILE = "profile"
+
+
+def _timestamp(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _revoked_ts(row) -> float:
+    return row.revoked_ts if row.revoked_ts is not None else _timestamp(row.revoked_at)
+
+
+class BloomFilter:
+    """Bloom filter bit array; double hashing dari satu digest blake2b."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    """Salinan deny list per worker: Bloom filter + set exact + cutoff per user."""
+
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS,
+                 capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR):
+        self.refresh_seconds = refresh_seconds
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._exact: dict[str, float] = {}           # jti → expires_at (epoch)
+        self._user_cutoff: dict[int, tuple] = {}     # user_id → (cutoff iat, expires_at) epoch
+        self._user_changed: dict[int, tuple] = {}    # user_id → (waktu berubah, expires_at) epoch
+        self._cursor = 0
+        self._last_refresh = float("-inf")
+        self._lock = threading.Lock()            # mutasi salinan (singkat)
+        self._refresh_lock = threading.Lock()    # satu refresh sekaligus
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    # ---------- cek (jalur request) ----------
+    def is_revoked(self, jti: str | None, user_id: int, issued_at: float | None) -> bool:
+        if self._thread is None:
+            self.maybe_refresh()
+        entry = self._user_cutoff.get(user_id)
+        if entry is not None and (issued_at or 0) < entry[0]:
+            return True
+        if jti is None or jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        if jti in self._exact:
+            return True
+        self.false_positives += 1
+        return False
+
+    def changed_since(self, user_id: int, loaded_at: float) -> bool:
+        """True kalau principal yang dimuat pada loaded_at (epoch) mungkin memuat
+        data user sebelum perubahan terakhir."""
+        if self._thread is None:
+            self.maybe_refresh()
+        entry = self._user_changed.get(user_id)
+        return entry is not None and loaded_at <= entry[0] + REVOCATION_OVERLAP_SECONDS
+
+    # ---------- thread refresh ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="revocation-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.maybe_refresh()
+            self._stop.wait(self.refresh_seconds)
+
+    # ---------- sinkronisasi dengan tabel ----------
+    def maybe_refresh(self):
+        if time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        # satu pemanggil yang refresh; yang lain jalan terus dengan salinan sekarang
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # DB tidak terjangkau: tetap pakai salinan terakhir, coba lagi di periode berikutnya
+            self._last_refresh = time.monotonic()
+            print("⚠️ Gagal refresh deny list token:", e)
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self):
+        # query tanpa memegang _lock: note_local di request lain tidak ikut menunggu DB
+        overlap_since = datetime.utcnow() - timedelta(seconds=REVOCATION_OVERLAP_SECONDS)
+        with database.SessionLocal() as db:
+            rows = (
+                db.query(models.RevokedToken)
+                .filter(
+                    models.RevokedToken.expires_at > datetime.utcnow(),
+                    or_(
+                        models.RevokedToken.id > self._cursor,
+                        models.RevokedToken.revoked_at >= overlap_since,
+                    ),
+                )
+                .order_by(models.RevokedToken.id)
+                .all()
+            )
+        with self._lock:
+            for row in rows:
+                self._apply(row.jti, row.user_id, _revoked_ts(row), row.expires_at, row.kind)
+                self._cursor = max(self._cursor, row.id)
+            self._prune()
+        self._last_refresh = time.monotonic()
+        self.refreshes += 1
+
+    def _apply(self, jti, user_id, revoked_ts: float, expires_at: datetime, kind: str | None = None):
+        if kind == KIND_PROFILE:
+            if revoked_ts > self._user_changed.get(user_id, (0, 0))[0]:
+                self._user_changed[user_id] = (revoked_ts, _timestamp(expires_at))
+            return
+        if jti is None:
+            cutoff = revoked_ts
+            if cutoff > self._user_cutoff.get(user_id, (0, 0))[0]:
+                self._user_cutoff[user_id] = (cutoff, _timestamp(expires_at))
+            return
+        if jti not in self._exact:
+            self._exact[jti] = _timestamp(expires_at)
+            self._bloom.add(jti)
+
+    def _prune(self):
+        """Buang entry kedaluwarsa; bangun ulang Bloom filter kalau isinya
+        sudah jauh lebih banyak dari entry hidup atau melebihi kapasitas."""
+        now = time.time()
+        expired = [jti for jti, exp in self._exact.items() if exp <= now]
+        for jti in expired:
+            del self._exact[jti]
+        for user_id in [u for u, (_, exp) in self._user_cutoff.items() if exp <= now]:
+            del self._user_cutoff[user_id]
+        for user_id in [u for u, (_, exp) in self._user_changed.items() if exp <= now]:
+            del self._user_changed[user_id]
+
+        live = len(self._exact)
+        if self._bloom.count > max(2 * live, 1024) or self._bloom.count > self._bloom.capacity:
+            bloom = BloomFilter(max(self._bloom.capacity, 2 * live), self.error_rate)
+            for jti in self._exact:
+                bloom.add(jti)
+            self._bloom = bloom
+
+    def note_local(self, jti, user_id, revoked_ts: float, expires_at: datetime, kind: str | None = None):
+        """Terapkan pencabutan di worker ini tanpa menunggu refresh."""
+        with self._lock:
+            self._apply(jti, user_id, revoked_ts, expires_at, kind)
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._exact),
+            "revoked_users": len(self._user_cutoff),
+            "changed_users": len(self._user_changed),
+            "cursor": self._cursor,
+            "refresh_seconds": self.refresh_seconds,
+            "background_refresh": self._thread is not None,
+            "seconds_since_refresh": round(time.monotonic() - self._last_refresh, 3)
+            if self.refreshes else None,
+            "refreshes": self.refreshes,
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+            "bloom_entries": self._bloom.count,
+            "bloom_hits": self.bloom_hits,
+            "false_positives": self.false_positives,
+        }
+
+
+revocations = RevocationList()
+
+
+# ============================================
+# API PENCABUTAN (tanpa commit — ikut transaksi caller)
+# ============================================
+def revoke_token(db: Session, jti: str, user_id: int, expires_at: datetime):
+    """Cabut satu token (logout). expires_at = exp token itu."""
+    now = time.time()
+    row = models.RevokedToken(jti=jti, user_id=user_id, revoked_at=datetime.utcfromtimestamp(now),
+                              revoked_ts=now, expires_at=expires_at)
+    db.add(row)
+    # langsung berlaku di worker ini (kalau commit gagal, paling buruk token ini tertolak lebih awal)
+    revocations.note_local(jti, user_id, now, expires_at)
+
+
+def revoke_user(db: Session, user_id: int, token_lifetime: timedelta):
+    """Cabut semua token user yang sudah terbit (logout semua sesi, sesi bocor).
+
+    token_lifetime = umur maksimum token; sesudahnya baris ini tidak diperlukan lagi.
+    """
+    now = time.time()
+    revoked_at = datetime.utcfromtimestamp(now)
+    row = models.RevokedToken(jti=None, user_id=user_id, revoked_at=revoked_at, revoked_ts=now,
+                              expires_at=revoked_at + token_lifetime)
+    db.add(row)
+    revocations.note_local(None, user_id, now, row.expires_at)
+
+
+def mark_user_changed(db: Session, user_id: int, cache_ttl: float):
+    """Data user berubah (profil): principal user ini yang ter-cache di semua
+    worker dimuat ulang. Token tidak dicabut. cache_ttl = TTL cache principal;
+    sesudah jendela overlap + TTL tidak ada entry lama tersisa, baris boleh dibuang."""
+    now = time.time()
+    revoked_at = datetime.utcfromtimestamp(now)
+    lifetime = timedelta(seconds=cache_ttl + REVOCATION_OVERLAP_SECONDS)
+    row = models.RevokedToken(jti=None, user_id=user_id, revoked_at=revoked_at, revoked_ts=now,
+                              expires_at=revoked_at + lifetime, kind=KIND_PROFILE)
+    db.add(row)
+    revocations.note_local(None, user_id, now, row.expires_at, KIND_PROFILE)
+
+
+def purge_expired(db: Session) -> int:
+    result = db.execute(
+        delete(models.RevokedToken).where(models.RevokedToken.expires_at <= datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hapus baris revoked_tokens yang sudah kedaluwarsa")
+    parser.parse_args()
+
+    with database.SessionLocal() as session:
+        removed = purge_expired(session)
+    print(f"✅ {removed} token kedaluwarsa dihapus dari deny list")
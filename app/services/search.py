@@ -0,0 +1,354 @@
+# app/services/search.py
+import itertools
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import NamedTuple
+
+from sqlalchemy import and_, case, event, exists, func, inspect, literal, or_, select, text, union
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, joinedload
+
+from .. import models, database
+
+
+# ============================================
+# FULL-TEXT SEARCH DOKUMEN
+# ============================================
+# MySQL  : FULLTEXT(title, content) + index prefix no_surat & users.name
+# SQLite : inverted index in-process (mode test), dibangun ulang saat ada tulis
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+MAX_PAGE_SIZE = 100
+
+# Bobot ranking
+SCORE_NO_SURAT_EXACT = 100.0
+SCORE_NO_SURAT_PREFIX = 50.0
+SCORE_PARTICIPANT = 5.0
+SCORE_TITLE = 3.0
+SCORE_CONTENT = 1.0
+
+MYSQL_INDEXES = {
+    "documents": {
+        "ft_documents_title_content": "CREATE FULLTEXT INDEX ft_documents_title_content ON documents (title, content)",
+    },
+    "users": {
+        "ix_users_name": "CREATE INDEX ix_users_name ON users (name)",
+    },
+}
+
+
+def tokenize(value: str | None) -> list[str]:
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+
+def ensure_search_indexes(engine):
+    """Buat index FULLTEXT/prefix yang belum ada (sync_tables hanya urus kolom).
+
+    no_surat sudah punya unique index, cukup untuk LIKE 'prefix%'.
+    """
+    if engine.dialect.name != "mysql":
+        return
+    inspector = inspect(engine)
+    with engine.connect() as conn:
+        for table_name, indexes in MYSQL_INDEXES.items():
+            existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+            for name, ddl in indexes.items():
+                if name not in existing:
+                    print(f"🔎 Membuat index pencarian: {table_name}.{name}")
+                    conn.execute(text(ddl))
+        conn.commit()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _access_filter(user_id: int):
+    """Creator, approver, atau recipient (yang belum hapus dari inbox).
+
+    Subquery IN tidak berkorelasi: dievaluasi sekali per query, bukan per baris.
+    """
+    approver_docs = select(models.Approver.document_id).where(models.Approver.user_id == user_id)
+    recipient_docs = select(models.Recipient.document_id).where(
+        models.Recipient.user_id == user_id,
+        models.Recipient.is_deleted == False,
+    )
+    return or_(
+        models.Document.creator_id == user_id,
+        models.Document.id.in_(approver_docs),
+        models.Document.id.in_(recipient_docs),
+    )
+
+
+def _participant_match(name_like: str):
+    return or_(
+        exists().where(
+            models.User.id == models.Document.creator_id,
+            models.User.name.like(name_like, escape="\\"),
+        ),
+        exists().where(
+            models.Approver.document_id == models.Document.id,
+            models.Approver.user_id == models.User.id,
+            models.User.name.like(name_like, escape="\\"),
+        ),
+        exists().where(
+            models.Recipient.document_id == models.Document.id,
+            models.Recipient.user_id == models.User.id,
+            models.User.name.like(name_like, escape="\\"),
+        ),
+    )
+
+
+# ============================================
+# MYSQL
+# ============================================
+def _candidates(tokens: list[str], prefix_like: str, relevance):
+    """id dokumen yang cocok, satu cabang per index (UNION, bukan OR).
+
+    MATCH ... AGAINST yang di-OR dengan LIKE/EXISTS membuat MySQL tidak
+    memakai index FULLTEXT (full scan); tiap cabang UNION memakai index-nya
+    sendiri: FULLTEXT, unique no_surat (LIKE 'prefix%'), ix_users_name.
+    """
+    name_like = models.User.name.like(prefix_like, escape="\\")
+    branches = [
+        select(models.Document.id.label("id"))
+        .where(models.Document.no_surat.like(prefix_like, escape="\\")),
+        select(models.Document.id)
+        .join(models.User, models.User.id == models.Document.creator_id)
+        .where(name_like),
+        select(models.Approver.document_id)
+        .join(models.User, models.User.id == models.Approver.user_id)
+        .where(name_like),
+        select(models.Recipient.document_id)
+        .join(models.User, models.User.id == models.Recipient.user_id)
+        .where(name_like),
+    ]
+    if tokens:
+        branches.insert(0, select(models.Document.id.label("id")).where(relevance))
+    return union(*branches).subquery("candidates")
+
+
+def _mysql_queries(q: str, user_id: int):
+    """(query total, query halaman tanpa offset/limit) — dipisah supaya SQL bisa dicek di test."""
+    tokens = tokenize(q)
+    prefix_like = f"{_escape_like(q)}%"
+
+    relevance = literal(0.0)
+    if tokens:
+        # boolean mode + wildcard: "bens" juga cocok dengan "bensin"
+        against = " ".join(f"{t}*" for t in tokens)
+        relevance = match(models.Document.title, models.Document.content, against=against).in_boolean_mode()
+
+    candidates = _candidates(tokens, prefix_like, relevance)
+    # skor hanya dihitung untuk baris kandidat
+    score = (
+        relevance
+        + case((models.Document.no_surat == q, SCORE_NO_SURAT_EXACT), else_=0)
+        + case((models.Document.no_surat.like(prefix_like, escape="\\"), SCORE_NO_SURAT_PREFIX), else_=0)
+        + case((_participant_match(prefix_like), SCORE_PARTICIPANT), else_=0)
+    ).label("score")
+
+    conditions = and_(models.Document.is_deleted == False, _access_filter(user_id))
+    total = (
+        select(func.count())
+        .select_from(models.Document)
+        .join(candidates, candidates.c.id == models.Document.id)
+        .where(conditions)
+    )
+    rows = (
+        select(models.Document, score)
+        .join(candidates, candidates.c.id == models.Document.id)
+        .options(joinedload(models.Document.creator))
+        .where(conditions)
+        .order_by(score.desc(), models.Document.id.desc())
+    )
+    return total, rows
+
+
+def _search_mysql(db: Session, q: str, user_id: int, offset: int, limit: int):
+    total_query, rows_query = _mysql_queries(q, user_id)
+    total = db.execute(total_query).scalar_one()
+    rows = db.execute(rows_query.offset(offset).limit(limit)).unique().all()
+    return total, [(doc, float(s or 0)) for doc, s in rows]
+
+
+# ============================================
+# FALLBACK: INVERTED INDEX IN-PROCESS
+# ============================================
+# Perubahan model ini yang memengaruhi isi index (judul/isi, no surat, nama peserta)
+INDEXED_MODELS = (models.Document, models.Approver, models.Recipient, models.User)
+
+
+class _IndexSnapshot(NamedTuple):
+    postings: dict     # token → {doc_id: bobot}
+    no_surat: dict     # doc_id → no surat (lowercase)
+    vocab: list        # token terurut (pencarian prefix)
+
+
+class InvertedIndex:
+    """Inverted index sederhana untuk mode SQLite/test.
+
+    Posting: token → {doc_id: bobot}. Dibangun ulang penuh saat ada
+    commit tulis sejak build terakhir (cukup untuk dataset test). Hasil build
+    dipasang sebagai satu snapshot (satu assignment), jadi score() di thread
+    lain selalu membaca postings & vocab dari build yang sama.
+    """
+
+    def __init__(self):
+        self.snapshot = _IndexSnapshot({}, {}, [])
+        self._writes = itertools.count(1)
+        self._generation = 0   # dinaikkan tiap commit yang mengubah model terindeks
+        self._built = -1       # generation yang tercermin di snapshot
+        self._lock = threading.Lock()
+
+    @property
+    def dirty(self) -> bool:
+        return self._built != self._generation
+
+    def mark_dirty(self):
+        self._generation = next(self._writes)
+
+    def ensure_fresh(self, db: Session):
+        if not self.dirty:
+            return
+        with self._lock:
+            target = self._generation
+            if self._built != target:
+                self._build(db)
+                # hanya setelah build sukses; tulis selama build menaikkan generation lagi
+                self._built = target
+
+    def _build(self, db: Session):
+        postings = defaultdict(lambda: defaultdict(float))
+        no_surat = {}
+
+        def add(doc_id, value, weight):
+            for token in tokenize(value):
+                postings[token][doc_id] += weight
+
+        docs = (
+            db.query(models.Document.id, models.Document.no_surat, models.Document.title,
+                     models.Document.content, models.User.name)
+            .outerjoin(models.User, models.User.id == models.Document.creator_id)
+            .filter(models.Document.is_deleted == False)
+        )
+        for doc_id, doc_no, title, content, creator_name in docs:
+            no_surat[doc_id] = (doc_no or "").lower()
+            add(doc_id, title, SCORE_TITLE)
+            add(doc_id, content, SCORE_CONTENT)
+            add(doc_id, creator_name, SCORE_PARTICIPANT)
+
+        participants = (
+            db.query(models.Approver.document_id, models.User.name)
+            .join(models.User, models.User.id == models.Approver.user_id)
+            .union_all(
+                db.query(models.Recipient.document_id, models.User.name)
+                .join(models.User, models.User.id == models.Recipient.user_id)
+            )
+        )
+        for doc_id, name in participants:
+            if doc_id in no_surat:
+                add(doc_id, name, SCORE_PARTICIPANT)
+
+        final = {t: dict(p) for t, p in postings.items()}
+        self.snapshot = _IndexSnapshot(final, no_surat, sorted(final))
+
+    @staticmethod
+    def _prefix_terms(vocab: list, token: str):
+        i = bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            yield vocab[i]
+            i += 1
+
+    def score(self, q: str) -> dict[int, float]:
+        snapshot = self.snapshot
+        scores = defaultdict(float)
+        for token in tokenize(q):
+            for term in self._prefix_terms(snapshot.vocab, token):
+                # term persis = bobot penuh, hanya prefix = setengah
+                factor = 1.0 if term == token else 0.5
+                for doc_id, weight in snapshot.postings[term].items():
+                    scores[doc_id] += weight * factor
+
+        needle = q.lower()
+        for doc_id, doc_no in snapshot.no_surat.items():
+            if doc_no == needle:
+                scores[doc_id] += SCORE_NO_SURAT_EXACT
+            elif needle and doc_no.startswith(needle):
+                scores[doc_id] += SCORE_NO_SURAT_PREFIX
+        return scores
+
+
+fallback_index = InvertedIndex()
+
+
+@event.listens_for(database.SessionLocal, "after_flush")
+def _flag_index_flush(session, flush_context):
+    # kv_store, outbox, ws_events, dll. tidak memengaruhi index
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, INDEXED_MODELS):
+            session.info["search_dirty"] = True
+            return
+
+
+@event.listens_for(database.SessionLocal, "do_orm_execute")
+def _flag_index_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or issubclass(mapper.class_, INDEXED_MODELS):
+        orm_execute_state.session.info["search_dirty"] = True
+
+
+@event.listens_for(database.SessionLocal, "after_commit")
+def _index_dirty_on_commit(session):
+    # tandai setelah commit supaya rebuild tidak membaca data yang belum commit
+    if session.info.pop("search_dirty", False):
+        fallback_index.mark_dirty()
+
+
+def _search_fallback(db: Session, q: str, user_id: int, offset: int, limit: int):
+    fallback_index.ensure_fresh(db)
+    scores = fallback_index.score(q)
+    if not scores:
+        return 0, []
+
+    # filter akses tetap di query SQL
+    allowed = [
+        doc_id for (doc_id,) in db.query(models.Document.id).filter(
+            models.Document.id.in_(scores),
+            models.Document.is_deleted == False,
+            _access_filter(user_id),
+        )
+    ]
+    allowed.sort(key=lambda d: (-scores[d], -d))
+    page_ids = allowed[offset:offset + limit]
+
+    docs = {
+        d.id: d for d in db.query(models.Document)
+        .options(joinedload(models.Document.creator))
+        .filter(models.Document.id.in_(page_ids))
+    }
+    return len(allowed), [(docs[d], scores[d]) for d in page_ids if d in docs]
+
+
+# ============================================
+# ENTRY POINT
+# ============================================
+def search_documents(db: Session, q: str, user_id: int, page: int = 1, page_size: int = 20):
+    q = q.strip()
+    page = max(1, page)
+    page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+    offset = (page - 1) * page_size
+
+    if not q:
+        return {"rows": [], "total": 0, "page": page, "page_size": page_size}
+
+    if db.get_bind().dialect.name == "mysql":
+        total, rows = _search_mysql(db, q, user_id, offset, page_size)
+    else:
+        total, rows = _search_fallback(db, q, user_id, offset, page_size)
+
+    return {"rows": rows, "total": total, "page": page, "page_size": page_size}
@@ -0,0 +1,146 @@
+# app/services/versions.py
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func, insert, select, union, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, database
+
+
+# ============================================
+# VERSI DOKUMEN & VERSI TAMPILAN USER (ETag)
+# ============================================
+# documents.version        : naik di setiap mutasi dokumen (satu baris, yang
+#                            memang sudah dikunci oleh mutasinya)
+# user_view_versions.version: versi dashboard per user → ETag dashboard cukup
+#                            satu lookup PK (user_view_version).
+#   - event pribadi (read, hapus dari inbox): dinaikkan langsung, satu baris
+#   - mutasi dokumen / arsip: lewat outbox (channel views), worker menaikkan
+#     versi semua peserta di transaksi sendiri → request tidak mengunci
+#     ratusan baris peserta. Sampai worker jalan (± OUTBOX_POLL_SECONDS)
+#     dashboard peserta lain masih boleh dijawab 304.
+def bump_user_views(db: Session, user_ids: list[int]):
+    """Upsert version+1 untuk user_ids (urut, supaya urutan lock konsisten)."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    table = models.UserViewVersion.__table__
+    rows = [{"user_id": uid, "version": 1} for uid in user_ids]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(version=table.c.version + 1)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id], set_={"version": table.c.version + 1}
+        )
+    else:
+        for user_id in user_ids:
+            _bump_user_view_generic(db, user_id)
+        return
+    db.execute(stmt)
+
+
+def _bump_user_view_generic(db: Session, user_id: int, attempts: int = 3):
+    """Upsert portabel: UPDATE, kalau belum ada baris → INSERT di savepoint;
+    bentrok dengan insert worker lain (IntegrityError) → ulangi UPDATE."""
+    table = models.UserViewVersion.__table__
+    for _ in range(attempts):
+        result = db.execute(
+            update(table).where(table.c.user_id == user_id).values(version=table.c.version + 1)
+        )
+        if result.rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(user_id=user_id, version=1))
+            return
+        except IntegrityError:
+            continue
+    raise RuntimeError(f"Gagal menaikkan user_view_versions untuk user {user_id}")
+
+
+def bump_document(db: Session, document_id: int, visible_to: int | None = None):
+    """Dipanggil dari changes.record_event, di transaksi yang sama dengan mutasinya.
+
+    Event pribadi (visible_to) hanya mengubah tampilan satu user itu; versi
+    tampilan peserta lain dinaikkan lewat outbox (bump_document_views).
+    """
+    if visible_to is not None:
+        bump_user_views(db, [visible_to])
+        return
+
+    db.execute(
+        update(models.Document)
+        .where(models.Document.id == document_id)
+        .values(version=func.coalesce(models.Document.version, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def document_version(db: Session, document_id: int) -> int | None:
+    """Versi dokumen (tabel kerja, lalu arsip). None kalau dokumen tidak ada."""
+    for model in (models.Document, models.ArchivedDocument):
+        row = db.query(model.version).filter(model.id == document_id).first()
+        if row is not None:
+            return row[0] or 0
+    return None
+
+
+def user_view_version(db: Session, user_id: int) -> int:
+    version = db.query(models.UserViewVersion.version).filter(
+        models.UserViewVersion.user_id == user_id
+    ).scalar()
+    return version or 0
+
+
+def document_participants(db: Session, document_ids: list[int]) -> list[int]:
+    """Creator, approver, dan recipient dokumen (tabel kerja maupun arsip)."""
+    rows = db.execute(union(
+        select(models.Document.creator_id).where(models.Document.id.in_(document_ids)),
+        select(models.Approver.user_id).where(models.Approver.document_id.in_(document_ids)),
+        select(models.Recipient.user_id).where(models.Recipient.document_id.in_(document_ids)),
+        select(models.ArchivedDocument.creator_id).where(models.ArchivedDocument.id.in_(document_ids)),
+        select(models.ArchivedApprover.user_id).where(models.ArchivedApprover.document_id.in_(document_ids)),
+        select(models.ArchivedRecipient.user_id).where(models.ArchivedRecipient.document_id.in_(document_ids)),
+    )).scalars()
+    return [user_id for user_id in rows if user_id is not None]
+
+
+def bump_document_views(document_ids: list[int]):
+    """Handler outbox channel views: naikkan versi tampilan semua peserta."""
+    with database.SessionLocal() as db:
+        bump_user_views(db, document_participants(db, document_ids))
+        db.commit()
+
+
+# ============================================
+# ETAG HELPER
+# ============================================
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(p) for p in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # perbandingan weak: abaikan prefix W/
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
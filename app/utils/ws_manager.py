@@ -1,22 +1,583 @@
-from typing import List
-from fastapi import WebSocket
-import json
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Set
+
+from fastapi import WebSocket, status
+
+from app.core.metrics import Histogram
+from app.utils import ws_protocol
+
+
+# ============================================
+# REGISTRY KONEKSI WEBSOCKET PER USER
+# ============================================
+# Satu instance per worker (router_ws + backplane), dipakai bersama oleh
+# WebSocket /ws/unread dan SSE /sse/unread. Koneksi disimpan per user id
+# (satu user bisa buka beberapa tab), jadi event hanya dikirim ke
+# user yang terkait dokumen — biaya fan-out sebanding jumlah user yang
+# berkepentingan, bukan jumlah seluruh koneksi.
+#
+# Setiap koneksi punya antrian kirim terbatas + writer task sendiri. Publish
+# hanya put_nowait (tidak pernah menunggu socket), jadi satu client lambat
+# tidak menahan client lain maupun request yang memicu event.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+# Kebijakan saat antrian penuh: disconnect | drop_oldest | drop_newest
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "disconnect")
+# Satu send yang lebih lama dari ini → koneksi dianggap macet dan ditutup.
+# Dicek HeartbeatWheel tiap tick terhadap himpunan koneksi yang sedang send
+# (bukan timer per frame), jadi batas efektifnya WS_SEND_TIMEOUT + WS_HEARTBEAT_TICK.
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+SLOW_CONSUMER_POLICIES = ("disconnect", "drop_oldest", "drop_newest")
+
+# bucket kedalaman antrian (jumlah pesan) saat enqueue
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Coalescing: event perubahan dokumen untuk user yang sama dalam jendela ini
+# digabung jadi satu frame "documents_changed" (satu refetch dashboard di
+# client). Jendela diperpanjang tiap ada event baru, tapi frame pertama
+# tidak pernah tertahan lebih dari WS_COALESCE_MAX_DELAY_MS. 0 = nonaktif.
+WS_COALESCE_WINDOW_MS = float(os.getenv("WS_COALESCE_WINDOW_MS", "100"))
+WS_COALESCE_MAX_DELAY_MS = float(os.getenv("WS_COALESCE_MAX_DELAY_MS", "500"))
+
+# Heartbeat: satu timing wheel untuk semua koneksi (bukan timer per socket).
+# Koneksi tanpa frame masuk selama INTERVAL dikirimi "ping"; tanpa frame masuk
+# selama TIMEOUT dianggap mati dan ditutup. Resolusi = TICK detik.
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "30"))
+WS_HEARTBEAT_TIMEOUT = float(os.getenv("WS_HEARTBEAT_TIMEOUT", "90"))
+WS_HEARTBEAT_TICK = float(os.getenv("WS_HEARTBEAT_TICK", "1"))
+
+# Replay: event terakhir per user disimpan di ring buffer supaya client yang
+# reconnect dengan ?last_seq=N cukup menerima selisihnya. seq = id event di
+# backplane (naik terus & urut, sama di semua worker, tidak mundur saat restart).
+# Selisih yang sudah terbuang dari buffer → satu frame "resync" (client reload
+# dashboard sekali).
+WS_REPLAY_BUFFER = int(os.getenv("WS_REPLAY_BUFFER", "100"))
+WS_REPLAY_MAX_USERS = int(os.getenv("WS_REPLAY_MAX_USERS", "50000"))
+
+# Encoding frame per koneksi (json | msgpack, lihat utils/ws_protocol.py).
+# Tiap event di-encode paling banyak sekali per encoding lalu bytes/str yang
+# sama dibagi ke semua socket; SSE selalu json.
+
+# Jeda reconnect yang disarankan ke EventSource (field retry:)
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+COALESCE_EVENTS = {
+    "update_read", "new_inbox", "new_waiting",
+    "document_created", "document_assigned", "approval_status_changed",
+}
+
+
+def _event_type(message: dict):
+    # doc_routes memakai "event", file_routes memakai "type"
+    return message.get("event") or message.get("type")
+
+
+def _document_id(message: dict):
+    return message.get("document_id", message.get("doc_id"))
+
+
+def _merge(messages) -> dict:
+    """Gabungkan beberapa event jadi satu frame documents_changed."""
+    document_ids, types, seq = [], [], None
+    for message in messages:
+        doc_id = _document_id(message)
+        if doc_id is not None and doc_id not in document_ids:
+            document_ids.append(doc_id)
+        kind = _event_type(message)
+        if kind not in types:
+            types.append(kind)
+        seq = message.get("seq", seq)
+    frame = {"event": "documents_changed", "document_ids": document_ids, "types": types, "count": len(messages)}
+    if seq is not None:
+        frame["seq"] = seq
+    return frame
+
+
+class _ReplayBuffer:
+    __slots__ = ("events", "evicted_through")
+
+    def __init__(self, floor: int, size: int):
+        self.events = deque(maxlen=size)   # (seq, message)
+        self.evicted_through = floor       # event dengan seq <= ini mungkin sudah hilang
+
+    def append(self, seq: int, message: dict):
+        if len(self.events) == self.events.maxlen:
+            self.evicted_through = self.events[0][0]
+        self.events.append((seq, message))
+
+
+class _Frames:
+    """Satu event + hasil encode per encoding (dibuat saat pertama dibutuhkan)."""
+    __slots__ = ("message", "encoded", "_counts")
+
+    def __init__(self, message: dict, counts: dict):
+        self.message = message
+        self.encoded = {}
+        self._counts = counts
+
+    def get(self, encoding: str):
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = self.encoded[encoding] = ws_protocol.encode(self.message, encoding)
+            self._counts[encoding] += 1
+        return data
+
+
+class _PendingBatch:
+    __slots__ = ("items", "first_at", "timer")
+
+    def __init__(self, first_at: float):
+        self.items = []          # (message, _Frames)
+        self.first_at = first_at
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class Connection:
+    __slots__ = ("ws", "user_id", "encoding", "queue", "writer", "closed", "last_seen", "sending_since")
+
+    def __init__(self, ws: WebSocket | None, user_id: int, queue_size: int, now: float,
+                 encoding: str = ws_protocol.ENCODING_JSON):
+        self.ws = ws             # None = stream SSE
+        self.user_id = user_id
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.writer: asyncio.Task | None = None
+        self.closed = False
+        self.last_seen = now     # loop.time() frame masuk terakhir
+        self.sending_since = None   # loop.time() awal send yang sedang berjalan
+
+
+class HeartbeatWheel:
+    """Timing wheel: slot[i] = koneksi yang perlu dicek pada tick ke-i.
+
+    Satu task maju satu slot per tick; koneksi di slot itu dicek sekaligus
+    (ping / evict / jadwal ulang). Koneksi yang sudah ditutup dibuang secara
+    lazy saat slotnya dicek, jadi disconnect tidak perlu menyentuh wheel.
+    Send macet dicek tiap tick dari manager.sending (hanya koneksi yang
+    sedang di tengah send), tidak menunggu slot heartbeat koneksinya.
+    """
+
+    def __init__(self, manager: "ConnectionManager", interval: float = WS_HEARTBEAT_INTERVAL,
+                 timeout: float = WS_HEARTBEAT_TIMEOUT, tick: float = WS_HEARTBEAT_TICK):
+        self.manager = manager
+        self.interval = interval
+        self.timeout = max(timeout, interval)
+        self.tick = tick
+        self._slots = [[] for _ in range(math.ceil(interval / tick) + 1)]
+        self._cursor = 0
+        self._task: asyncio.Task | None = None
+        self.pings = 0
+        self.evicted = 0
+        self.sweeps = 0
+        self.sweep_seconds = Histogram((0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+
+    def add(self, conn: Connection, delay: float | None = None):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        ticks = min(len(self._slots) - 1, max(1, math.ceil((self.interval if delay is None else delay) / self.tick)))
+        self._slots[(self._cursor + ticks) % len(self._slots)].append(conn)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self._sweep(loop.time())
+
+    def _check_sends(self, now: float):
+        manager = self.manager
+        for conn in list(manager.sending):
+            if conn.sending_since is not None and now - conn.sending_since >= manager.send_timeout:
+                # writer tertahan di satu send (client tidak membaca)
+                manager.dead += 1
+                manager.sending.discard(conn)
+                manager.close_later(conn, status.WS_1011_INTERNAL_ERROR)
+
+    def _sweep(self, now: float):
+        started = time.perf_counter()
+        self._check_sends(now)
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        due, self._slots[self._cursor] = self._slots[self._cursor], []
+        for conn in due:
+            if conn.closed:
+                continue
+            idle = now - conn.last_seen
+            if idle >= self.timeout:
+                self.evicted += 1
+                self.manager.close_later(conn, status.WS_1001_GOING_AWAY)
+            elif idle >= self.interval:
+                self.pings += 1
+                self.manager.send(conn, "ping")
+                self.add(conn, min(self.interval, self.timeout - idle))
+            else:
+                self.add(conn, self.interval - idle)
+        self.sweeps += 1
+        self.sweep_seconds.observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "timeout": self.timeout,
+            "tick": self.tick,
+            "tracked": sum(len(slot) for slot in self._slots),
+            "pings": self.pings,
+            "evicted": self.evicted,
+            "sweeps": self.sweeps,
+            "sweep_seconds": self.sweep_seconds.snapshot(),
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, policy: str = WS_SLOW_CONSUMER_POLICY,
+                 send_timeout: float = WS_SEND_TIMEOUT, coalesce_window_ms: float = WS_COALESCE_WINDOW_MS,
+                 coalesce_max_delay_ms: float = WS_COALESCE_MAX_DELAY_MS,
+                 heartbeat_interval: float = WS_HEARTBEAT_INTERVAL, heartbeat_timeout: float = WS_HEARTBEAT_TIMEOUT,
+                 heartbeat_tick: float = WS_HEARTBEAT_TICK, replay_size: int = WS_REPLAY_BUFFER,
+                 replay_max_users: int = WS_REPLAY_MAX_USERS):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"WS_SLOW_CONSUMER_POLICY tidak dikenal: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.connections: Dict[int, Set[Connection]] = {}
+        self.coalesce_window = coalesce_window_ms / 1000
+        self.coalesce_max_delay = max(coalesce_max_delay_ms, coalesce_window_ms) / 1000
+        self._batches: Dict[int, _PendingBatch] = {}
+        self.heartbeat = HeartbeatWheel(self, heartbeat_interval, heartbeat_timeout, heartbeat_tick)
+        self.replay_size = replay_size
+        self.replay_max_users = replay_max_users
+        self._replay: "OrderedDict[int, _ReplayBuffer]" = OrderedDict()
+        self._replay_floor = 0     # seq awal worker / buffer user yang sudah dibuang (LRU)
+        self.last_seq = 0
+        self.sending: Set[Connection] = set()      # koneksi yang sedang di tengah send
+        self._closing: Set[asyncio.Task] = set()   # task _close yang masih berjalan (referensi kuat)
+
+        self.sent = 0
+        self.skipped_offline = 0   # target user tanpa koneksi di proses ini
+        self.dead = 0              # send gagal / timeout
+        self.dropped = 0           # pesan dibuang karena antrian penuh
+        self.slow_disconnects = 0
+        self.coalesce_in = 0       # event masuk jendela coalescing
+        self.coalesce_out = 0      # frame yang keluar dari jendela
+        self.resumes = 0
+        self.replayed_events = 0
+        self.resyncs = 0
+        self.encodes = dict.fromkeys(ws_protocol.ENCODINGS, 0)       # encode per event
+        self.frames_out = dict.fromkeys(ws_protocol.ENCODINGS, 0)    # frame terkirim
+        self.bytes_out = dict.fromkeys(ws_protocol.ENCODINGS, 0)     # payload terkirim (sebelum deflate)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.send_latency = Histogram()   # enqueue → frame terkirim (detik)
+
+    # ---------- lifecycle ----------
+    async def connect(self, ws: WebSocket, user_id: int, encoding: str = ws_protocol.ENCODING_JSON,
+                      subprotocol: str | None = None) -> Connection:
+        await ws.accept(subprotocol=subprotocol)
+        loop = asyncio.get_running_loop()
+        conn = Connection(ws, user_id, self.queue_size, loop.time(), encoding)
+        conn.writer = loop.create_task(self._writer(conn))
+        self.connections.setdefault(user_id, set()).add(conn)
+        self.heartbeat.add(conn)
+        return conn
+
+    def connect_stream(self, user_id: int) -> Connection:
+        """Koneksi Server-Sent Events: tanpa socket & writer task; antriannya
+        dikuras oleh generator sse_frames (StreamingResponse)."""
+        conn = Connection(None, user_id, self.queue_size, asyncio.get_running_loop().time())
+        self.connections.setdefault(user_id, set()).add(conn)
+        self.heartbeat.add(conn)
+        return conn
+
+    async def sse_frames(self, conn: Connection):
+        loop = asyncio.get_running_loop()
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                item = await conn.queue.get()
+                if item is None:
+                    return
+                data, queued_at, seq = item
+                if data == "ping":
+                    frame = ": keep-alive\n\n"
+                elif seq is not None:
+                    frame = f"id: {seq}\ndata: {data}\n\n"
+                else:
+                    frame = f"data: {data}\n\n"
+                conn.sending_since = loop.time()
+                self.sending.add(conn)
+                yield frame
+                self.sending.discard(conn)
+                conn.sending_since = None
+                # client SSE tidak bisa mengirim apa pun; tulis yang berhasil = tanda hidup
+                conn.last_seen = loop.time()
+                self.sent += 1
+                self.frames_out[conn.encoding] += 1
+                self.bytes_out[conn.encoding] += len(frame)
+                self.send_latency.observe(time.monotonic() - queued_at)
+        finally:
+            self.disconnect(conn)
+
+    @staticmethod
+    def touch(conn: Connection):
+        """Catat frame masuk dari client (dipanggil receive loop)."""
+        conn.last_seen = asyncio.get_running_loop().time()
+
+    def disconnect(self, conn: Connection):
+        if conn.closed:
+            return
+        conn.closed = True
+        self.sending.discard(conn)
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+        sockets = self.connections.get(conn.user_id)
+        if sockets is None:
+            return
+        sockets.discard(conn)
+        if not sockets:
+            del self.connections[conn.user_id]
+
+    async def close_all(self, code: int = status.WS_1001_GOING_AWAY):
+        """Tutup semua koneksi dan tunggu writer task selesai (shutdown)."""
+        for batch in self._batches.values():
+            if batch.timer is not None:
+                batch.timer.cancel()
+        self._batches.clear()
+        await self.heartbeat.stop()
+        conns = [c for sockets in self.connections.values() for c in sockets]
+        writers = [c.writer for c in conns if c.writer is not None]
+        await asyncio.gather(*(self._close(c, code) for c in conns), return_exceptions=True)
+        await asyncio.gather(*writers, *self._closing, return_exceptions=True)
+
+    def close_later(self, conn: Connection, code: int):
+        """Tutup dari kode sync (wheel / send). Task disimpan sampai selesai
+        supaya tidak dibuang garbage collector di tengah jalan. Koneksi
+        langsung dilepas dari registry, jadi publish berikutnya melewatinya."""
+        self.disconnect(conn)
+        task = asyncio.get_running_loop().create_task(self._close(conn, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, conn: Connection, code: int):
+        self.disconnect(conn)
+        if conn.ws is None:
+            # SSE: akhiri generator lewat sentinel di antrian
+            if conn.queue.full():
+                conn.queue.get_nowait()
+            conn.queue.put_nowait(None)
+            return
+        try:
+            await conn.ws.close(code=code)
+        except Exception:
+            pass
+
+    async def _writer(self, conn: Connection):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data, queued_at, _ = await conn.queue.get()
+                conn.sending_since = loop.time()
+                self.sending.add(conn)
+                if isinstance(data, bytes):
+                    await conn.ws.send_bytes(data)
+                else:
+                    await conn.ws.send_text(data)
+                self.sending.discard(conn)
+                conn.sending_since = None
+                self.sent += 1
+                self.frames_out[conn.encoding] += 1
+                self.bytes_out[conn.encoding] += len(data)
+                self.send_latency.observe(time.monotonic() - queued_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # koneksi mati / macet → bersihkan
+            self.dead += 1
+            await self._close(conn, status.WS_1011_INTERNAL_ERROR)
+
+    # ---------- publish (non-blocking) ----------
+    def send(self, conn: Connection, data: str | bytes, seq: int | None = None) -> bool:
+        """Masukkan satu frame ke antrian koneksi (str = frame teks, bytes = biner).
+        False kalau dibuang/diputus. seq dipakai SSE sebagai field id:
+        (WebSocket membawanya di dalam pesan)."""
+        if conn.closed:
+            return False
+        queue = conn.queue
+        self.queue_depth.observe(queue.qsize())
+        item = (data, time.monotonic(), seq)
+        try:
+            queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "drop_newest":
+            self.dropped += 1
+            return False
+        if self.policy == "drop_oldest":
+            queue.get_nowait()
+            queue.put_nowait(item)
+            self.dropped += 1
+            return True
+        # disconnect: client bisa reconnect lalu ambil ulang state
+        self.slow_disconnects += 1
+        self.dropped += queue.qsize() + 1
+        self.close_later(conn, status.WS_1013_TRY_AGAIN_LATER)
+        return False
+
+    def publish(self, user_ids: Iterable[int], message: dict, seq: int | None = None) -> int:
+        """Antrikan event ke semua tab milik user_ids (encode sekali per encoding).
+        Harus dipanggil dari event loop (lihat services/backplane.py).
+        seq diisi backplane; event ber-seq disimpan di buffer replay user.
+        Return jumlah user online yang dituju."""
+        if seq is not None:
+            message = {**message, "seq": seq}
+            self.last_seq = max(self.last_seq, seq)
+        frames = _Frames(message, self.encodes)
+        coalesce = self.coalesce_window > 0 and _event_type(message) in COALESCE_EVENTS
+        online = 0
+        for user_id in set(user_ids):
+            if seq is not None:
+                self._remember(user_id, seq, message)
+            if user_id not in self.connections:
+                self.skipped_offline += 1
+                continue
+            online += 1
+            if coalesce:
+                self._buffer(user_id, message, frames)
+            else:
+                self._send_user(user_id, frames, seq)
+        return online
+
+    def _send_user(self, user_id: int, frames: _Frames, seq: int | None = None):
+        for conn in list(self.connections.get(user_id, ())):
+            self.send(conn, frames.get(conn.encoding), seq)
+
+    # ---------- coalescing ----------
+    def _buffer(self, user_id: int, message: dict, frames: _Frames):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        batch = self._batches.get(user_id)
+        if batch is None:
+            batch = self._batches[user_id] = _PendingBatch(now)
+        batch.items.append((message, frames))
+        self.coalesce_in += 1
+
+        # perpanjang jendela, tapi jangan melewati batas maksimum sejak event pertama
+        deadline = min(now + self.coalesce_window, batch.first_at + self.coalesce_max_delay)
+        if batch.timer is not None:
+            if batch.timer.when() <= deadline:
+                batch.timer.cancel()
+            else:
+                return
+        batch.timer = loop.call_at(deadline, self._flush, user_id)
+
+    def _flush(self, user_id: int):
+        batch = self._batches.pop(user_id, None)
+        if batch is None or not batch.items:
+            return
+        self.coalesce_out += 1
+        if len(batch.items) == 1:
+            # satu event saja → kirim apa adanya (format lama, encode dibagi antar user)
+            message, frames = batch.items[0]
+            self._send_user(user_id, frames, message.get("seq"))
+            return
+        frame = _merge([message for message, _ in batch.items])
+        self._send_user(user_id, _Frames(frame, self.encodes), frame.get("seq"))
+
+    # ---------- replay / resume ----------
+    def set_sequence_base(self, seq: int):
+        """seq backplane saat worker mulai; client dengan last_seq lebih lama → resync."""
+        self.last_seq = max(self.last_seq, seq)
+        self._replay_floor = max(self._replay_floor, seq)
+
+    def _remember(self, user_id: int, seq: int, message: dict):
+        buffer = self._replay.get(user_id)
+        if buffer is None:
+            buffer = self._replay[user_id] = _ReplayBuffer(self._replay_floor, self.replay_size)
+            if len(self._replay) > self.replay_max_users:
+                # user paling lama tidak menerima event; selisihnya tidak bisa di-replay lagi
+                _, dropped = self._replay.popitem(last=False)
+                if dropped.events:
+                    self._replay_floor = max(self._replay_floor, dropped.events[-1][0])
+        else:
+            self._replay.move_to_end(user_id)
+        buffer.append(seq, message)
+
+    def resume(self, conn: Connection, last_seq: int) -> int:
+        """Kirim event yang terlewat sejak last_seq (digabung jadi satu frame),
+        atau satu frame resync. Return jumlah event yang di-replay."""
+        self.resumes += 1
+        buffer = self._replay.get(conn.user_id)
+        floor = buffer.evicted_through if buffer is not None else self._replay_floor
+        # last_seq dari masa depan = seq worker/proses lain yang sudah restart
+        if last_seq < floor or last_seq > self.last_seq:
+            self.resyncs += 1
+            frame = {"event": "resync", "seq": self.last_seq}
+            self.send(conn, _Frames(frame, self.encodes).get(conn.encoding), self.last_seq)
+            return 0
 
-    async def connect(self, ws: WebSocket):
-        await ws.accept()
-        self.active_connections.append(ws)
+        missed = [message for seq, message in (buffer.events if buffer else ()) if seq > last_seq]
+        # event yang masih menunggu di jendela coalescing akan terkirim sendiri
+        batch = self._batches.get(conn.user_id)
+        if batch is not None and missed:
+            pending = {message.get("seq") for message, _ in batch.items}
+            missed = [message for message in missed if message["seq"] not in pending]
+        if not missed:
+            return 0
+        self.replayed_events += len(missed)
+        frame = missed[0] if len(missed) == 1 else _merge(missed)
+        self.send(conn, _Frames(frame, self.encodes).get(conn.encoding), frame.get("seq"))
+        return len(missed)
 
-    def disconnect(self, ws: WebSocket):
-        if ws in self.active_connections:
-            self.active_connections.remove(ws)
+    def stats(self) -> dict:
+        conns = [c for sockets in self.connections.values() for c in sockets]
+        depths = [c.queue.qsize() for c in conns]
+        return {
+            "users": len(self.connections),
+            "connections": len(conns),
+            "sse_connections": sum(1 for c in conns if c.ws is None),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.policy,
+            "queued_now": sum(depths),
+            "max_queue_depth_now": max(depths, default=0),
+            "sent": self.sent,
+            "skipped_offline": self.skipped_offline,
+            "dead": self.dead,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "sending_now": len(self.sending),
+            "coalesce_window_ms": self.coalesce_window * 1000,
+            "coalesce_events_in": self.coalesce_in,
+            "coalesce_frames_out": self.coalesce_out,
+            "coalesce_pending_users": len(self._batches),
+            "last_seq": self.last_seq,
+            "replay_users": len(self._replay),
+            "resumes": self.resumes,
+            "replayed_events": self.replayed_events,
+            "resyncs": self.resyncs,
+            "encodings": {
+                encoding: {
+                    "connections": sum(1 for c in conns if c.encoding == encoding),
+                    "encoded": self.encodes[encoding],
+                    "frames": self.frames_out[encoding],
+                    "bytes": self.bytes_out[encoding],
+                }
+                for encoding in ws_protocol.ENCODINGS
+            },
+            "heartbeat": self.heartbeat.stats(),
+            "queue_depth_at_enqueue": self.queue_depth.snapshot(),
+            "send_latency_seconds": self.send_latency.snapshot(),
+        }
 
-    async def broadcast(self, message: dict):
-        data = json.dumps(message)
-        for connection in self.active_connections:
-            await connection.send_text(data)
 
 manager = ConnectionManager()
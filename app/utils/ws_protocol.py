@@ -0,0 +1,252 @@
+import json
+import struct
+
+
+# ============================================
+# ENCODING FRAME REALTIME (/ws/unread)
+# ============================================
+# json    : teks JSON apa adanya (default, kompatibel client lama)
+# msgpack : frame biner MessagePack dengan key pendek & kode event angka,
+#           untuk client mobile (hemat byte per pesan)
+# Dinegosiasikan lewat subprotocol WebSocket (Sec-WebSocket-Protocol) atau
+# ?encoding=. Kompresi permessage-deflate dinegosiasikan oleh uvicorn
+# (ws_per_message_deflate, default aktif) dan berlaku untuk keduanya.
+# Tabel kode bisa diambil client dari GET /ws/protocol.
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+ENCODINGS = (ENCODING_JSON, ENCODING_MSGPACK)
+
+SUBPROTOCOLS = {
+    "edoc.json.v1": ENCODING_JSON,
+    "edoc.msgpack.v1": ENCODING_MSGPACK,
+}
+
+# kode event — JANGAN ubah nilai yang sudah ada, hanya tambah
+EVENT_CODES = {
+    "document_created": 1,
+    "document_assigned": 2,
+    "approval_status_changed": 3,
+    "update_read": 4,
+    "new_inbox": 5,
+    "new_waiting": 6,
+    "documents_changed": 7,
+    "resync": 8,
+}
+
+# Nama key lama yang disamakan dulu sebelum dipendekkan (frame msgpack selalu
+# memakai nama kanonik; frame JSON tetap apa adanya).
+KEY_ALIASES = {
+    "type": "event",           # file_routes memakai "type" untuk nama event
+    "doc_id": "document_id",
+}
+
+# satu kode per key kanonik — kode tidak boleh dipakai dua key
+KEY_CODES = {
+    "event": "e",
+    "seq": "q",
+    "document_id": "d",
+    "document_ids": "ds",
+    "types": "es",
+    "count": "n",
+    "user_id": "u",
+    "creator_id": "c",
+    "approver_ids": "a",
+    "recipient_ids": "r",
+    "status": "s",
+    "title": "t",
+    "category": "k",
+}
+
+
+def negotiate(subprotocols, requested: str | None = None):
+    """Pilih encoding dari subprotocol client (prioritas) atau ?encoding=.
+    Return (encoding, subprotocol yang dibalas ke client atau None)."""
+    for proto in subprotocols or ():
+        if proto in SUBPROTOCOLS:
+            return SUBPROTOCOLS[proto], proto
+    if requested in ENCODINGS:
+        return requested, None
+    return ENCODING_JSON, None
+
+
+def compact(message: dict) -> dict:
+    """Key pendek + kode event. ValueError kalau dua key (mis. "type" dan
+    "event") jatuh ke kode yang sama dengan nilai berbeda."""
+    out = {}
+    for key, value in message.items():
+        key = KEY_ALIASES.get(key, key)
+        if key == "event":
+            value = EVENT_CODES.get(value, value)
+        elif key == "types":
+            value = [EVENT_CODES.get(v, v) for v in value]
+        code = KEY_CODES.get(key, key)
+        if code in out and out[code] != value:
+            raise ValueError(f"Key pesan bentrok setelah dipendekkan: {key!r} → {code!r}")
+        out[code] = value
+    return out
+
+
+def encode(message: dict, encoding: str):
+    """str untuk JSON (frame teks), bytes untuk msgpack (frame biner)."""
+    if encoding == ENCODING_MSGPACK:
+        return packb(compact(message))
+    return json.dumps(message)
+
+
+# ---------- MessagePack (subset: nil, bool, int, float, str, bin, array, map) ----------
+def packb(obj) -> bytes:
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack(obj, out: bytearray):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode()
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n < 0x100:
+            out += bytes((0xD9, n))
+        elif n < 0x10000:
+            out.append(0xDA)
+            out += struct.pack(">H", n)
+        else:
+            out.append(0xDB)
+            out += struct.pack(">I", n)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            out += bytes((0xC4, n))
+        elif n < 0x10000:
+            out.append(0xC5)
+            out += struct.pack(">H", n)
+        else:
+            out.append(0xC6)
+            out += struct.pack(">I", n)
+        out += obj
+    elif isinstance(obj, (list, tuple, set)):
+        _pack_len(len(obj), 0x90, 0xDC, out)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_len(len(obj), 0x80, 0xDE, out)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Tipe tidak didukung msgpack: {type(obj).__name__}")
+
+
+def _pack_len(n: int, fix: int, base: int, out: bytearray):
+    # fixarray/fixmap (< 16), 16-bit, 32-bit
+    if n < 16:
+        out.append(fix | n)
+    elif n < 0x10000:
+        out.append(base)
+        out += struct.pack(">H", n)
+    else:
+        out.append(base + 1)
+        out += struct.pack(">I", n)
+
+
+def _pack_int(n: int, out: bytearray):
+    if 0 <= n < 0x80:
+        out.append(n)
+    elif -32 <= n < 0:
+        out.append(n & 0xFF)
+    elif n >= 0:
+        for code, fmt, limit in ((0xCC, ">B", 0x100), (0xCD, ">H", 0x10000),
+                                 (0xCE, ">I", 0x100000000), (0xCF, ">Q", 1 << 64)):
+            if n < limit:
+                out.append(code)
+                out += struct.pack(fmt, n)
+                return
+        raise OverflowError("int terlalu besar untuk msgpack")
+    else:
+        for code, fmt, limit in ((0xD0, ">b", 1 << 7), (0xD1, ">h", 1 << 15),
+                                 (0xD2, ">i", 1 << 31), (0xD3, ">q", 1 << 63)):
+            if n >= -limit:
+                out.append(code)
+                out += struct.pack(fmt, n)
+                return
+        raise OverflowError("int terlalu kecil untuk msgpack")
+
+
+def unpackb(data: bytes):
+    """Decoder pasangan packb (untuk test, benchmark & client Python)."""
+    obj, pos = _unpack(memoryview(data), 0)
+    if pos != len(data):
+        raise ValueError("Sisa byte setelah objek msgpack")
+    return obj
+
+
+_FIXED = {0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+          0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q", 0xCB: ">d", 0xCA: ">f"}
+
+
+def _unpack(buf: memoryview, pos: int):
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b <= 0xBF:
+        return _take_str(buf, pos, b & 0x1F)
+    if 0x90 <= b <= 0x9F:
+        return _take_array(buf, pos, b & 0x0F)
+    if 0x80 <= b <= 0x8F:
+        return _take_map(buf, pos, b & 0x0F)
+    if b == 0xC0:
+        return None, pos
+    if b in (0xC2, 0xC3):
+        return b == 0xC3, pos
+    if b in _FIXED:
+        fmt = _FIXED[b]
+        size = struct.calcsize(fmt)
+        return struct.unpack_from(fmt, buf, pos)[0], pos + size
+    if b in (0xD9, 0xDA, 0xDB, 0xC4, 0xC5, 0xC6, 0xDC, 0xDD, 0xDE, 0xDF):
+        fmt = {0xD9: ">B", 0xC4: ">B", 0xDA: ">H", 0xC5: ">H", 0xDC: ">H", 0xDE: ">H"}.get(b, ">I")
+        n = struct.unpack_from(fmt, buf, pos)[0]
+        pos += struct.calcsize(fmt)
+        if b in (0xD9, 0xDA, 0xDB):
+            return _take_str(buf, pos, n)
+        if b in (0xC4, 0xC5, 0xC6):
+            return bytes(buf[pos:pos + n]), pos + n
+        if b in (0xDC, 0xDD):
+            return _take_array(buf, pos, n)
+        return _take_map(buf, pos, n)
+    raise ValueError(f"Byte msgpack tidak didukung: 0x{b:02x}")
+
+
+def _take_str(buf, pos, n):
+    return bytes(buf[pos:pos + n]).decode(), pos + n
+
+
+def _take_array(buf, pos, n):
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(buf, pos)
+        items.append(item)
+    return items, pos
+
+
+def _take_map(buf, pos, n):
+    out = {}
+    for _ in range(n):
+        key, pos = _unpack(buf, pos)
+        out[key], pos = _unpack(buf, pos)
+    return out, pos
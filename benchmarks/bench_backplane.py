@@ -0,0 +1,97 @@
+"""Benchmark backplane WebSocket antar worker (mode sql).
+
+Beberapa proses "worker" masing-masing menjalankan SQLBackplane dengan event
+loop sendiri; proses induk mem-publish event. Mengukur latency publish →
+diterima per worker, dan memastikan tiap worker menerima setiap event
+tepat sekali.
+
+    python -m benchmarks.bench_backplane --workers 4 --events 500 --poll 0.05
+
+Default memakai SQLite sementara; set DATABASE_URL untuk MySQL.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_backplane.db')}"
+)
+
+from app import models  # noqa: E402,F401
+from app.database import Base, engine  # noqa: E402
+from app.services.backplane import SQLBackplane  # noqa: E402
+
+
+def worker_main(events, poll, ready, results):
+    async def run():
+        received = {}
+        done = asyncio.Event()
+
+        def deliver(user_ids, message, seq):
+            n = message["n"]
+            received.setdefault(n, []).append(time.time() - message["sent_at"])
+            if len(received) == events:
+                done.set()
+
+        bus = SQLBackplane(poll_seconds=poll)
+        bus.start(asyncio.get_running_loop(), deliver)
+        ready.set()
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.to_thread(bus.stop)
+        latencies = [lat for lats in received.values() for lat in lats]
+        duplicates = sum(len(lats) - 1 for lats in received.values())
+        results.put((os.getpid(), len(received), duplicates, latencies))
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--poll", type=float, default=0.05)
+    parser.add_argument("--interval", type=float, default=0.002, help="jeda antar publish (detik)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    readies, procs = [], []
+    for _ in range(args.workers):
+        ready = ctx.Event()
+        proc = ctx.Process(target=worker_main, args=(args.events, args.poll, ready, results))
+        proc.start()
+        readies.append(ready)
+        procs.append(proc)
+    for ready in readies:
+        ready.wait(30)
+
+    publisher = SQLBackplane()
+    start = time.perf_counter()
+    for n in range(args.events):
+        publisher.publish([n % 50], {"event": "approval_status_changed", "n": n, "sent_at": time.time()})
+        time.sleep(args.interval)
+    elapsed = time.perf_counter() - start
+    print(f"publish: {args.events} event dalam {elapsed:.2f}s ({args.events / elapsed:.0f}/s)")
+
+    for _ in procs:
+        pid, got, duplicates, latencies = results.get(timeout=90)
+        latencies.sort()
+        print(f"worker {pid}: diterima {got}/{args.events} duplikat={duplicates} "
+              f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+              f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Load benchmark login: lonjakan login bersamaan (awal shift).
+
+Mengukur latency /auth/login, jumlah 503 (antrian bcrypt penuh), dan
+latency endpoint sync lain (/users/users) selama lonjakan berlangsung,
+untuk memastikan bcrypt tidak menghabiskan threadpool.
+
+    python -m benchmarks.bench_login --logins 200 --users 20
+    BCRYPT_WORKERS=2 BCRYPT_MAX_QUEUE=8 python -m benchmarks.bench_login
+
+Default memakai SQLite sementara; set DATABASE_URL untuk MySQL.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}"
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import auth, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+PASSWORD = "rahasia-shift-pagi"
+
+
+def seed_users(n: int):
+    hashed = auth.hash_password(PASSWORD)
+    with SessionLocal() as db:
+        for i in range(n):
+            email = f"bench{i}@example.com"
+            if not db.query(models.User.id).filter(models.User.email == email).first():
+                db.add(models.User(name=f"Bench {i}", email=email, password_hash=hashed))
+        db.commit()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    seed_users(args.users)
+    client = TestClient(app)
+
+    login_latency, statuses = [], []
+    probe_latency = []
+    done = threading.Event()
+
+    def login(i):
+        start = time.perf_counter()
+        r = client.post("/auth/login", data={
+            "username": f"bench{i % args.users}@example.com", "password": PASSWORD,
+        })
+        login_latency.append(time.perf_counter() - start)
+        statuses.append(r.status_code)
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/users/users")
+            probe_latency.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    ok = statuses.count(200)
+    busy = statuses.count(503)
+    print(f"workers={auth.BCRYPT_WORKERS} max_queue={auth.BCRYPT_MAX_QUEUE} logins={args.logins} "
+          f"elapsed={elapsed:.2f}s ok={ok} 503={busy} other={len(statuses) - ok - busy}")
+    print(f"login  p50={statistics.median(login_latency) * 1000:.0f}ms "
+          f"p95={percentile(login_latency, 0.95) * 1000:.0f}ms")
+    print(f"probe  p50={statistics.median(probe_latency) * 1000:.0f}ms "
+          f"p95={percentile(probe_latency, 0.95) * 1000:.0f}ms  (n={len(probe_latency)})")
+    stats = auth.password_hasher.stats()
+    verify = stats["latency_seconds"].get("verify", {"sum": 0, "count": 0})
+    if verify["count"]:
+        print(f"bcrypt verify avg={verify['sum'] / verify['count'] * 1000:.0f}ms  rejected={stats['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark alokasi no_surat paralel.
+
+Membandingkan cara lama (baca dokumen terakhir lalu +1) dengan
+NoSuratAllocator (tabel sequence, blok 1 dan blok N).
+
+    python -m benchmarks.bench_no_surat --threads 16 --per-thread 200
+
+Default memakai SQLite sementara; set DATABASE_URL untuk MySQL.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_no_surat.db')}"
+)
+
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.no_surat import NoSuratAllocator  # noqa: E402
+
+
+def legacy_next(db):
+    last_doc = db.query(models.Document).order_by(models.Document.id.desc()).first()
+    if not last_doc or not last_doc.no_surat:
+        return "0000000001"
+    return str(int(last_doc.no_surat) + 1).zfill(10)
+
+
+def run_threads(threads, per_thread, work):
+    errors = []
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            try:
+                local.append(work())
+            except Exception as e:  # duplikat, lock timeout, dll
+                errors.append(type(e).__name__)
+        with lock:
+            results.extend(local)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start, results, errors
+
+
+def bench_legacy(threads, per_thread):
+    def work():
+        with SessionLocal() as db:
+            no = legacy_next(db)
+            db.add(models.Document(no_surat=no, title="bench", content=""))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise
+            return no
+
+    return run_threads(threads, per_thread, work)
+
+
+def bench_allocator(threads, per_thread, block_size):
+    allocator = NoSuratAllocator(name=f"bench_{block_size}", block_size=block_size)
+    return run_threads(threads, per_thread, allocator.allocate)
+
+
+def report(label, elapsed, results, errors):
+    total = len(results) + len(errors)
+    dupes = len(results) - len(set(results))
+    print(
+        f"{label:<22} {total:>6} calls  {elapsed:7.3f}s  "
+        f"{total / elapsed:9.0f}/s  ok={len(results)} errors={len(errors)} dupes={dupes}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=200)
+    parser.add_argument("--block", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    report("legacy (max+1)", *bench_legacy(args.threads, args.per_thread))
+    report("allocator block=1", *bench_allocator(args.threads, args.per_thread, 1))
+    report(f"allocator block={args.block}", *bench_allocator(args.threads, args.per_thread, args.block))
+
+
+if __name__ == "__main__":
+    main()
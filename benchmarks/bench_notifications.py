@@ -0,0 +1,119 @@
+"""Benchmark dispatcher notifikasi terhadap stub provider lokal.
+
+Stub HTTP (thread) meniru Fonnte/Twilio dengan delay dan rasio error 5xx.
+Membandingkan cara lama (requests.post sync per pesan, koneksi baru) dengan
+NotificationDispatcher (antri → worker async, koneksi keep-alive, retry).
+
+    python -m benchmarks.bench_notifications --messages 500 --delay 0.05 --error-rate 0.1
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from app.services.notifications import (  # noqa: E402
+    Notification, NotificationDispatcher, SMSProvider, WhatsAppProvider,
+)
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    delay = 0.05
+    error_rate = 0.0
+    received = 0
+    lock = threading.Lock()
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        failed = random.random() < self.error_rate
+        body = b'{"status": false}' if failed else b'{"status": true}'
+        self.send_response(503 if failed else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if not failed:
+            with StubProvider.lock:
+                StubProvider.received += 1
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(delay, error_rate):
+    StubProvider.delay = delay
+    StubProvider.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProvider)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def bench_legacy(url, messages):
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        try:
+            requests.post(f"{url}/send", data={"target": f"08{i}", "message": "otp"},
+                          headers={"Authorization": "stub"}, timeout=10)
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_dispatcher(url, messages):
+    dispatcher = NotificationDispatcher(
+        [WhatsAppProvider(url=f"{url}/send", token="stub", concurrency=8),
+         SMSProvider(base_url=url, sid="AC0", token="stub", from_number="+1", concurrency=4)],
+        workers=16, queue_size=messages * 2, backoff=0.05,
+    )
+    latencies = []
+    start_all = time.perf_counter()
+    for i in range(messages):
+        start = time.perf_counter()
+        dispatcher.enqueue(Notification("whatsapp", f"08{i}", "otp",
+                                        fallback=Notification("sms", f"08{i}", "otp")))
+        latencies.append(time.perf_counter() - start)
+    dispatcher.flush(timeout=120)
+    drained = time.perf_counter() - start_all
+    stats = dispatcher.stats()
+    dispatcher.close()
+    return latencies, drained, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--legacy", type=int, default=50, help="jumlah pesan untuk jalur lama (sync)")
+    args = parser.parse_args()
+
+    server, url = start_stub(args.delay, args.error_rate)
+
+    legacy = bench_legacy(url, args.legacy)
+    print(f"lama : {args.legacy} pesan, latency endpoint p50={statistics.median(legacy) * 1000:.1f}ms "
+          f"total={sum(legacy):.2f}s")
+
+    StubProvider.received = 0
+    latencies, drained, stats = bench_dispatcher(url, args.messages)
+    latencies.sort()
+    print(f"baru : {args.messages} pesan, enqueue p50={statistics.median(latencies) * 1e6:.0f}us "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us, semua selesai {drained:.2f}s")
+    print(f"       sent={stats['sent']} failed={stats['failed']} retried={stats['retried']} "
+          f"diterima stub={StubProvider.received}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
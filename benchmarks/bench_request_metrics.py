@@ -0,0 +1,90 @@
+"""Benchmark overhead RequestMetricsMiddleware per request.
+
+Memanggil app ASGI minimal (route FastAPI tanpa DB) langsung, tanpa server,
+dengan dan tanpa middleware metrik; selisih waktu per request = overhead.
+Juga mengukur biaya event SQLAlchemy per statement (SQLite in-memory
+"SELECT 1" = kasus terburuk; query MySQL sungguhan jauh lebih lama).
+
+    python -m benchmarks.bench_request_metrics --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.core.request_metrics import RequestMetrics, RequestMetricsMiddleware  # noqa: E402
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/documents/{doc_id}")
+    async def detail(doc_id: int):
+        return {"id": doc_id}
+
+    return app
+
+
+async def run_requests(app, n):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(n):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/documents/{i}", "raw_path": f"/documents/{i}".encode(),
+            "root_path": "", "query_string": b"", "headers": [], "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / n
+
+
+def bench_statements(n):
+    timings = []
+    for registry in (None, RequestMetrics()):
+        engine = create_engine("sqlite://")
+        if registry is not None:
+            registry.attach_engine(engine, "bench")
+        with engine.connect() as conn:
+            for _ in range(1000):   # pemanasan cache kompilasi
+                conn.execute(text("SELECT 1"))
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                for _ in range(n):
+                    conn.execute(text("SELECT 1"))
+                best = min(best, (time.perf_counter() - start) / n)
+            timings.append(best)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    app = build_app()
+    instrumented = RequestMetricsMiddleware(app, RequestMetrics())
+    asyncio.run(run_requests(app, 1000))   # pemanasan
+    plain = min(asyncio.run(run_requests(app, args.requests)) for _ in range(3))
+    measured = min(asyncio.run(run_requests(instrumented, args.requests)) for _ in range(3))
+    print(f"request tanpa metrik : {plain * 1e6:.1f} us")
+    print(f"request dengan metrik: {measured * 1e6:.1f} us (overhead {(measured - plain) * 1e6:.1f} us)")
+
+    bare, hooked = bench_statements(args.requests)
+    print(f"statement SQL        : {bare * 1e6:.1f} us → {hooked * 1e6:.1f} us dengan event "
+          f"(overhead {(hooked - bare) * 1e6:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark latency pencarian dokumen (p50/p95).
+
+    python -m benchmarks.bench_search --docs 5000 --queries 500
+
+Default memakai SQLite sementara (fallback inverted index); set
+DATABASE_URL ke MySQL untuk mengukur jalur FULLTEXT.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_search.db')}"
+)
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services import search  # noqa: E402
+from app.services.search import ensure_search_indexes  # noqa: E402
+
+WORDS = (
+    "laporan ratio bensin analisa bulan agustus memo pengadaan baja gudang "
+    "produksi invoice kontrak revisi anggaran pengiriman kualitas audit"
+).split()
+NAMES = ["Andi", "Budi", "Citra", "Dewi", "Eko", "Fajar", "Gita", "Hadi", "Indra", "Joko"]
+
+
+def seed(db, n_docs: int, n_users: int):
+    db.execute(insert(models.User), [
+        {"email": f"user{i}@bench.local", "name": f"{random.choice(NAMES)} {i}", "password_hash": "x"}
+        for i in range(n_users)
+    ])
+    db.execute(insert(models.Document), [
+        {
+            "no_surat": f"{i + 1:010d}",
+            "title": " ".join(random.choices(WORDS, k=4)),
+            "content": " ".join(random.choices(WORDS, k=60)),
+            "creator_id": random.randint(1, n_users),
+            "is_deleted": False,
+        }
+        for i in range(n_docs)
+    ])
+    db.execute(insert(models.Approver), [
+        {"document_id": d, "user_id": random.randint(1, n_users), "seq_index": 0}
+        for d in range(1, n_docs + 1)
+    ])
+    db.execute(insert(models.Recipient), [
+        {"document_id": d, "user_id": random.randint(1, n_users), "is_deleted": False}
+        for d in range(1, n_docs + 1)
+    ])
+    db.commit()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_search_indexes(engine)
+    with SessionLocal() as db:
+        seed(db, args.docs, args.users)
+
+    queries = (
+        [random.choice(WORDS) for _ in range(args.queries // 2)]
+        + [random.choice(WORDS)[:4] for _ in range(args.queries // 4)]
+        + [f"{random.randint(1, args.docs):010d}"[:7] for _ in range(args.queries // 8)]
+        + [random.choice(NAMES) for _ in range(args.queries // 8)]
+    )
+
+    samples = []
+    with SessionLocal() as db:
+        # build index/cache pertama tidak dihitung
+        search.search_documents(db, WORDS[0], 1)
+        for q in queries:
+            user_id = random.randint(1, args.users)
+            start = time.perf_counter()
+            search.search_documents(db, q, user_id, page=1, page_size=20)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    print(f"backend={engine.dialect.name} docs={args.docs} queries={len(samples)}")
+    print(
+        f"p50={percentile(samples, 50):.2f}ms  p95={percentile(samples, 95):.2f}ms  "
+        f"max={max(samples):.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
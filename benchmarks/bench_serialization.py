@@ -0,0 +1,164 @@
+"""Micro-benchmark serialisasi list dokumen dashboard.
+
+Jalur lama : doc_to_dict lama (hasattr + strftime) → jsonable_encoder → json.dumps
+Jalur baru : doc_to_dict sekarang → schemas.dashboard_adapter.dump_json (bytes)
+
+    python -m benchmarks.bench_serialization --docs 5000 --rounds 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}"
+)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app import models, schemas  # noqa: E402
+from app.routes.file_routes import doc_to_dict  # noqa: E402
+
+WIB = timezone(timedelta(hours=7))
+
+
+def legacy_to_wib(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(WIB).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def legacy_doc_to_dict(doc, current_user_id):
+    files_list = []
+    for f in doc.files:
+        if f.is_deleted:
+            continue
+        files_list.append({
+            "id": f.id,
+            "filename": f.filename,
+            "path": f.path,
+            "is_stamped": ("stamped_" in f.filename) or ("rejected_" in f.filename),
+            "download_url": f"/documents/{doc.id}/file/{f.id}",
+        })
+    if not files_list:
+        files_list = [{"message": "Tidak ada File yang Dilampirkan"}]
+
+    stamped_candidates = [f for f in doc.files if ("stamped_" in f.filename) or ("rejected_" in f.filename)]
+    stamped_file_path = stamped_candidates[-1].path if stamped_candidates else "<Belum Full Approved/Reject>"
+
+    recipient_for_user = next((r for r in doc.recipients if r.user_id == current_user_id), None)
+    is_read = recipient_for_user.is_read if recipient_for_user else False
+    unread_inbox = recipient_for_user and not recipient_for_user.is_read
+    unread_approval = any(
+        (hasattr(a, "has_read") and a.user_id == current_user_id
+         and a.status == models.StatusEnum.waiting and not a.has_read)
+        for a in doc.approvers
+    )
+    unread = unread_inbox or unread_approval
+
+    return {
+        "id": doc.id,
+        "no_surat": doc.no_surat,
+        "title": doc.title,
+        "content": doc.content,
+        "status": doc.status.value if hasattr(doc.status, "value") else doc.status,
+        "creator": doc.creator.name if doc.creator else None,
+        "created_at": legacy_to_wib(doc.created_at),
+        "approvers": [
+            {
+                "user": a.user.name,
+                "status": a.status.value if hasattr(a.status, "value") else a.status,
+                "seq_index": a.seq_index,
+                "waktu": legacy_to_wib(a.waktu),
+            }
+            for a in doc.approvers
+        ],
+        "recipients": [r.user.name for r in doc.recipients],
+        "files": files_list,
+        "stamped_pdf": stamped_file_path,
+        "is_read": is_read,
+        "unread": unread,
+    }
+
+
+def make_documents(n: int):
+    """Objek ORM transient (tanpa DB) dengan relasi terisi, mirip hasil joinedload."""
+    users = [models.User(id=i, name=f"User {i}", email=f"u{i}@x", password_hash="x") for i in range(1, 51)]
+    statuses = list(models.StatusEnum)
+    now = datetime.utcnow()
+    docs = []
+    for i in range(1, n + 1):
+        doc = models.Document(
+            id=i, no_surat=f"{i:010d}", title=f"Laporan Ratio Bensin {i}",
+            content="Analisa bulan Agustus " * 5, status=random.choice(statuses),
+            created_at=now - timedelta(minutes=i), is_deleted=False,
+        )
+        doc.creator = random.choice(users)
+        doc.approvers = [
+            models.Approver(id=i * 10 + k, user_id=u.id, user=u, seq_index=k,
+                            status=random.choice(statuses), waktu=now, has_read=bool(k % 2))
+            for k, u in enumerate(random.sample(users, 3))
+        ]
+        doc.recipients = [
+            models.Recipient(id=i * 10 + k, user_id=u.id, user=u, is_read=bool(k % 2))
+            for k, u in enumerate(random.sample(users, 4))
+        ]
+        doc.files = [
+            models.File(id=i * 10, filename=f"{i}_Laporan.pdf", path=f"uploads/{i}_Laporan.pdf", is_deleted=False),
+            models.File(id=i * 10 + 1, filename=f"stamped_{i}_Laporan.pdf",
+                        path=f"approved_docs/stamped_{i}_Laporan.pdf", is_deleted=False),
+        ]
+        docs.append(doc)
+    return docs
+
+
+def split_dashboard(rows):
+    size = len(rows) // 5 or 1
+    keys = ["approved_by_me", "my_finalized", "pending_but_waiting", "ready_to_approve", "inbox"]
+    return {k: rows[i * size:(i + 1) * size] for i, k in enumerate(keys)}
+
+
+def old_path(docs, user_id):
+    payload = split_dashboard([legacy_doc_to_dict(d, user_id) for d in docs])
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def new_path(docs, user_id):
+    return schemas.dashboard_adapter.dump_json(split_dashboard([doc_to_dict(d, user_id) for d in docs]))
+
+
+def best_of(fn, rounds, *args):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_documents(args.docs)
+    user_id = 7
+
+    assert json.loads(old_path(docs, user_id)) == json.loads(new_path(docs, user_id)), "output berbeda"
+
+    old = best_of(old_path, args.rounds, docs, user_id)
+    new = best_of(new_path, args.rounds, docs, user_id)
+    print(f"docs={args.docs}  lama={old * 1000:.1f}ms  baru={new * 1000:.1f}ms  speedup={old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
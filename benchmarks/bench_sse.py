@@ -0,0 +1,68 @@
+"""Benchmark stream SSE idle: memori & CPU per koneksi.
+
+Membuka --streams koneksi SSE lewat ConnectionManager.connect_stream dan
+menguras sse_frames() dengan task konsumen (pengganti StreamingResponse,
+tanpa socket). Mengukur memori Python per stream (tracemalloc) dan CPU
+saat idle dengan keep-alive dari HeartbeatWheel (--period diperkecil supaya
+terlihat; produksi 30 detik).
+
+    python -m benchmarks.bench_sse --streams 10000 --period 1 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ws_manager import ConnectionManager  # noqa: E402
+
+
+async def consume(manager, conn, counter):
+    async for _ in manager.sse_frames(conn):
+        counter[0] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=10000)
+    parser.add_argument("--period", type=float, default=1.0, help="interval keep-alive (detik)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    n = args.streams
+
+    manager = ConnectionManager(heartbeat_interval=args.period, heartbeat_timeout=args.period * 1000,
+                                heartbeat_tick=args.period / 10)
+    counter = [0]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = []
+    for i in range(n):
+        conn = manager.connect_stream(i)
+        tasks.append(asyncio.create_task(consume(manager, conn, counter)))
+    await asyncio.sleep(0.2)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"memori: {used / n / 1024:.2f} KiB per stream ({used / 1024 / 1024:.1f} MiB untuk {n})")
+
+    frames_before = counter[0]
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.duration)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    print(f"idle  : CPU {cpu / wall * 100:.1f}% ({cpu / wall / n * 1e6:.2f} us CPU/detik/stream), "
+          f"keep-alive terkirim={counter[0] - frames_before}")
+
+    # publish satu event ke semua stream (termasuk coalescing + buffer replay)
+    start = time.perf_counter()
+    manager.publish(range(n), {"event": "approval_status_changed", "document_id": 1}, seq=1)
+    print(f"publish ke {n} stream: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    await manager.close_all()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
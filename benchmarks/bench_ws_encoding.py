@@ -0,0 +1,104 @@
+"""Benchmark ukuran frame WebSocket per encoding (json vs msgpack).
+
+Event contoh dari doc_routes/file_routes di-encode dengan ws_protocol.encode,
+lalu dikompres seperti permessage-deflate (raw deflate, context takeover:
+satu kompresor per koneksi, tiap pesan diakhiri sync flush tanpa 4 byte
+ekor; juga tanpa context takeover, yang sering dipilih client mobile
+untuk hemat memori). Juga mengukur publish ke --clients socket palsu dengan encoding
+campuran untuk memastikan tiap event hanya di-encode sekali per encoding.
+
+    python -m benchmarks.bench_ws_encoding --events 1000 --clients 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import ws_protocol  # noqa: E402
+from app.utils.ws_manager import ConnectionManager  # noqa: E402
+
+
+class NullWebSocket:
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+    send_bytes = send_text
+
+
+def sample_events(n):
+    kinds = [
+        lambda i: {"event": "document_created", "document_id": i, "title": f"Surat Edaran {i}", "creator_id": i % 40},
+        lambda i: {"event": "document_assigned", "document_id": i, "approver_ids": [3, 7, 12], "recipient_ids": [21, 22]},
+        lambda i: {"event": "approval_status_changed", "document_id": i, "user_id": 7, "status": "approved"},
+        lambda i: {"type": "update_read", "doc_id": i, "user_id": 21},
+        lambda i: {"type": "new_inbox", "doc_id": i, "user_id": 22},
+    ]
+    return [{**kinds[i % len(kinds)](i), "seq": 100000 + i} for i in range(n)]
+
+
+def deflate_sizes(frames, context_takeover=True):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    sizes = []
+    for data in frames:
+        if not context_takeover:
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw = data.encode() if isinstance(data, str) else data
+        out = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        sizes.append(len(out) - 4)
+    return sizes
+
+
+async def bench_publish(events, clients):
+    manager = ConnectionManager(coalesce_window_ms=0, heartbeat_interval=3600, heartbeat_timeout=3600)
+    for i in range(clients):
+        encoding = ws_protocol.ENCODINGS[i % len(ws_protocol.ENCODINGS)]
+        await manager.connect(NullWebSocket(), i, encoding)
+    start = time.perf_counter()
+    for seq, message in enumerate(events, 1):
+        manager.publish(range(clients), message, seq=seq)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.1)
+    stats = manager.stats()
+    await manager.close_all()
+    print(f"publish {len(events)} event ke {clients} socket campuran: {elapsed * 1000:.0f}ms "
+          f"({elapsed / len(events) / clients * 1e6:.2f} us/frame)")
+    for encoding, row in stats["encodings"].items():
+        print(f"  {encoding:8} encode={row['encoded']} frame={row['frames']} bytes={row['bytes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=1000)
+    args = parser.parse_args()
+
+    events = sample_events(args.events)
+    baseline = None
+    for encoding in ws_protocol.ENCODINGS:
+        start = time.perf_counter()
+        frames = [ws_protocol.encode(message, encoding) for message in events]
+        encode_us = (time.perf_counter() - start) / len(frames) * 1e6
+        raw = sum(len(data) for data in frames) / len(frames)
+        deflated = sum(deflate_sizes(frames)) / len(frames)
+        per_message = sum(deflate_sizes(frames, context_takeover=False)) / len(frames)
+        baseline = baseline or raw
+        print(f"{encoding:8} mentah={raw:6.1f} B  deflate={deflated:6.1f} B  "
+              f"deflate tanpa takeover={per_message:6.1f} B  "
+              f"({raw / baseline * 100:.0f}% json)  encode={encode_us:.2f} us/event")
+
+    asyncio.run(bench_publish(events[:100], args.clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark fan-out WebSocket dengan satu client lambat.
+
+Socket palsu (tanpa jaringan): client cepat selesai send dalam ~1ms, satu
+client "macet" butuh --slow detik per frame. Membandingkan broadcast lama
+(await send_text berurutan) dengan ConnectionManager (antrian per koneksi +
+writer task).
+
+Event dipublish tiap --interval detik (seperti request approve beruntun).
+
+    python -m benchmarks.bench_ws_fanout --clients 1000 --events 100 --slow 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ws_manager import ConnectionManager  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = 0
+        self.last_at = 0.0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last_at = time.perf_counter()
+
+    send_bytes = send_text
+
+
+async def bench_legacy(sockets, events):
+    # perilaku lama: satu per satu, socket lambat menahan yang di belakangnya
+    start = time.perf_counter()
+    for i in range(events):
+        for ws in sockets:
+            await ws.send_text(f'{{"event": "approval_status_changed", "document_id": {i}}}')
+    return time.perf_counter() - start
+
+
+async def bench_manager(sockets, events, policy, slow, interval):
+    # coalescing dimatikan: yang diukur fan-out per event
+    manager = ConnectionManager(queue_size=16, policy=policy, send_timeout=slow * 4, coalesce_window_ms=0)
+    for user_id, ws in enumerate(sockets):
+        await manager.connect(ws, user_id)
+    users = list(range(len(sockets)))
+    start = time.perf_counter()
+    publish = []
+    for i in range(events):
+        t = time.perf_counter()
+        manager.publish(users, {"event": "approval_status_changed", "document_id": i})
+        publish.append(time.perf_counter() - t)
+        await asyncio.sleep(interval)
+    # tunggu client cepat menerima semua event (maks 30 detik)
+    fast = [ws for ws in sockets if ws.delay < slow]
+    deadline = time.perf_counter() + 30
+    while any(ws.received < events for ws in fast) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    fast_done = max(ws.last_at for ws in fast) - start
+    complete = sum(ws.received == events for ws in fast)
+    stats = manager.stats()
+    stats["fast_complete"] = f"{complete}/{len(fast)}"
+    await manager.close_all()
+    return publish, fast_done, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--slow", type=float, default=2.0, help="detik per frame untuk client lambat")
+    parser.add_argument("--legacy-events", type=int, default=2)
+    args = parser.parse_args()
+
+    def make():
+        sockets = [FakeWebSocket(0.001) for _ in range(args.clients - 1)]
+        sockets.insert(len(sockets) // 10, FakeWebSocket(args.slow))  # client lambat di depan
+        return sockets
+
+    elapsed = await bench_legacy(make(), args.legacy_events)
+    print(f"lama : {args.legacy_events} event x {args.clients} client = {elapsed:.2f}s "
+          f"(request yang broadcast ikut menunggu selama itu)")
+
+    for policy in ("disconnect", "drop_oldest"):
+        publish, fast_done, stats = await bench_manager(make(), args.events, policy, args.slow, args.interval)
+        publish.sort()
+        print(f"baru [{policy}]: publish p50={publish[len(publish) // 2] * 1e6:.0f}us "
+              f"max={publish[-1] * 1e3:.2f}ms, {args.events} event sampai ke client cepat {fast_done:.2f}s, "
+              f"lengkap={stats['fast_complete']} dropped={stats['dropped']} "
+              f"slow_disconnects={stats['slow_disconnects']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
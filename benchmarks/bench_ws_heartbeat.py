@@ -0,0 +1,103 @@
+"""Benchmark CPU heartbeat untuk koneksi WebSocket idle.
+
+Socket palsu yang tidak pernah mengirim apa pun. Membandingkan loop lama
+(wait_for(receive_text(), timeout) per socket → timer dibuat & dibatalkan
+tiap siklus) dengan HeartbeatWheel (satu task untuk semua koneksi).
+Periode heartbeat diperkecil (--period) supaya selisih terlihat dalam
+beberapa detik; biaya per siklus sama dengan produksi (40 detik).
+
+    python -m benchmarks.bench_ws_heartbeat --connections 10000 --period 1 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ws_manager import ConnectionManager  # noqa: E402
+
+
+class IdleWebSocket:
+    def __init__(self):
+        self.sent = 0
+        self._never = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def receive_text(self):
+        self._never = asyncio.get_running_loop().create_future()
+        return await self._never
+
+    async def send_text(self, data):
+        self.sent += 1
+
+
+async def legacy_connection(ws, period):
+    # salinan perilaku lama router_ws.websocket_unread
+    while True:
+        try:
+            msg = await asyncio.wait_for(ws.receive_text(), timeout=period)
+        except asyncio.TimeoutError:
+            await ws.send_text("ping")
+            continue
+        if msg == "ping":
+            await ws.send_text("pong")
+
+
+async def wheel_connection(manager, ws, user_id):
+    conn = await manager.connect(ws, user_id)
+    try:
+        while True:
+            msg = await ws.receive_text()
+            manager.touch(conn)
+            if msg == "ping":
+                manager.send(conn, "pong")
+    finally:
+        manager.disconnect(conn)
+
+
+async def measure(tasks, sockets, duration):
+    await asyncio.sleep(0.5)   # biarkan semua koneksi mulai
+    sent_before = sum(ws.sent for ws in sockets)
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(duration)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    pings = sum(ws.sent for ws in sockets) - sent_before
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return cpu, wall, pings
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--period", type=float, default=1.0, help="interval heartbeat (detik)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    n = args.connections
+
+    sockets = [IdleWebSocket() for _ in range(n)]
+    tasks = [asyncio.create_task(legacy_connection(ws, args.period)) for ws in sockets]
+    cpu, wall, pings = await measure(tasks, sockets, args.duration)
+    print(f"lama : {n} koneksi idle, CPU {cpu / wall * 100:.1f}% "
+          f"({cpu / wall / n * 1e6:.2f} us CPU/detik/koneksi), ping={pings}")
+
+    manager = ConnectionManager(heartbeat_interval=args.period, heartbeat_timeout=args.period * 1000,
+                                heartbeat_tick=args.period / 10)
+    sockets = [IdleWebSocket() for _ in range(n)]
+    tasks = [asyncio.create_task(wheel_connection(manager, ws, i)) for i, ws in enumerate(sockets)]
+    cpu, wall, pings = await measure(tasks, sockets, args.duration)
+    print(f"baru : {n} koneksi idle, CPU {cpu / wall * 100:.1f}% "
+          f"({cpu / wall / n * 1e6:.2f} us CPU/detik/koneksi), ping={pings}")
+    await manager.close_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+
+# Env harus diset sebelum modul app diimport (engine & konstanta dibaca saat import)
+_TMP = tempfile.mkdtemp(prefix="edoc-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'test.db')}")
+os.environ.setdefault("OUTBOX_WORKER_ENABLED", "0")
+os.environ.setdefault("MASTER_KEY", "test-master-key")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from app import models  # noqa: E402,F401
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Session ke DB SQLite test; semua tabel dikosongkan setelah test."""
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def user_factory(db):
+    counter = [0]
+
+    def make(name=None):
+        counter[0] += 1
+        n = counter[0]
+        user = models.User(name=name or f"user{n}", email=f"user{n}@example.com",
+                           password_hash="x", phone_number=f"08{n:09d}")
+        db.add(user)
+        db.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers():
+    from app import auth
+
+    def make(user):
+        token = auth.create_access_token({"sub": user.email, "uid": user.id})
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
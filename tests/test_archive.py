@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import archive
+
+
+@pytest.mark.parametrize("source, target", [(models.Document, models.ArchivedDocument), *archive.CHILD_TABLES])
+def test_archive_tables_mirror_working_tables(source, target):
+    working = {c.name: type(c.type) for c in source.__table__.columns}
+    archived = {c.name: type(c.type) for c in target.__table__.columns}
+    archived.pop("archived_at", None)
+    assert archived == working
+
+
+def make_finished_document(db, tmp_path, creator, approver, recipient):
+    doc = models.Document(no_surat="ARC-1", title="lama", content="isi", creator_id=creator.id,
+                          status=models.StatusEnum.approved,
+                          created_at=datetime.utcnow() - timedelta(days=400))
+    db.add(doc)
+    db.flush()
+    db.add(models.Approver(document_id=doc.id, user_id=approver.id, seq_index=0,
+                           status=models.StatusEnum.approved, catatan="ok", waktu=datetime.utcnow()))
+    db.add(models.Recipient(document_id=doc.id, user_id=recipient.id))
+    for name in ("asli.pdf", "stamped_asli.pdf"):
+        path = tmp_path / name
+        path.write_bytes(b"%PDF-1.4 " + name.encode())
+        db.add(models.File(document_id=doc.id, filename=name, path=str(path), created_at=datetime.utcnow()))
+    db.commit()
+    return doc.id
+
+
+def test_archived_document_still_served(db, tmp_path, client, auth_headers, user_factory):
+    creator, approver, recipient = user_factory(), user_factory(), user_factory()
+    doc_id = make_finished_document(db, tmp_path, creator, approver, recipient)
+    file_ids = [f.id for f in db.query(models.File).order_by(models.File.id)]
+
+    assert archive.archive_batch(db, datetime.utcnow() - timedelta(days=365)) == 1
+    assert db.get(models.Document, doc_id) is None
+    for source, _ in archive.CHILD_TABLES:
+        assert db.query(source).filter(source.document_id == doc_id).count() == 0
+    assert db.get(models.ArchivedDocument, doc_id).no_surat == "ARC-1"
+
+    headers = auth_headers(recipient)
+    detail = client.get(f"/documents/{doc_id}", headers=headers)
+    assert detail.status_code == 200
+    body = detail.json()
+    assert body["no_surat"] == "ARC-1"
+    assert [a["user_id"] for a in body["approvers"]] == [approver.id]
+    assert [r["user_id"] for r in body["recipients"]] == [recipient.id]
+    assert [f["id"] for f in body["files"]] == file_ids
+
+    reasons = client.get(f"/documents/{doc_id}/reasons", headers=headers).json()
+    assert [r["catatan"] for r in reasons["reasons"]] == ["ok"]
+
+    stamped = client.get(f"/files/documents/{doc_id}/stamped", headers=headers)
+    assert stamped.status_code == 200 and stamped.content == b"%PDF-1.4 stamped_asli.pdf"
+
+    download = client.get(f"/files/documents/{doc_id}/file/{file_ids[0]}", headers=headers)
+    assert download.status_code == 200 and download.content == b"%PDF-1.4 asli.pdf"
+
+    outsider = auth_headers(user_factory())
+    assert client.get(f"/files/documents/{doc_id}/file/{file_ids[0]}", headers=outsider).status_code == 403
+
+
+def test_recent_or_unfinished_documents_stay(db, user_factory):
+    creator = user_factory()
+    db.add(models.Document(no_surat="W-1", title="t", content="c", creator_id=creator.id,
+                           status=models.StatusEnum.waiting, created_at=datetime.utcnow() - timedelta(days=400)))
+    db.add(models.Document(no_surat="A-1", title="t", content="c", creator_id=creator.id,
+                           status=models.StatusEnum.approved, created_at=datetime.utcnow()))
+    db.commit()
+    assert archive.archive_batch(db, datetime.utcnow() - timedelta(days=365)) == 0
+    assert db.query(models.Document).count() == 2
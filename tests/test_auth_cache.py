@@ -0,0 +1,83 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth, models
+from app.core.cache import TTLCache
+from app.services import revocation
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Cache principal & deny list milik satu worker (refresh setiap request)."""
+    monkeypatch.setattr(auth, "principal_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(revocation, "revocations", revocation.RevocationList(refresh_seconds=0))
+    loads = []
+    original = auth._load_principal
+    monkeypatch.setattr(auth, "_load_principal", lambda token, db: loads.append(token) or original(token, db))
+    return loads
+
+
+def token_for(user):
+    return auth.create_access_token({"sub": user.email, "uid": user.id})
+
+
+def test_cache_hit_skips_jwt_and_db(db, user_factory, worker):
+    user = user_factory()
+    token = token_for(user)
+    assert auth.authenticate_token(token, db).id == user.id
+    assert auth.authenticate_token(token, db).id == user.id
+    assert len(worker) == 1 and auth.principal_cache.hits == 1
+
+
+def test_entry_expires_after_ttl(db, user_factory, worker, monkeypatch):
+    monkeypatch.setattr(auth, "principal_cache", TTLCache(ttl=0.05))
+    user = user_factory()
+    token = token_for(user)
+    auth.authenticate_token(token, db)
+    user.name = "baru"
+    db.commit()
+    time.sleep(0.06)
+    assert auth.authenticate_token(token, db).name == "baru"
+    assert len(worker) == 2
+
+
+def test_profile_change_on_other_worker_reloads_without_revoking(db, user_factory, worker):
+    user = user_factory()
+    token = token_for(user)
+    auth.authenticate_token(token, db)
+
+    # worker lain: commit perubahan profil + sinyal, tanpa menyentuh cache worker ini
+    now = time.time()
+    user.name = "baru"
+    db.add(models.RevokedToken(jti=None, user_id=user.id, revoked_at=datetime.utcfromtimestamp(now),
+                               revoked_ts=now, expires_at=datetime.utcnow() + timedelta(minutes=5),
+                               kind=revocation.KIND_PROFILE))
+    db.commit()
+
+    assert auth.authenticate_token(token, db).name == "baru"
+    assert len(worker) == 2
+
+
+def test_invalidate_user_is_local_immediately(db, user_factory, worker):
+    user = user_factory()
+    token = token_for(user)
+    auth.authenticate_token(token, db)
+    user.name = "baru"
+    auth.invalidate_user(db, user.id)
+    db.commit()
+    assert auth.authenticate_token(token, db).name == "baru"
+    assert db.query(models.RevokedToken).one().kind == revocation.KIND_PROFILE
+
+
+def test_revoke_sessions_rejects_cached_token(db, user_factory, worker):
+    user = user_factory()
+    token = token_for(user)
+    auth.authenticate_token(token, db)
+    auth.revoke_sessions(db, user.id)
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        auth.authenticate_token(token, db)
+    assert exc.value.status_code == 401
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import time
+
+from app import models
+from app.services import backplane
+
+
+def test_local_seq_never_goes_back_across_restarts():
+    async def run_process():
+        delivered = []
+        bus = backplane.LocalBackplane()
+        base = bus.start(asyncio.get_running_loop(), lambda users, message, seq: delivered.append(seq))
+        for _ in range(3):
+            bus.publish([1], {"event": "x"})
+        await asyncio.sleep(0)
+        return base, delivered
+
+    first_base, first = asyncio.run(run_process())
+    second_base, second = asyncio.run(run_process())
+    assert first == [first_base + 1, first_base + 2, first_base + 3]
+    # proses baru mulai di atas seq proses lama → last_seq lama di bawah floor (resync)
+    assert second_base >= first[-1] and second[0] > first[-1]
+
+
+def add_event(db, event_id):
+    db.add(models.WSEvent(id=event_id, user_ids=json.dumps([1]), payload=json.dumps({"i": event_id}),
+                          published_at=time.time()))
+    db.commit()
+
+
+def make_bus(**kwargs):
+    bus = backplane.SQLBackplane(**kwargs)
+    delivered = []
+    bus._schedule = lambda events: delivered.extend(seq for seq, *_ in events)
+    return bus, delivered
+
+
+def test_sql_holds_events_behind_gap_until_filled(db):
+    bus, delivered = make_bus(gap_seconds=60)
+    add_event(db, 1)
+    add_event(db, 3)
+    add_event(db, 4)
+    bus.poll_once()
+    assert delivered == [1] and bus.stats()["held_events"] == 2
+
+    add_event(db, 2)
+    bus.poll_once()
+    assert delivered == [1, 2, 3, 4]
+    bus.poll_once()
+    assert delivered == [1, 2, 3, 4]
+
+
+def test_sql_releases_held_events_when_gap_expires(db):
+    bus, delivered = make_bus(gap_seconds=0.05)
+    add_event(db, 1)
+    add_event(db, 3)
+    bus.poll_once()
+    assert delivered == [1]
+    time.sleep(0.1)
+    bus.poll_once()
+    assert delivered == [1, 3] and bus.stats()["pending_gaps"] == 0
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import changes
+
+OLD = datetime.utcnow() - timedelta(minutes=5)
+
+
+@pytest.fixture
+def doc(db, user_factory):
+    creator = user_factory()
+    document = models.Document(no_surat="0000000001", title="t", content="c", creator_id=creator.id)
+    db.add(document)
+    db.commit()
+    return creator, document
+
+
+def add_event(db, document_id, event_id=None, created_at=None, visible_to=None):
+    db.add(models.DocumentEvent(id=event_id, document_id=document_id, event_type=changes.EVENT_APPROVE,
+                                visible_to=visible_to, created_at=created_at or datetime.utcnow()))
+    db.commit()
+
+
+def test_empty_cursor_resyncs(db, doc):
+    creator, document = doc
+    add_event(db, document.id, created_at=OLD)
+    feed = changes.get_changes(db, creator.id, since=0)
+    assert feed["resync"] and feed["cursor"] == 1
+
+
+def test_settled_events_advance_cursor(db, doc):
+    creator, document = doc
+    for i in range(1, 4):
+        add_event(db, document.id, event_id=i, created_at=OLD)
+    feed = changes.get_changes(db, creator.id, since=1)
+    assert [e.id for e in feed["events"]] == [2, 3]
+    assert feed["cursor"] == 3 and not feed["has_more"]
+
+
+def test_out_of_order_commit_is_not_skipped(db, doc):
+    creator, document = doc
+    add_event(db, document.id, event_id=1, created_at=OLD)
+    # id 3 sudah commit, id 2 masih di transaksi lain
+    add_event(db, document.id, event_id=3)
+    feed = changes.get_changes(db, creator.id, since=1)
+    assert [e.id for e in feed["events"]] == [3]
+    assert feed["cursor"] == 1   # ditahan: 3 belum settle
+
+    add_event(db, document.id, event_id=2)   # commit terlambat
+    feed = changes.get_changes(db, creator.id, since=feed["cursor"])
+    assert [e.id for e in feed["events"]] == [2, 3]
+
+
+def test_invisible_events_do_not_jump_past_unsettled(db, doc, user_factory):
+    creator, document = doc
+    other = user_factory()
+    add_event(db, document.id, event_id=1, created_at=OLD)
+    add_event(db, document.id, event_id=2, created_at=OLD, visible_to=other.id)
+    add_event(db, document.id, event_id=4, visible_to=other.id)
+    feed = changes.get_changes(db, creator.id, since=1)
+    assert feed["events"] == [] and feed["cursor"] == 2
+
+
+def test_paging_is_held_at_settle_boundary(db, doc):
+    creator, document = doc
+    add_event(db, document.id, event_id=1, created_at=OLD)
+    for i in range(2, 6):
+        add_event(db, document.id, event_id=i)
+    feed = changes.get_changes(db, creator.id, since=1, limit=2)
+    assert [e.id for e in feed["events"]] == [2, 3]
+    assert feed["cursor"] == 1 and not feed["has_more"]
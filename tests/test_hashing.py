@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.core.hashing import BoundedHasher, HasherOverloaded
+
+
+def blocked_hasher(**kwargs):
+    hasher = BoundedHasher(**kwargs)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    return hasher, slow, started, release
+
+
+def wait_idle(hasher):
+    # done-callback jalan di thread executor, sesaat setelah hasil dikirim ke caller
+    deadline = time.monotonic() + 5
+    while hasher.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return hasher.stats()["in_flight"] == 0
+
+
+def test_overload_rejects_with_retry_after():
+    hasher, slow, started, release = blocked_hasher(workers=1, max_queue=0, timeout=5)
+    caller = threading.Thread(target=hasher.run, args=("hash", slow))
+    caller.start()
+    assert started.wait(5)
+    with pytest.raises(HasherOverloaded) as exc:
+        hasher.run("hash", slow)
+    assert exc.value.retry_after >= 1 and hasher.rejected == 1
+    release.set()
+    caller.join(5)
+    assert wait_idle(hasher)
+
+
+def test_timeout_maps_to_overloaded_and_keeps_slot_until_done():
+    hasher, slow, started, release = blocked_hasher(workers=1, max_queue=1, timeout=0.05)
+    with pytest.raises(HasherOverloaded):
+        hasher.run("hash", slow)
+    assert hasher.timed_out == 1
+    # task masih jalan: slot belum dilepas walaupun caller sudah menyerah
+    assert hasher.stats()["in_flight"] == 1
+
+    # yang antri lalu timeout dibatalkan dan langsung melepas slot
+    with pytest.raises(HasherOverloaded):
+        hasher.run("hash", slow)
+    assert hasher.stats()["queued"] == 0
+
+    release.set()
+    assert hasher.run("hash", lambda: "ok") == "ok"
+    assert wait_idle(hasher)
+
+
+def test_timeout_is_503_with_retry_after(monkeypatch):
+    hasher, slow, started, release = blocked_hasher(workers=1, max_queue=1, timeout=0.05)
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            auth._run_hasher("verify", slow)
+    finally:
+        release.set()
+    assert exc.value.status_code == 503
+    assert int(exc.value.headers["Retry-After"]) >= 1
@@ -0,0 +1,32 @@
+import pytest
+
+INTERNAL_PATHS = [
+    "/internal/db-pool",
+    "/internal/auth-cache",
+    "/internal/password-hasher",
+    "/internal/revocations",
+    "/internal/rate-limits",
+    "/internal/notifications",
+    "/internal/outbox",
+    "/internal/websockets",
+    "/metrics",
+]
+
+
+@pytest.mark.parametrize("path", INTERNAL_PATHS)
+def test_internal_endpoint_requires_master_key(client, path):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-MASTER-KEY": "salah"}).status_code == 403
+
+
+@pytest.mark.parametrize("path", INTERNAL_PATHS)
+def test_internal_endpoint_with_master_key(client, path):
+    response = client.get(path, headers={"X-MASTER-KEY": "test-master-key"})
+    assert response.status_code == 200
+
+
+def test_metrics_prometheus_format(client):
+    client.get("/internal/db-pool", headers={"X-MASTER-KEY": "test-master-key"})
+    body = client.get("/metrics", headers={"X-MASTER-KEY": "test-master-key"}).text
+    assert "# TYPE edoc_http_request_duration_seconds histogram" in body
+    assert 'edoc_http_requests_total{method="GET",route="/internal/db-pool",status="200"}' in body
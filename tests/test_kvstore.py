@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import kvstore
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request, db):
+    return kvstore.MemoryKVStore() if request.param == "memory" else kvstore.SQLKVStore()
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        kvstore.KVStore()
+
+
+def test_set_get_overwrite_and_pop(store):
+    store.set("k", {"code": "1"}, ttl=60)
+    store.set("k", {"code": "2"}, ttl=60)
+    assert store.get("k") == {"code": "2"}
+    assert store.pop("k") == {"code": "2"}
+    assert store.pop("k") is None
+
+
+def test_expired_entries_are_absent(store):
+    store.set("k", 1, ttl=-1)
+    assert store.get("k") is None
+    assert store.set_if_absent("k", 2, ttl=60)
+    assert not store.set_if_absent("k", 3, ttl=60)
+
+
+def test_compare_and_swap(store):
+    assert store.compare_and_swap("k", None, 1, ttl=60)
+    assert not store.compare_and_swap("k", None, 2, ttl=60)
+    assert not store.compare_and_swap("k", 5, 2, ttl=60)
+    assert store.compare_and_swap("k", 1, 2, ttl=60)
+    assert store.get("k") == 2
+
+
+def test_sql_set_falls_back_to_generic_upsert(db, monkeypatch):
+    monkeypatch.setattr(kvstore.SQLKVStore, "_upsert", staticmethod(lambda dialect, row: None))
+    store = kvstore.SQLKVStore()
+    store.set("k", 1, ttl=60)
+    store.set("k", 2, ttl=60)
+    assert store.get("k") == 2
+
+
+def test_generic_upsert_recovers_from_concurrent_insert(db, monkeypatch):
+    real_execute = db.execute
+    raced = []
+
+    def execute(stmt, *args, **kwargs):
+        result = real_execute(stmt, *args, **kwargs)
+        # worker lain meng-insert key yang sama di antara UPDATE (0 baris) dan INSERT kita
+        if stmt.is_update and not raced:
+            raced.append(True)
+            real_execute(models.KVEntry.__table__.insert().values(
+                key="k", value="0", expires_at=datetime.utcnow() + timedelta(minutes=1)))
+            db.commit()
+        return result
+
+    monkeypatch.setattr(db, "execute", execute)
+    row = {"key": "k", "value": "7", "expires_at": datetime.utcnow() + timedelta(minutes=1)}
+    kvstore.SQLKVStore._set_generic(db, row)
+    assert kvstore.SQLKVStore().get("k") == 7
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.services.no_surat import NoSuratAllocator
+
+
+def add_document(db, no_surat):
+    db.add(models.Document(no_surat=no_surat, title="t", content="c"))
+    db.commit()
+
+
+def test_year_reset_requires_year_in_format():
+    with pytest.raises(ValueError):
+        NoSuratAllocator(fmt="{prefix}{seq:010d}", year_reset=True)
+    NoSuratAllocator(fmt="{prefix}{year}/{seq:04d}", year_reset=True)
+
+
+def test_format_requires_seq():
+    with pytest.raises(ValueError):
+        NoSuratAllocator(fmt="{prefix}{year}")
+
+
+def test_allocations_are_unique_across_workers(db):
+    a = NoSuratAllocator(block_size=3)
+    b = NoSuratAllocator(block_size=3)
+    numbers = [a.allocate() for _ in range(5)] + [b.allocate() for _ in range(5)] + [a.allocate()]
+    assert len(set(numbers)) == len(numbers)
+    assert numbers[0] == "0000000001"
+
+
+def test_seed_from_highest_numeric_not_latest_document(db):
+    add_document(db, "0000000042")
+    add_document(db, "0000000007")
+    add_document(db, "MANUAL-XYZ")   # dokumen terakhir, non-numerik
+    assert NoSuratAllocator(block_size=1).allocate() == "0000000043"
+
+
+def test_seed_includes_archived_documents(db):
+    db.add(models.ArchivedDocument(id=1, no_surat="0000000100"))
+    db.commit()
+    add_document(db, "0000000005")
+    assert NoSuratAllocator(block_size=1).allocate() == "0000000101"
+
+
+def test_year_period_seeds_from_same_year_only(db):
+    year = datetime.utcnow().year
+    add_document(db, f"TJIS/{year}/0012")
+    add_document(db, f"TJIS/{year - 1}/0950")
+    add_document(db, "TJIS/lama-0999")
+    allocator = NoSuratAllocator(block_size=1, prefix="TJIS/", fmt="{prefix}{year}/{seq:04d}", year_reset=True)
+    assert allocator.allocate() == f"TJIS/{year}/0013"
+
+
+def test_like_wildcards_in_prefix_are_literal(db):
+    add_document(db, "A_B0000000009")
+    add_document(db, "AXB0000000500")
+    allocator = NoSuratAllocator(block_size=1, prefix="A_B")
+    assert allocator.allocate() == "A_B0000000010"
+
+
+def test_reserved_matches_allocator_format_only():
+    allocator = NoSuratAllocator(prefix="TJIS/", fmt="{prefix}{year}/{seq:04d}")
+    assert allocator.is_reserved("TJIS/2019/0042")
+    assert not allocator.is_reserved("TJIS/lama-0999")
+    assert not allocator.is_reserved("MANUAL-1")
+
+
+def test_create_rejects_reserved_or_taken_manual_numbers(client, auth_headers, user_factory, db):
+    headers = auth_headers(user_factory())
+    db.add(models.ArchivedDocument(id=99, no_surat="ARSIP-1"))
+    db.commit()
+
+    def create(no_surat):
+        return client.post("/documents/", headers=headers,
+                           json={"no_surat": no_surat, "title": "t", "content": "c"})
+
+    assert create("9999999999").status_code == 400
+    assert create("ARSIP-1").status_code == 400
+    assert create("MANUAL-1").json()["no_surat"] == "MANUAL-1"
+    assert create("MANUAL-1").status_code == 400
+    assert create(None).json()["no_surat"] != "MANUAL-1"
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.notifications import NotificationDispatcher, Notification, SMSProvider, WhatsAppProvider
+
+
+def make_dispatcher(handler, wa_concurrency=4, **kwargs):
+    options = {"workers": 8, "max_attempts": 3, "backoff": 0.001}
+    options.update(kwargs)
+    providers = [
+        WhatsAppProvider(url="https://wa.test/send", token="wa-token", concurrency=wa_concurrency),
+        SMSProvider(base_url="https://sms.test", sid="AC1", token="sms-token", from_number="+100", concurrency=2),
+    ]
+    return NotificationDispatcher(providers, transport=httpx.MockTransport(handler), **options)
+
+
+@pytest.fixture
+def requests_seen():
+    return []
+
+
+def test_retry_then_success(requests_seen):
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(503 if len(requests_seen) == 1 else 200)
+
+    dispatcher = make_dispatcher(handler)
+    try:
+        result = dispatcher.submit(Notification("whatsapp", "0812", "halo"))
+        assert result.result(timeout=5) is True
+    finally:
+        dispatcher.close()
+    assert len(requests_seen) == 2
+    assert requests_seen[0].headers["Authorization"] == "wa-token"
+    stats = dispatcher.stats()
+    assert stats["retried"] == 1 and stats["sent"] == {"whatsapp": 1} and stats["pending"] == 0
+
+
+def test_exhausted_retries_fall_back_to_sms(requests_seen):
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(500 if request.url.host == "wa.test" else 201)
+
+    dispatcher = make_dispatcher(handler, max_attempts=2)
+    try:
+        fallback = Notification("sms", "0812", "halo via sms")
+        result = dispatcher.submit(Notification("whatsapp", "0812", "halo", fallback=fallback))
+        assert result.result(timeout=5) is True
+    finally:
+        dispatcher.close()
+    assert [r.url.host for r in requests_seen] == ["wa.test", "wa.test", "sms.test"]
+    assert b"Body=halo+via+sms" in requests_seen[-1].content
+    stats = dispatcher.stats()
+    assert stats["failed"] == {"whatsapp": 1} and stats["sent"] == {"sms": 1}
+
+
+def test_non_retryable_error_without_fallback_fails(requests_seen):
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(400, text="nomor salah")
+
+    dispatcher = make_dispatcher(handler)
+    try:
+        result = dispatcher.submit(Notification("whatsapp", "0812", "halo"))
+        with pytest.raises(Exception, match="HTTP 400"):
+            result.result(timeout=5)
+    finally:
+        dispatcher.close()
+    assert len(requests_seen) == 1
+
+
+def test_concurrency_is_capped_per_provider():
+    active = {"now": 0, "max": 0}
+
+    async def handler(request):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200)
+
+    dispatcher = make_dispatcher(handler, wa_concurrency=2, workers=8)
+    try:
+        results = [dispatcher.submit(Notification("whatsapp", f"08{i}", "halo")) for i in range(10)]
+        assert all(r.result(timeout=5) for r in results)
+    finally:
+        dispatcher.close()
+    assert active["max"] == 2
+    assert dispatcher.stats()["sent"] == {"whatsapp": 10}
@@ -0,0 +1,123 @@
+import json
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import database, models
+from app.services import outbox
+
+
+@pytest.fixture
+def worker(db):
+    return outbox.OutboxWorker(delivery_timeout=0.05, backoff=1, max_attempts=2)
+
+
+def publish(db, n=1):
+    for i in range(n):
+        outbox.publish_ws(db, {"event": "x", "i": i}, [1])
+    db.commit()
+
+
+def rows(db):
+    db.expire_all()
+    return db.query(models.OutboxMessage).order_by(models.OutboxMessage.id).all()
+
+
+def test_successful_delivery_marks_sent(db, worker):
+    seen = []
+    worker.register(outbox.CHANNEL_WS, lambda payload: seen.append(payload["message"]["i"]))
+    publish(db, 3)
+    assert worker.drain_once() == 3
+    assert seen == [0, 1, 2]
+    assert {r.status for r in rows(db)} == {outbox.STATUS_SENT}
+    assert worker.drain_once() == 0
+
+
+def test_no_transaction_is_open_while_delivering(db, worker):
+    def handler(payload):
+        # SQLite mengunci seluruh DB selama transaksi tulis; ini gagal kalau klaim belum commit
+        with database.SessionLocal() as other:
+            other.execute(update(models.OutboxMessage).values(last_error="touched"))
+            other.commit()
+        row = rows(db)[0]
+        assert row.status == outbox.STATUS_IN_FLIGHT and row.attempts == 1
+
+    worker.register(outbox.CHANNEL_WS, handler)
+    publish(db)
+    worker.drain_once()
+    assert rows(db)[0].status == outbox.STATUS_SENT
+
+
+def test_failure_backs_off_then_fails_final(db, worker):
+    def handler(payload):
+        raise RuntimeError("provider down")
+
+    worker.register(outbox.CHANNEL_WS, handler)
+    publish(db)
+    worker.drain_once()
+    row = rows(db)[0]
+    assert (row.status, row.attempts, row.last_error) == (outbox.STATUS_PENDING, 1, "provider down")
+    assert row.available_at > datetime.utcnow()
+
+    db.execute(update(models.OutboxMessage).values(available_at=datetime.utcnow()))
+    db.commit()
+    worker.drain_once()
+    assert (rows(db)[0].status, rows(db)[0].attempts) == (outbox.STATUS_FAILED, 2)
+
+
+def test_timeout_is_unknown_not_retried(db, worker):
+    futures = []
+
+    def handler(payload):
+        futures.append(Future())
+        return futures[-1]
+
+    worker.register(outbox.CHANNEL_WS, handler)
+    publish(db)
+    worker.drain_once()
+    row = rows(db)[0]
+    assert row.status == outbox.STATUS_IN_FLIGHT and row.available_at > datetime.utcnow()
+    assert not futures[0].cancelled()
+
+    # belum selesai: tidak dikirim ulang selama lease berlaku
+    worker.drain_once()
+    assert len(futures) == 1
+
+    futures[0].set_result(None)
+    worker.drain_once()
+    assert rows(db)[0].status == outbox.STATUS_SENT
+    assert len(futures) == 1
+
+
+def test_expired_lease_is_reclaimed_and_stale_result_ignored(db, worker):
+    futures = []
+
+    def handler(payload):
+        futures.append(Future())
+        return futures[-1]
+
+    worker.register(outbox.CHANNEL_WS, handler)
+    publish(db)
+    worker.drain_once()
+
+    # worker "mati": lease habis → diklaim ulang dengan attempts baru
+    db.execute(update(models.OutboxMessage).values(available_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    worker.drain_once()
+    assert len(futures) == 2 and rows(db)[0].attempts == 2 and worker.lease_expired == 1
+
+    futures[0].set_exception(RuntimeError("late"))
+    futures[1].set_result(None)
+    worker.drain_once()
+    row = rows(db)[0]
+    assert row.status == outbox.STATUS_SENT and row.last_error is None
+    assert worker.stale == 1
+
+
+def test_whatsapp_payload_does_not_store_credentials(db):
+    outbox.publish_whatsapp(db, "0812", "halo", sms_fallback="halo")
+    db.commit()
+    payload = json.loads(rows(db)[0].payload)
+    assert "token" not in payload
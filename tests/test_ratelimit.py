@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, Form
+from fastapi.testclient import TestClient
+
+from app.core.ratelimit import KVBuckets, MemoryBuckets, Rate, RateLimiter
+from app.services.kvstore import MemoryKVStore, SQLKVStore
+
+
+@pytest.fixture(params=["memory", "kv"])
+def backend(request, db):
+    return MemoryBuckets() if request.param == "memory" else KVBuckets(SQLKVStore())
+
+
+def make_client(backend, ip_rate=Rate(10, 600), email_rate=Rate(2, 600)):
+    limiter = RateLimiter({"login": {"ip": ip_rate, "email": email_rate}}, backend=backend)
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(limiter.check("login"))])
+    def login(username: str = Form(...)):
+        return {"ok": True}
+
+    return limiter, TestClient(app)
+
+
+def test_limits_per_email_with_headers(backend):
+    _, client = make_client(backend)
+    first = client.post("/login", data={"username": "a@x.id"})
+    assert first.status_code == 200
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert client.post("/login", data={"username": "A@x.id "}).status_code == 200
+
+    blocked = client.post("/login", data={"username": "a@x.id"})
+    assert blocked.status_code == 429
+    assert int(blocked.headers["Retry-After"]) >= 1
+
+
+def test_denied_request_does_not_consume_other_keys(backend):
+    limiter, client = make_client(backend, ip_rate=Rate(3, 600), email_rate=Rate(1, 600))
+    assert client.post("/login", data={"username": "a@x.id"}).status_code == 200
+    # email a@x.id kosong; percobaan berikutnya tidak boleh memotong token ip
+    for _ in range(5):
+        assert client.post("/login", data={"username": "a@x.id"}).status_code == 429
+    assert client.post("/login", data={"username": "b@x.id"}).status_code == 200
+    assert client.post("/login", data={"username": "c@x.id"}).status_code == 200
+    assert client.post("/login", data={"username": "d@x.id"}).status_code == 429
+    assert limiter.stats()["allowed"]["login"] == 3
+
+
+def test_memory_backend_all_or_nothing():
+    buckets = MemoryBuckets()
+    items = [("ip:1", Rate(5, 60)), ("email:a", Rate(1, 60))]
+    assert all(d.allowed for d in buckets.take_all(items))
+    denied = buckets.take_all(items)
+    assert len(denied) == 1 and not denied[0].allowed
+    assert buckets._buckets["ip:1"][0] == pytest.approx(4, abs=0.01)
+
+
+def test_blocking_backend_runs_off_the_event_loop():
+    on_loop = []
+
+    class Store(MemoryKVStore):
+        def get(self, key):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return super().get(key)
+
+    _, client = make_client(KVBuckets(Store()))
+    assert client.post("/login", data={"username": "a@x.id"}).status_code == 200
+    assert on_loop and not any(on_loop)
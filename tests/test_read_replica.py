@@ -0,0 +1,50 @@
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app import database, models
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    monkeypatch.setattr(database, "replica_engine", replica)
+    monkeypatch.setattr(database, "_last_write_at", {})
+
+    app = FastAPI()
+    app.add_middleware(database.ReadAfterWriteMiddleware)
+
+    @app.post("/write")
+    def write(request: Request, session=Depends(database.get_db)):
+        # seperti auth.get_current_user
+        session.info["request_state"] = request.state
+        session.add(models.User(name="w", email="w@example.com", password_hash="x"))
+        session.commit()
+        return {"ok": True}
+
+    @app.get("/read")
+    def read(session=Depends(database.get_read_db)):
+        session.execute(text("SELECT 1"))
+        return {"bind": "primary" if session.get_bind() is database.engine else "replica"}
+
+    return TestClient(app)
+
+
+def test_reads_go_to_replica_without_recent_write(client):
+    assert client.get("/read").json() == {"bind": "replica"}
+
+
+def test_write_pins_next_read_to_primary_on_any_worker(client, monkeypatch):
+    response = client.post("/write")
+    cookie = response.cookies[database.LAST_WRITE_COOKIE]
+    assert client.get("/read").json() == {"bind": "primary"}
+
+    # worker lain: tidak punya catatan lokal, hanya cookie dari client
+    monkeypatch.setattr(database, "_last_write_at", {})
+    other = TestClient(client.app, cookies={database.LAST_WRITE_COOKIE: cookie})
+    assert other.get("/read").json() == {"bind": "primary"}
+
+    monkeypatch.setattr(database, "REPLICA_STALENESS_SECONDS", -1)
+    assert other.get("/read").json() == {"bind": "replica"}
@@ -0,0 +1,41 @@
+from app import models
+
+ROUTE = 'method="GET",route="/documents/{doc_id}"'
+
+
+def scrape(client) -> dict[str, float]:
+    response = client.get("/metrics", headers={"X-MASTER-KEY": "test-master-key"})
+    assert response.status_code == 200
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_parametrised_route_is_labelled_by_template(db, client, auth_headers, user_factory):
+    user = user_factory()
+    doc = models.Document(no_surat="M-1", title="t", content="c", creator_id=user.id)
+    db.add(doc)
+    db.commit()
+    headers = auth_headers(user)
+
+    before = scrape(client)
+    assert client.get(f"/documents/{doc.id}", headers=headers).status_code == 200
+    assert client.get(f"/documents/{doc.id}", headers=headers).status_code == 200
+    assert client.get("/documents/999999", headers=headers).status_code == 404
+    after = scrape(client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta(f'edoc_http_requests_total{{{ROUTE},status="200"}}') == 2
+    assert delta(f'edoc_http_requests_total{{{ROUTE},status="404"}}') == 1
+    # label = template route, bukan path mentah (kardinalitas tetap)
+    assert not any(f'route="/documents/{doc.id}"' in name for name in after)
+
+    assert delta(f"edoc_http_request_db_statements_count{{{ROUTE}}}") == 3
+    assert delta(f"edoc_http_request_db_statements_sum{{{ROUTE}}}") > 0
+    assert delta(f'edoc_http_request_db_statements_bucket{{{ROUTE},le="0"}}') == 0
+    assert delta(f"edoc_http_request_duration_seconds_count{{{ROUTE}}}") == 3
@@ -0,0 +1,132 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import models
+from app.services import revocation
+
+
+def revoked_row(db, user_id, jti=None, revoked_at=None):
+    now = revoked_at or datetime.utcnow()
+    db.add(models.RevokedToken(jti=jti, user_id=user_id, revoked_at=now, expires_at=now + timedelta(hours=1)))
+    db.commit()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = revocation.BloomFilter(1000, 0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_refresh_picks_up_other_worker_revocations(db, user_factory):
+    user = user_factory()
+    revocations = revocation.RevocationList(refresh_seconds=0)
+    assert not revocations.is_revoked("abc", user.id, time.time())
+
+    revoked_row(db, user.id, jti="abc")
+    assert revocations.is_revoked("abc", user.id, time.time())
+    assert not revocations.is_revoked("other", user.id, time.time())
+
+
+def test_user_cutoff_revokes_only_older_tokens(db, user_factory):
+    user = user_factory()
+    revoked_row(db, user.id)
+    revocations = revocation.RevocationList(refresh_seconds=0)
+    assert revocations.is_revoked("old", user.id, time.time() - 60)
+    assert not revocations.is_revoked("new", user.id, time.time() + 60)
+
+
+def test_note_local_applies_without_refresh(db, user_factory):
+    user = user_factory()
+    revocations = revocation.RevocationList(refresh_seconds=3600)
+    revocations._last_refresh = time.monotonic()
+    now = datetime.utcnow()
+    revocations.note_local("local", user.id, time.time(), now + timedelta(hours=1))
+    assert revocations.is_revoked("local", user.id, time.time())
+
+
+def test_concurrent_callers_do_not_wait_for_refresh(monkeypatch):
+    revocations = revocation.RevocationList(refresh_seconds=0)
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_refresh():
+        entered.set()
+        release.wait(5)
+        revocations._last_refresh = time.monotonic()
+
+    monkeypatch.setattr(revocations, "refresh", slow_refresh)
+    refresher = threading.Thread(target=revocations.maybe_refresh)
+    refresher.start()
+    assert entered.wait(5)
+
+    started = time.monotonic()
+    assert not revocations.is_revoked("x", 1, time.time())
+    assert time.monotonic() - started < 1
+    release.set()
+    refresher.join(5)
+
+
+def test_background_thread_keeps_requests_off_the_database(db, user_factory, monkeypatch):
+    user = user_factory()
+    revocations = revocation.RevocationList(refresh_seconds=0.05)
+    revocations.start()
+    try:
+        revoked_row(db, user.id, jti="bg")
+        deadline = time.monotonic() + 5
+        while "bg" not in revocations._exact and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        inline = []
+        original = revocations.maybe_refresh
+        monkeypatch.setattr(revocations, "maybe_refresh",
+                            lambda: original() if threading.current_thread() is revocations._thread
+                            else inline.append(1))
+        assert revocations.is_revoked("bg", user.id, time.time())
+        assert not inline
+        assert revocations.stats()["background_refresh"]
+    finally:
+        revocations.stop()
+
+
+def test_user_cutoff_keeps_sub_second_precision(db, user_factory):
+    user = user_factory()
+    revocation.revoke_user(db, user.id, timedelta(hours=1))
+    db.commit()
+    row = db.query(models.RevokedToken).one()
+    # MySQL DATETIME tanpa fsp: revoked_at terpotong ke detik
+    row.revoked_at = row.revoked_at.replace(microsecond=0)
+    db.commit()
+
+    revocations = revocation.RevocationList(refresh_seconds=0)
+    assert revocations.is_revoked(None, user.id, row.revoked_ts - 0.001)
+    assert not revocations.is_revoked(None, user.id, row.revoked_ts + 0.001)
+
+
+def test_admin_password_reset_and_delete_revoke_sessions(db, user_factory, auth_headers, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app import auth
+    from app.routes import admin_key_routes
+
+    monkeypatch.setattr(auth, "hash_password", lambda password: "hashed")
+    app = FastAPI()
+    app.include_router(admin_key_routes.router)
+    client = TestClient(app)
+    master = {"X-MASTER-KEY": admin_key_routes.MASTER_KEY}
+
+    for user in (user_factory(), user_factory()):
+        token = auth_headers(user)["Authorization"].split()[1]
+        issued_at = auth.token_claims(token)["iat"]
+        assert auth.authenticate_token(token, db).id == user.id
+        if user.id % 2:
+            response = client.put("/admin/user/password", headers=master,
+                                  json={"user_id": user.id, "new_password": "rahasia-baru"})
+        else:
+            response = client.request("DELETE", "/admin/user", headers=master, json={"user_id": user.id})
+        assert response.status_code == 200
+        assert db.query(models.RevokedToken).filter_by(user_id=user.id, jti=None).count() == 1
+        # worker lain: salinan deny list sendiri, dibangun dari tabel
+        assert revocation.RevocationList(refresh_seconds=0).is_revoked(None, user.id, issued_at)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app import models
+from app.services import search
+from app.services.search import InvertedIndex, fallback_index
+
+
+@pytest.fixture
+def docs(db, user_factory):
+    alice, budi = user_factory("Alice"), user_factory("Budi")
+    d1 = models.Document(no_surat="0000000001", title="Pembelian bensin", content="solar", creator_id=alice.id)
+    d2 = models.Document(no_surat="0000000002", title="Cuti tahunan", content="bensin", creator_id=budi.id)
+    db.add_all([d1, d2])
+    db.commit()
+    db.add(models.Recipient(document_id=d2.id, user_id=alice.id))
+    db.commit()
+    return alice, budi, d1, d2
+
+
+def test_fallback_search_ranks_title_over_content(db, docs):
+    alice, _, d1, d2 = docs
+    result = search.search_documents(db, "bensin", alice.id)
+    assert [doc.id for doc, _ in result["rows"]] == [d1.id, d2.id]
+
+
+def test_snapshot_is_published_atomically(db, docs):
+    index = InvertedIndex()
+    index.ensure_fresh(db)
+    old = index.snapshot
+    assert "bensin" in old.vocab and "bensin" in old.postings
+    # score() yang memegang snapshot lama tetap konsisten setelah rebuild
+    index.mark_dirty()
+    index.ensure_fresh(db)
+    assert index.snapshot is not old
+    assert set(old.postings) == set(old.vocab)
+
+
+def test_failed_build_keeps_index_dirty(db, docs, monkeypatch):
+    index = InvertedIndex()
+
+    def boom(session):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(index, "_build", boom)
+    with pytest.raises(RuntimeError):
+        index.ensure_fresh(db)
+    assert index.dirty
+    monkeypatch.undo()
+    index.ensure_fresh(db)
+    assert not index.dirty
+
+
+def test_only_indexed_models_mark_dirty(db, docs):
+    fallback_index.ensure_fresh(db)
+    assert not fallback_index.dirty
+    db.add(models.KVEntry(key="otp:1", value="{}", expires_at=datetime.utcnow() + timedelta(minutes=5)))
+    db.commit()
+    assert not fallback_index.dirty
+
+    doc = db.get(models.Document, docs[2].id)
+    doc.title = "Pembelian pertalite"
+    db.commit()
+    assert fallback_index.dirty
+
+
+def test_mysql_query_uses_union_of_index_branches():
+    _, rows = search._mysql_queries("bensin", user_id=1)
+    sql = str(rows.compile(dialect=mysql.dialect()))
+    candidates = sql[sql.index("INNER JOIN (SELECT"):sql.index(") AS candidates")]
+    assert candidates.count("UNION") == 4
+    assert "MATCH" in candidates and " OR " not in candidates
@@ -0,0 +1,118 @@
+import asyncio
+import gc
+import json
+
+from fastapi import status
+
+from app.utils.ws_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, stuck: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self._stuck = asyncio.Event() if stuck else None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        if self._stuck is not None:
+            await self._stuck.wait()
+        self.sent.append(data)
+
+    send_bytes = send_text
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def make_manager(**kwargs):
+    options = {"coalesce_window_ms": 0, "heartbeat_interval": 30, "heartbeat_tick": 0.01}
+    options.update(kwargs)
+    return ConnectionManager(**options)
+
+
+def test_stuck_send_closed_within_a_tick_not_a_heartbeat_interval():
+    async def scenario():
+        manager = make_manager(send_timeout=0.05)
+        ws = FakeWebSocket(stuck=True)
+        conn = await manager.connect(ws, user_id=1)
+        manager.publish([1], {"event": "new_inbox", "document_id": 1})
+        await asyncio.sleep(0.3)
+        await manager.close_all()
+        return conn, ws, manager
+
+    conn, ws, manager = asyncio.run(scenario())
+    assert conn.closed and ws.closed_with == status.WS_1011_INTERNAL_ERROR
+    assert manager.dead == 1 and not manager.sending
+
+
+def test_close_tasks_are_kept_until_done():
+    async def scenario():
+        manager = make_manager(queue_size=1)
+        ws = FakeWebSocket(stuck=True)
+        conn = await manager.connect(ws, user_id=1)
+        for i in range(3):
+            manager.publish([1], {"event": "new_inbox", "document_id": i})
+        # antrian penuh → disconnect lewat task _close yang dijadwalkan dari kode sync
+        assert len(manager._closing) == 1
+        gc.collect()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return conn, ws, manager
+
+    conn, ws, manager = asyncio.run(scenario())
+    assert conn.closed and ws.closed_with == status.WS_1013_TRY_AGAIN_LATER
+    assert not manager._closing and manager.slow_disconnects == 1
+
+
+def test_resume_replays_missed_events_or_resyncs():
+    async def scenario():
+        manager = make_manager(replay_size=3)
+        manager.set_sequence_base(100)
+        for seq in range(101, 106):
+            manager.publish([1], {"event": "new_inbox", "document_id": seq}, seq=seq)
+
+        results = {}
+        for last_seq in (104, 102, 100, 999, 105):
+            ws = FakeWebSocket()
+            conn = await manager.connect(ws, user_id=1)
+            results[last_seq] = manager.resume(conn, last_seq)
+            await asyncio.sleep(0)
+            results[last_seq] = (results[last_seq], [json.loads(frame) for frame in ws.sent])
+        await manager.close_all()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[104] == (1, [{"event": "new_inbox", "document_id": 105, "seq": 105}])
+    replayed, frames = results[102]
+    assert replayed == 3 and frames[0]["event"] == "documents_changed"
+    assert frames[0]["document_ids"] == [103, 104, 105] and frames[0]["seq"] == 105
+    # 102 masih di buffer (ukuran 3), 100 sudah terbuang; 999 = seq dari proses lain
+    assert results[100] == (0, [{"event": "resync", "seq": 105}])
+    assert results[999] == (0, [{"event": "resync", "seq": 105}])
+    assert results[105] == (0, [])
+
+
+def test_sse_framing():
+    async def scenario():
+        manager = make_manager()
+        conn = manager.connect_stream(user_id=1)
+        frames = manager.sse_frames(conn)
+        out = [await frames.__anext__()]
+        manager.publish([1], {"event": "new_inbox", "document_id": 1}, seq=7)
+        manager.publish([1], {"event": "new_inbox", "document_id": 2})
+        manager.send(conn, "ping")
+        for _ in range(3):
+            out.append(await frames.__anext__())
+        await manager.close_all()
+        out.extend([frame async for frame in frames])
+        return out, conn
+
+    out, conn = asyncio.run(scenario())
+    assert out[0] == "retry: 3000\n\n"
+    assert out[1] == 'id: 7\ndata: {"event": "new_inbox", "document_id": 1, "seq": 7}\n\n'
+    assert out[2] == 'data: {"event": "new_inbox", "document_id": 2}\n\n'
+    assert out[3] == ": keep-alive\n\n"
+    assert len(out) == 4 and conn.closed
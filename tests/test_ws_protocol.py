@@ -0,0 +1,97 @@
+import pytest
+
+from app.utils import ws_protocol
+from app.utils.ws_protocol import packb, unpackb
+
+
+@pytest.mark.parametrize("value, header", [
+    (0, b"\x00"),
+    (127, b"\x7f"),                       # positive fixint
+    (128, b"\xcc\x80"),                   # uint8
+    (255, b"\xcc\xff"),
+    (256, b"\xcd\x01\x00"),               # uint16
+    (65536, b"\xce\x00\x01\x00\x00"),     # uint32
+    (1 << 32, b"\xcf\x00\x00\x00\x01\x00\x00\x00\x00"),
+    (-1, b"\xff"),                        # negative fixint
+    (-32, b"\xe0"),
+    (-33, b"\xd0\xdf"),                   # int8
+    (-128, b"\xd0\x80"),
+    (-129, b"\xd1\xff\x7f"),              # int16
+    (-32768, b"\xd1\x80\x00"),
+    (-32769, b"\xd2\xff\xff\x7f\xff"),    # int32
+])
+def test_int_boundaries(value, header):
+    assert packb(value) == header
+    assert unpackb(header) == value
+
+
+@pytest.mark.parametrize("length, header", [
+    (0, b"\xa0"),
+    (31, b"\xbf"),                        # fixstr
+    (32, b"\xd9\x20"),                    # str8
+    (255, b"\xd9\xff"),
+    (256, b"\xda\x01\x00"),               # str16
+    (65536, b"\xdb\x00\x01\x00\x00"),     # str32
+])
+def test_str_boundaries(length, header):
+    value = "x" * length
+    data = packb(value)
+    assert data[:len(header)] == header and len(data) == len(header) + length
+    assert unpackb(data) == value
+
+
+@pytest.mark.parametrize("length, header", [
+    (0, b"\x90"),
+    (15, b"\x9f"),                        # fixarray
+    (16, b"\xdc\x00\x10"),                # array16
+    (65536, b"\xdd\x00\x01\x00\x00"),     # array32
+])
+def test_array_boundaries(length, header):
+    value = list(range(length))
+    data = packb(value)
+    assert data.startswith(header)
+    assert unpackb(data) == value
+
+
+@pytest.mark.parametrize("length, header", [
+    (15, b"\x8f"),                        # fixmap
+    (16, b"\xde\x00\x10"),                # map16
+])
+def test_map_boundaries(length, header):
+    value = {f"k{i}": i for i in range(length)}
+    data = packb(value)
+    assert data.startswith(header)
+    assert unpackb(data) == value
+
+
+def test_round_trip_mixed_values():
+    value = {"a": [None, True, False, 1.5, -2.25, b"\x00\x01", "é"], "n": {"x": [1, [2, [3]]]}}
+    assert unpackb(packb(value)) == value
+
+
+def test_unpack_rejects_trailing_bytes():
+    with pytest.raises(ValueError):
+        unpackb(packb(1) + b"\x00")
+
+
+def test_compact_normalises_aliases():
+    legacy = ws_protocol.compact({"type": "new_inbox", "doc_id": 5, "count": 2})
+    canonical = ws_protocol.compact({"event": "new_inbox", "document_id": 5, "count": 2})
+    assert legacy == canonical == {"e": 5, "d": 5, "n": 2}
+
+
+def test_compact_rejects_conflicting_keys():
+    with pytest.raises(ValueError):
+        ws_protocol.compact({"event": "new_inbox", "type": "update_read"})
+    assert ws_protocol.compact({"event": "new_inbox", "type": "new_inbox"}) == {"e": 5}
+
+
+def test_key_codes_are_unique():
+    assert len(set(ws_protocol.KEY_CODES.values())) == len(ws_protocol.KEY_CODES)
+
+
+def test_encode_msgpack_round_trip():
+    message = {"event": "documents_changed", "document_ids": [1, 2], "types": ["new_inbox"], "seq": 9}
+    assert unpackb(ws_protocol.encode(message, ws_protocol.ENCODING_MSGPACK)) == {
+        "e": 7, "ds": [1, 2], "es": [5], "q": 9,
+    }